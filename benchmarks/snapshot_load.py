@@ -0,0 +1,67 @@
+"""
+==================
+Snapshot Load Time
+==================
+
+Compares fully loading a project tree from its metadata files against loading it from
+a snapshot with :meth:`ProjectDirectory.load
+<steamfitter.app.directory_structure.ProjectDirectory.load>`, which also refreshes the
+snapshot against the filesystem.
+
+A synthetic project is built in a temporary directory, and the metadata cache is cleared
+before every load so each one starts cold.
+
+Run with ``python benchmarks/snapshot_load.py``.
+
+"""
+import argparse
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from synthetic_project import make_project
+
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.lib.filesystem import METADATA_CACHE, load_tree
+from steamfitter.lib.filesystem.snapshot import _RACY_INTERVAL_NS
+
+
+def benchmark(project_path: Path, number: int) -> None:
+    # Directories modified just before a snapshot is taken are always re-read, so let
+    # the project settle first.
+    time.sleep(_RACY_INTERVAL_NS / 10**9)
+    ProjectDirectory.load(project_path, use_snapshot=False)
+    snapshot_size = ProjectDirectory.get_snapshot_path(project_path).stat().st_size
+
+    def cold(load):
+        METADATA_CACHE.clear()
+        load()
+
+    tree_time = timeit.timeit(
+        lambda: cold(lambda: load_tree(project_path, ProjectDirectory)), number=number
+    )
+    snapshot_time = timeit.timeit(
+        lambda: cold(lambda: ProjectDirectory.load(project_path)), number=number
+    )
+    print(f"snapshot size: {snapshot_size / 1024**2:.1f} MB, {number} iterations")
+    print(f"  load_tree: {tree_time / number:.2f} s")
+    print(
+        f"  snapshot and refresh: {snapshot_time / number:.2f} s, "
+        f"{tree_time / snapshot_time:.1f}x faster"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--stages", type=int, default=100, help="Modeling stages.")
+    parser.add_argument("--versions", type=int, default=100, help="Versions per stage.")
+    parser.add_argument("--number", type=int, default=3, help="Iterations per timing.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        benchmark(make_project(Path(root), args.stages, args.versions), args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+=================
+Synthetic Project
+=================
+
+Builds projects of a given size for the benchmarks in this directory.
+
+"""
+from pathlib import Path
+
+from steamfitter.app.directory_structure import (
+    ModelingStageDirectory,
+    ProjectDirectory,
+    VersionDirectory,
+)
+from steamfitter.lib.filesystem import Directory
+
+
+def make_project(root: Path, stages: int, versions: int) -> Path:
+    """Create a project with a number of modeling stages, each with a number of versions.
+
+    Returns the root directory of the project.
+
+    """
+    project = ProjectDirectory.create(root, name="benchmark", description="Benchmark.")
+    modeling_path = project.path / "modeling"
+    stage_paths = [
+        ModelingStageDirectory.create(
+            modeling_path, name=f"stage-{stage:03}", description=f"Stage {stage}."
+        ).path
+        for stage in range(stages)
+    ]
+    # Version names are allocated from what's on disk, so create one version of each
+    # stage at a time.
+    for version in range(versions):
+        Directory.create_many(
+            (
+                VersionDirectory,
+                stage_path,
+                {"version": version, "versionable_dir_name": stage_path.name},
+            )
+            for stage_path in stage_paths
+        )
+    return project.path
@@ -0,0 +1,65 @@
+"""
+===============
+Tree Memory Use
+===============
+
+Measures the memory held by a fully loaded project tree.
+
+A synthetic project is built in a temporary directory and loaded with
+:func:`steamfitter.lib.filesystem.load_tree`, and the memory still allocated once the
+load is done is reported with :mod:`tracemalloc`. To compare the memory use of two
+versions of steamfitter, run this on a checkout of each.
+
+Run with ``python benchmarks/tree_memory.py``.
+
+"""
+import argparse
+import gc
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from synthetic_project import make_project
+
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.lib.filesystem import METADATA_CACHE, load_tree
+
+
+def measure(project_path: Path) -> None:
+    METADATA_CACHE.clear()
+    gc.collect()
+    tracemalloc.start()
+    project = load_tree(project_path, ProjectDirectory)
+    # Only count what the tree itself holds on to.
+    METADATA_CACHE.clear()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    directory_count = sum(1 for _ in _walk(project))
+    print(
+        f"{directory_count:,} directories: {size / 1024**2:.1f} MB, "
+        f"{size / directory_count:,.0f} bytes per directory"
+    )
+
+
+def _walk(directory):
+    stack = [directory]
+    while stack:
+        directory = stack.pop()
+        yield directory
+        stack.extend(directory.iter_subdirectories())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--stages", type=int, default=100, help="Modeling stages.")
+    parser.add_argument("--versions", type=int, default=100, help="Versions per stage.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        measure(make_project(Path(root), args.stages, args.versions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+==============
+YAML I/O Speed
+==============
+
+Compares loading and dumping realistic steamfitter documents with PyYAML's pure Python
+safe loader and dumper against the libyaml C versions used by
+:mod:`steamfitter.lib.io.yaml`.
+
+Run with ``python benchmarks/yaml_io.py``.
+
+"""
+import argparse
+import timeit
+
+import yaml
+
+from steamfitter.lib.io.yaml import SafeDumper, SafeLoader
+
+
+def make_directory_metadata(index: int) -> dict:
+    """The metadata of a typical versioned data directory."""
+    return {
+        "root": f"/mnt/team/project/data/extracted_data/{index:06}-source/2023_01_01.01",
+        "name": "2023_01_01.01",
+        "description": f"Version 2023_01_01.01 of source {index}.",
+        "directory_type": "version",
+        "directory_class": "steamfitter.app.directory_structure.version.VersionDirectory",
+        "archive_policy": "archive",
+        "creation_time": "2023_01_01_12_00_00",
+        "created_by": "user",
+        "version": 1,
+        "versionable_dir_name": f"{index:06}-source",
+    }
+
+
+def make_provenance(stages: int, inputs_per_stage: int) -> dict:
+    """The metadata of a run, carrying the provenance of every stage before it."""
+    provenance = {}
+    for stage in range(stages):
+        provenance[f"stage-{stage}"] = {
+            "run_time": "2023_01_01_12_00_00",
+            "end_time": "2023_01_01_13_00_00",
+            "run_time_seconds": "3600.0000",
+            "output_root": f"/mnt/team/project/modeling/stage-{stage}/2023_01_01.01",
+            "inputs": {
+                f"input-{i}": {
+                    "path": f"/mnt/team/project/data/processed/input-{i}/2023_01_01.01",
+                    "version": "2023_01_01.01",
+                    "columns": [f"column_{c}" for c in range(10)],
+                }
+                for i in range(inputs_per_stage)
+            },
+        }
+    return {"model": {"run_time": "2023_01_01_12_00_00", "provenance": provenance}}
+
+
+def benchmark(name: str, data: dict, number: int) -> None:
+    documents = {
+        "python": yaml.dump(data, Dumper=yaml.SafeDumper),
+        "libyaml": yaml.dump(data, Dumper=SafeDumper),
+    }
+    assert documents["python"] == documents["libyaml"]
+    assert yaml.load(documents["python"], Loader=SafeLoader) == data
+
+    print(f"{name} ({len(documents['python']) / 1024:.1f} KB, {number} iterations)")
+    for operation, python, libyaml in [
+        (
+            "load",
+            lambda: yaml.load(documents["python"], Loader=yaml.SafeLoader),
+            lambda: yaml.load(documents["python"], Loader=SafeLoader),
+        ),
+        (
+            "dump",
+            lambda: yaml.dump(data, Dumper=yaml.SafeDumper),
+            lambda: yaml.dump(data, Dumper=SafeDumper),
+        ),
+    ]:
+        python_time = timeit.timeit(python, number=number)
+        libyaml_time = timeit.timeit(libyaml, number=number)
+        print(
+            f"  {operation}: python {python_time / number * 1000:.3f} ms, "
+            f"libyaml {libyaml_time / number * 1000:.3f} ms, "
+            f"{python_time / libyaml_time:.1f}x faster"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--number", type=int, default=200, help="Iterations per timing.")
+    args = parser.parse_args()
+
+    if SafeLoader is yaml.SafeLoader:
+        print("PyYAML was built without libyaml, both timings use the Python version.")
+    benchmark("directory metadata", make_directory_metadata(1), args.number * 10)
+    benchmark("provenance, 5 stages", make_provenance(5, 5), args.number)
+    benchmark("provenance, 20 stages", make_provenance(20, 20), args.number // 10 or 1)
+
+
+if __name__ == "__main__":
+    main()
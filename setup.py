@@ -37,6 +37,14 @@ if __name__ == "__main__":
         "sphinx-click",
     ]
 
+    msgpack_requirements = [
+        "msgpack",
+    ]
+
+    tabular_requirements = [
+        "pyarrow",
+    ]
+
     internal_requirements = [
         "jobmon[ihme]==3.0.5",
         "db_queries>=25.2.0,<26",
@@ -64,6 +72,8 @@ if __name__ == "__main__":
         extras_require={
             "docs": doc_requirements,
             "test": test_requirements,
+            "msgpack": msgpack_requirements,
+            "tabular": tabular_requirements,
             "internal": internal_requirements,
             "dev": (doc_requirements + test_requirements + other_dev_requirements),
         },
@@ -18,6 +18,8 @@ def steamfitter():
 
 
 steamfitter.add_command(commands.self_destruct, name="self-destruct")
+steamfitter.add_command(commands.reap_trash, name="reap")
+steamfitter.add_command(commands.show_usage, name="usage")
 
 
 ############################
@@ -61,6 +63,15 @@ list.add_command(commands.list_config, name="config")
 ##########################
 
 
+@steamfitter.group()
+def catalog():
+    """Maintains the catalog of a steamfitter project."""
+    pass
+
+
+catalog.add_command(commands.rebuild_catalog, name="rebuild")
+
+
 @steamfitter.group()
 def config():
     """Creates, updates, or lists steamfitter configuration."""
@@ -74,21 +85,25 @@ config.add_command(commands.list_config, name="list")
 
 @steamfitter.group()
 def project():
-    """Adds, removes, or lists steamfitter projects."""
+    """Adds, removes, lists, archives, deduplicates, or migrates steamfitter projects."""
     pass
 
 
 project.add_command(commands.add_project, name="add")
 project.add_command(commands.remove_project, name="remove")
 project.add_command(commands.list_projects, name="list")
+project.add_command(commands.archive_project, name="archive")
+project.add_command(commands.dedup_project, name="dedup")
+project.add_command(commands.migrate_metadata, name="migrate")
 
 
 @steamfitter.group()
 def source():
-    """Adds, removes, or lists steamfitter data sources."""
+    """Adds, removes, lists, or converts steamfitter data sources."""
     pass
 
 
 source.add_command(commands.add_source, name="add")
 source.add_command(commands.remove_source, name="remove")
 source.add_command(commands.list_sources, name="list")
+source.add_command(commands.convert_source, name="convert")
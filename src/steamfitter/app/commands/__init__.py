@@ -1,10 +1,17 @@
+from steamfitter.app.commands.catalog_rebuild import rebuild_catalog
 from steamfitter.app.commands.config_create import create_config
 from steamfitter.app.commands.config_list import list_config
 from steamfitter.app.commands.config_update import update_config
 from steamfitter.app.commands.project_add import add_project
+from steamfitter.app.commands.project_archive import archive_project
+from steamfitter.app.commands.project_dedup import dedup_project
 from steamfitter.app.commands.project_list import list_projects
+from steamfitter.app.commands.project_migrate import migrate_metadata
 from steamfitter.app.commands.project_remove import remove_project
 from steamfitter.app.commands.self_destruct import self_destruct
 from steamfitter.app.commands.source_add import add_source
+from steamfitter.app.commands.source_convert import convert_source
 from steamfitter.app.commands.source_list import list_sources
 from steamfitter.app.commands.source_remove import remove_source
+from steamfitter.app.commands.trash_reap import reap_trash
+from steamfitter.app.commands.usage import show_usage
@@ -0,0 +1,48 @@
+"""
+===============
+Rebuild Catalog
+===============
+
+Rebuilds the catalog of a steamfitter project from the directories on disk.
+
+"""
+from typing import Union
+
+import click
+
+from steamfitter.app import options
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.app.utilities import get_project_directory
+from steamfitter.lib.cli_tools import (
+    click_options,
+    configure_logging_to_terminal,
+    logger,
+    monitoring,
+)
+from steamfitter.lib.filesystem import Catalog
+
+
+def main(project_name: Union[str, None]):
+    """Rebuild the catalog of a project from disk."""
+    project_path = get_project_directory(project_name).path
+    project_directory = ProjectDirectory.load(project_path, use_snapshot=False)
+    catalog = Catalog.create(project_path, exists_ok=True)
+    directory_count = catalog.rebuild(project_directory)
+    click.echo(
+        f"Catalog for project {project_directory['name']} rebuilt "
+        f"with {directory_count} directories."
+    )
+
+
+@click.command()
+@options.project_name
+@click_options.verbose_and_with_debugger
+def rebuild_catalog(
+    project_name: Union[str, None],
+    verbose: int,
+    with_debugger: bool,
+):
+    """Rebuilds the catalog of a steamfitter managed project from disk."""
+    configure_logging_to_terminal(verbose)
+    main_ = monitoring.handle_exceptions(main, logger, with_debugger)
+    main_(project_name)
@@ -0,0 +1,71 @@
+"""
+===============
+Archive Project
+===============
+
+Applies the archive policies of a steamfitter project to its stale versions.
+
+"""
+from typing import Union
+
+import click
+
+from steamfitter.app import options
+from steamfitter.app.utilities import get_project_directory
+from steamfitter.lib.cli_tools import (
+    click_options,
+    configure_logging_to_terminal,
+    logger,
+    monitoring,
+)
+from steamfitter.lib.filesystem import ARCHIVE_POLICIES
+
+
+def main(
+    project_name: Union[str, None], compression_threads: Union[int, None], dry_run: bool
+):
+    """Archive or delete the stale versions of a project."""
+    project_directory = get_project_directory(project_name)
+    actions = project_directory.apply_archive_policies(
+        compression_threads=compression_threads,
+        dry_run=dry_run,
+    )
+
+    prefix = "Would " if dry_run else ""
+    for action in actions:
+        verb = "archive" if action.policy == ARCHIVE_POLICIES.archive else "delete"
+        if not dry_run:
+            verb = f"{verb}d".capitalize()
+        click.echo(f"{prefix}{verb} {action.path}")
+
+    archived = [a.stats for a in actions if a.stats is not None]
+    data_size = sum(s.data_size for s in archived)
+    archive_size = sum(s.archive_size for s in archived)
+    click.echo(
+        f"{len(actions)} stale versions processed. "
+        f"Archived {data_size} bytes into {archive_size} bytes."
+    )
+
+
+@click.command()
+@options.project_name
+@options.compression_threads
+@options.dry_run
+@click_options.verbose_and_with_debugger
+def archive_project(
+    project_name: Union[str, None],
+    compression_threads: Union[int, None],
+    dry_run: bool,
+    verbose: int,
+    with_debugger: bool,
+):
+    """Archives or deletes stale versions according to their archive policy.
+
+    Versions that are neither the best nor the latest version of their source,
+    measure, diagnostic, or modeling stage are compressed into the project's archive
+    directory or moved to the trash.
+
+    """
+    configure_logging_to_terminal(verbose)
+    main_ = monitoring.handle_exceptions(main, logger, with_debugger)
+    main_(project_name, compression_threads, dry_run)
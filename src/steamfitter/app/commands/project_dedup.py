@@ -0,0 +1,59 @@
+"""
+===================
+Deduplicate Project
+===================
+
+Hardlinks files that are identical across the versions of a steamfitter project.
+
+"""
+from typing import Union
+
+import click
+
+from steamfitter.app import options
+from steamfitter.app.utilities import get_project_directory
+from steamfitter.lib.cli_tools import (
+    click_options,
+    configure_logging_to_terminal,
+    logger,
+    monitoring,
+)
+from steamfitter.lib.filesystem import format_size
+
+
+def main(project_name: Union[str, None], dry_run: bool):
+    """Deduplicate the versions of every versioned directory in a project."""
+    project_directory = get_project_directory(project_name)
+    files_linked, bytes_reclaimed = 0, 0
+    for directory in project_directory.iter_versioned_directories():
+        stats = directory.deduplicate(dry_run=dry_run)
+        if stats.files_linked:
+            logger.info(f"{directory.path}: {stats.files_linked} duplicate files.")
+        files_linked += stats.files_linked
+        bytes_reclaimed += stats.bytes_reclaimed
+
+    verb = "Would link" if dry_run else "Linked"
+    click.echo(
+        f"{verb} {files_linked} duplicate files, reclaiming {format_size(bytes_reclaimed)}."
+    )
+
+
+@click.command()
+@options.project_name
+@options.dry_run
+@click_options.verbose_and_with_debugger
+def dedup_project(
+    project_name: Union[str, None],
+    dry_run: bool,
+    verbose: int,
+    with_debugger: bool,
+):
+    """Replaces files that are identical across versions with hardlinks.
+
+    Paths are unchanged, but identical files share their storage. Linked files
+    must not be modified in place.
+
+    """
+    configure_logging_to_terminal(verbose)
+    main_ = monitoring.handle_exceptions(main, logger, with_debugger)
+    main_(project_name, dry_run)
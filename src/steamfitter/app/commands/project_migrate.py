@@ -0,0 +1,69 @@
+"""
+================
+Migrate Metadata
+================
+
+Converts the metadata files of a steamfitter project to another format.
+
+"""
+from typing import Union
+
+import click
+
+from steamfitter.app import options
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.app.utilities import get_project_directory
+from steamfitter.lib import io
+from steamfitter.lib.cli_tools import (
+    click_options,
+    configure_logging_to_terminal,
+    logger,
+    monitoring,
+)
+from steamfitter.lib.filesystem import Metadata
+
+
+def main(project_name: Union[str, None], metadata_format: str, dry_run: bool):
+    """Convert the metadata of every directory in a project to a format."""
+    project_path = get_project_directory(project_name).path
+    project_directory = ProjectDirectory.load(project_path, use_snapshot=False)
+    file_name = f"metadata{io.BACKENDS[metadata_format].EXTENSIONS[0]}"
+
+    converted, total = 0, 0
+    stack = [project_directory]
+    while stack:
+        directory = stack.pop()
+        stack.extend(directory.iter_subdirectories())
+        total += 1
+        if Metadata.find_file(directory.path).name == file_name:
+            continue
+        if not dry_run:
+            Metadata.convert(directory.path, file_name)
+        logger.info(f"{directory.path}: converted to {metadata_format}.")
+        converted += 1
+
+    verb = "Would convert" if dry_run else "Converted"
+    click.echo(f"{verb} {converted} of {total} metadata files to {metadata_format}.")
+
+
+@click.command()
+@options.project_name
+@options.metadata_format
+@options.dry_run
+@click_options.verbose_and_with_debugger
+def migrate_metadata(
+    project_name: Union[str, None],
+    metadata_format: str,
+    dry_run: bool,
+    verbose: int,
+    with_debugger: bool,
+):
+    """Converts the metadata files of a project to another format.
+
+    YAML is easy to read and edit by hand. JSON and msgpack are much faster to read
+    and write, which matters for large projects.
+
+    """
+    configure_logging_to_terminal(verbose)
+    main_ = monitoring.handle_exceptions(main, logger, with_debugger)
+    main_(project_name, metadata_format, dry_run)
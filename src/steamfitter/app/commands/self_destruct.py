@@ -16,6 +16,7 @@ from steamfitter.lib.cli_tools import (
     logger,
     monitoring,
 )
+from steamfitter.lib.filesystem import get_trash_root, reap
 
 
 def main():
@@ -27,6 +28,8 @@ def main():
     for project in configuration.projects.values():
         click.echo(f"Removing project: {project}")
         ProjectDirectory.remove(configuration.projects_root / project)
+    click.echo("Deleting removed projects.")
+    reap(get_trash_root(configuration.projects_root), progress_bar=True)
     click.echo("Removing configuration file.")
     configuration.remove()
     click.echo("All projects and configuration removed.")
@@ -0,0 +1,72 @@
+"""
+==============
+Convert Source
+==============
+
+Converts a CSV file extracted from a source to a Parquet dataset.
+
+"""
+from typing import Union
+
+import click
+
+from steamfitter.app import options
+from steamfitter.app.utilities import clean_string, get_project_directory
+from steamfitter.lib.cli_tools import (
+    click_options,
+    configure_logging_to_terminal,
+    logger,
+    monitoring,
+)
+from steamfitter.lib.exceptions import SteamfitterException
+
+
+def main(
+    source_name: str,
+    project_name: Union[str, None],
+    file_name: str,
+    version: Union[str, None],
+    chunk_size: int,
+):
+    """Convert a CSV file in a version of a source to a Parquet dataset."""
+    source_name = clean_string(source_name)
+    project_directory = get_project_directory(project_name)
+    extracted_data_directory = project_directory.data_directory.extracted_data_directory
+    try:
+        source_directory = extracted_data_directory.get_source(source_name)
+        stats = source_directory.convert_csv(file_name, version, chunk_size)
+    except (SteamfitterException, KeyError, FileNotFoundError, FileExistsError) as e:
+        click.echo(str(e))
+        raise click.Abort()
+
+    click.echo(
+        f"Converted {stats.row_count} rows of {file_name} into {stats.part_count} "
+        f"Parquet files in {stats.seconds:.1f}s."
+    )
+
+
+@click.command()
+@options.source_name
+@options.project_name
+@options.file_name
+@options.version
+@options.chunk_size
+@click_options.verbose_and_with_debugger
+def convert_source(
+    source_name: str,
+    project_name: Union[str, None],
+    file_name: str,
+    version: Union[str, None],
+    chunk_size: int,
+    verbose: int,
+    with_debugger: bool,
+):
+    """Converts a CSV file extracted from a source to a Parquet dataset.
+
+    The CSV file is streamed in chunks, so it never needs to fit in memory, and the
+    dataset is written next to it.
+
+    """
+    configure_logging_to_terminal(verbose)
+    main_ = monitoring.handle_exceptions(main, logger, with_debugger)
+    main_(source_name, project_name, file_name, version, chunk_size)
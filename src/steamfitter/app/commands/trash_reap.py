@@ -0,0 +1,50 @@
+"""
+==========
+Reap Trash
+==========
+
+Permanently deletes directories that steamfitter has moved to the trash.
+
+"""
+import click
+
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.app.utilities import get_configuration
+from steamfitter.lib.cli_tools import (
+    click_options,
+    configure_logging_to_terminal,
+    logger,
+    monitoring,
+)
+from steamfitter.lib.filesystem import get_trash_root, reap
+
+
+def main():
+    """Reap the trash of the projects root and of every project in it."""
+    config = get_configuration()
+    projects_root = config.projects_root
+    # Removed projects are trashed in the projects root.
+    trash_roots = [get_trash_root(projects_root)]
+    for child in sorted(projects_root.iterdir()):
+        if child.is_dir() and ProjectDirectory.is_directory_type(child):
+            trash_roots.append(get_trash_root(child))
+
+    file_count = sum(reap(trash_root, progress_bar=True) for trash_root in trash_roots)
+    click.echo(f"Deleted {file_count} files from the trash.")
+
+
+@click.command()
+@click_options.verbose_and_with_debugger
+def reap_trash(
+    verbose: int,
+    with_debugger: bool,
+):
+    """Permanently deletes removed projects, sources, versions, etc.
+
+    Removing directories only moves them into the trash, so that removal is
+    instant. This command empties the trash. It can be safely rerun if interrupted.
+
+    """
+    configure_logging_to_terminal(verbose)
+    main_ = monitoring.handle_exceptions(main, logger, with_debugger)
+    main_()
@@ -0,0 +1,69 @@
+"""
+==========
+Disk Usage
+==========
+
+Reports the disk usage of the directories in a steamfitter project, largest first.
+
+"""
+from typing import Union
+
+import click
+
+from steamfitter.app import options
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.app.utilities import get_project_directory
+from steamfitter.lib.cli_tools import (
+    click_options,
+    configure_logging_to_terminal,
+    logger,
+    monitoring,
+)
+from steamfitter.lib.filesystem import Catalog, disk_usage, format_size
+
+
+def main(project_name: Union[str, None], depth: Union[int, None], full: bool):
+    """Print the managed directories of a project sorted by disk usage."""
+    project_path = get_project_directory(project_name).path
+    catalog = Catalog.find(project_path)
+    usage = disk_usage(project_path, catalog=catalog, full=full)
+    project_directory = ProjectDirectory.load(project_path)
+
+    stack = [(project_directory, 0)]
+    while stack:
+        directory, level = stack.pop()
+        directory_usage = usage[directory._path]
+        name = directory.path.relative_to(project_path.parent)
+        click.echo(
+            f"{format_size(directory_usage.size):>10}  {directory_usage.file_count:>10,} files"
+            f"  {'  ' * level}{name if level == 0 else directory.path.name}"
+        )
+        if depth is not None and level >= depth:
+            continue
+        # Symlinks such as best and latest point at directories that are counted already.
+        subdirectories = [d for d in directory.iter_subdirectories() if d._path in usage]
+        subdirectories.sort(key=lambda d: usage[d._path].size)
+        stack.extend((d, level + 1) for d in subdirectories)
+
+
+@click.command()
+@options.project_name
+@options.depth
+@options.full_rescan
+@click_options.verbose_and_with_debugger
+def show_usage(
+    project_name: Union[str, None],
+    depth: Union[int, None],
+    full: bool,
+    verbose: int,
+    with_debugger: bool,
+):
+    """Shows the disk usage of a project's directories, largest first.
+
+    Only directories that changed since the last run are rescanned, unless --full is
+    given. Files modified in place are only picked up by a full rescan.
+
+    """
+    configure_logging_to_terminal(verbose)
+    main_ = monitoring.handle_exceptions(main, logger, with_debugger)
+    main_(project_name, depth, full)
@@ -5,15 +5,21 @@ Configuration
 
 This module contains the :class:`Configuration` class, which is used to represent
 the user configuration of steamfitter. The configuration is stored in a YAML file in the
-user's home directory.
+user's home directory. Its format follows the extension of the file, like metadata, see
+:mod:`steamfitter.lib.io`.
+
+Every change to the configuration is written to disk immediately, unless it is made
+inside a :meth:`Configuration.batch`, in which case the file is written once when the
+batch ends.
 
 """
 import shutil
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Union
+from typing import Iterator, Union
 
+from steamfitter.lib import io
 from steamfitter.lib.exceptions import SteamfitterException
-from steamfitter.lib.io import yaml as io
 
 
 class SteamfitterConfigurationError(SteamfitterException):
@@ -26,8 +32,13 @@ class Configuration:
     _path = Path.home() / ".config" / "steamfitter" / "steamfitter.conf"
 
     def __init__(self):
+        if getattr(self, "_batch_depth", 0):
+            # Don't throw away changes waiting to be written by a batch.
+            return
         self._config = io.load(self._path)
         self._previous_default_project = None
+        self._batch_depth = 0
+        self._dirty = False
 
     @property
     def projects_root(self) -> Path:
@@ -109,9 +120,29 @@ class Configuration:
         self.persist()
 
     def persist(self):
-        """Save the configuration to disk."""
+        """Save the configuration to disk, or at the end of the current batch."""
+        if self._batch_depth:
+            self._dirty = True
+            return
         io.dump(self._path, self._config, exist_ok=True)
 
+    @contextmanager
+    def batch(self) -> Iterator["Configuration"]:
+        """Write the configuration once, at the end of a block of changes.
+
+        Batches may be nested, in which case the configuration is written when the
+        outermost one exits.
+
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self._dirty = False
+                self.persist()
+
     def __repr__(self):
         config_list = [f"{k}={v}" for k, v in self._config.items()]
         return f"Configuration(', '.join({config_list}))"
@@ -18,4 +18,7 @@ from steamfitter.app.directory_structure.processed_data import (
     ProcessedMeasureDirectory,
 )
 from steamfitter.app.directory_structure.project import ProjectDirectory
-from steamfitter.app.directory_structure.version import VersionDirectory
+from steamfitter.app.directory_structure.version import (
+    VersionDirectory,
+    VersionedDirectory,
+)
@@ -5,11 +5,30 @@ Archive Directory
 
 An archive directory is a project subdirectory for storing archived data and models.
 
+Stale versions are archived as compressed tarballs that mirror their location in the
+project, e.g. ``modeling/stage/2023_01_01.01`` is archived to
+``archive/modeling/stage/2023_01_01.01.tar.gz``. Archived versions can be restored in
+full, or a single file can be pulled out of one without decompressing the rest.
+
 """
-from steamfitter.lib.filesystem import Directory
+from pathlib import Path
+from typing import Union
+
+from steamfitter.lib.filesystem import (
+    ArchiveStats,
+    Directory,
+    archive_directory,
+    extract_member,
+    restore_archive,
+)
+from steamfitter.lib.shell_tools import mkdir
+
+_BYTES_PER_GB = 1024**3
 
 
 class ArchiveDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
 
     NAME_TEMPLATE = "archive"
@@ -19,3 +38,90 @@ class ArchiveDirectory(Directory):
         ("archived_file_count", lambda: 0),
         ("archived_data_size", lambda: "0 GB"),
     }
+
+    def get_archive_path(self, version_path: Union[str, Path]) -> Path:
+        """Return the path a version directory is archived to."""
+        relative_path = Path(version_path).relative_to(self.path.parent)
+        return self.path / relative_path.parent / f"{relative_path.name}.tar.gz"
+
+    def archive_version(
+        self,
+        version: Directory,
+        compression_threads: int = None,
+    ) -> ArchiveStats:
+        """Archive a version directory and remove it from the project.
+
+        Parameters
+        ----------
+        version
+            The version directory to archive.
+        compression_threads
+            The number of threads compressing data. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        ArchiveStats
+            The number of files and bytes archived and the size of the archive.
+
+        """
+        archive_path = self.get_archive_path(version.path)
+        mkdir(archive_path.parent, exists_ok=True, parents=True)
+        stats = archive_directory(
+            version.path, archive_path, compression_threads=compression_threads
+        )
+
+        with self.locked_update() as metadata:
+            metadata["archived_file_count"] = (
+                metadata["archived_file_count"] + stats.file_count
+            )
+            data_size = (
+                _parse_gb(metadata["archived_data_size"]) + stats.data_size / _BYTES_PER_GB
+            )
+            metadata["archived_data_size"] = f"{data_size:.2f} GB"
+
+        type(version).remove(version.path)
+        return stats
+
+    def restore(
+        self,
+        version_path: Union[str, Path],
+        destination: Union[str, Path],
+        member: str = None,
+        decompression_threads: int = None,
+    ) -> Path:
+        """Restore an archived version, or a single file from it.
+
+        Parameters
+        ----------
+        version_path
+            The path the version had in the project before it was archived.
+        destination
+            The directory to restore into.
+        member
+            The path of a single file to restore, relative to the version directory.
+            If not provided, the whole version is restored.
+        decompression_threads
+            The number of threads decompressing a whole version. Defaults to the
+            number of CPUs.
+
+        Returns
+        -------
+        Path
+            The restored file or version directory.
+
+        """
+        version_path = Path(version_path)
+        destination = Path(destination)
+        archive_path = self.get_archive_path(version_path)
+        if not archive_path.exists():
+            raise FileNotFoundError(f"No archive of {version_path} found.")
+
+        if member is None:
+            restore_archive(archive_path, destination, decompression_threads)
+            return destination / version_path.name
+        member_name = f"{version_path.name}/{member}"
+        return extract_member(archive_path, member_name, destination / Path(member).name)
+
+
+def _parse_gb(size: str) -> float:
+    return float(size.split()[0])
@@ -16,6 +16,8 @@ from steamfitter.lib.filesystem import Directory
 
 
 class DataDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
 
     NAME_TEMPLATE = "data"
@@ -29,24 +31,12 @@ class DataDirectory(Directory):
 
     @property
     def extracted_data_directory(self) -> ExtractedDataDirectory:
-        if not hasattr(self, "_extracted_data_directory"):
-            self._extracted_data_directory = self.get_solo_directory_by_class(
-                ExtractedDataDirectory
-            )
-        return self._extracted_data_directory
+        return self.get_solo_directory_by_class(ExtractedDataDirectory)
 
     @property
     def processed_data_directory(self) -> ProcessedDataDirectory:
-        if not hasattr(self, "_processed_data_directory"):
-            self._processed_data_directory = self.get_solo_directory_by_class(
-                ProcessedDataDirectory
-            )
-        return self._processed_data_directory
+        return self.get_solo_directory_by_class(ProcessedDataDirectory)
 
     @property
     def data_diagnostics_directory(self) -> DataDiagnosticsDirectory:
-        if not hasattr(self, "_data_diagnostics_directory"):
-            self._data_diagnostics_directory = self.get_solo_directory_by_class(
-                DataDiagnosticsDirectory
-            )
-        return self._data_diagnostics_directory
+        return self.get_solo_directory_by_class(DataDiagnosticsDirectory)
@@ -7,23 +7,17 @@ A data diagnostics directory is a project subdirectory for storing data diagnost
 data quality reports, data dictionaries, and plotting outputs.
 
 """
-from steamfitter.app.directory_structure.version import VersionDirectory
+from steamfitter.app.directory_structure.version import VersionedDirectory
 from steamfitter.lib.filesystem import ARCHIVE_POLICIES, Directory
 
 
-class DiagnosticDirectory(Directory):
-    DEFAULT_ARCHIVE_POLICY = ARCHIVE_POLICIES.archive
-
-    DEFAULT_EMPTY_ARGS = {
-        ("last_updated", lambda: ""),
-        ("latest_version", lambda: ""),
-        ("best_version", lambda: ""),
-    }
-
-    SUBDIRECTORY_TYPES = (VersionDirectory,)
+class DiagnosticDirectory(VersionedDirectory):
+    __slots__ = ()
 
 
 class DataDiagnosticsDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
     DEFAULT_ARCHIVE_POLICY = ARCHIVE_POLICIES.delete
 
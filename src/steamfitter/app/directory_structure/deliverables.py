@@ -13,6 +13,8 @@ from steamfitter.lib.filesystem import Directory
 
 
 class DeliverablesDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
 
     NAME_TEMPLATE = "deliverables"
@@ -6,28 +6,46 @@ Extracted Data Directory
 An extracted data directory is a project subdirectory for storing data extracted from
 external sources.
 
+The directory is a git repository, and every source or source column added to or
+removed from it is committed. Inside :meth:`ExtractedDataDirectory.batch`, the metadata
+is written and the changes committed once, when the batch ends.
+
+Raw extracts are often large CSV files. :meth:`ExtractionSourceDirectory.convert_csv`
+streams one into a Parquet dataset next to it, using the column types registered with
+the extracted data directory, and records the conversion in the version's metadata.
+
 """
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, Iterator
 
 from git import Repo
 
-from steamfitter.app.directory_structure.version import VersionDirectory
+from steamfitter.app.directory_structure.version import VersionedDirectory
 from steamfitter.lib.exceptions import SteamfitterException
-from steamfitter.lib.filesystem import ARCHIVE_POLICIES, Directory, templates
+from steamfitter.lib.filesystem import Directory, templates
+from steamfitter.lib.filesystem.metadata import (
+    JOURNAL_FILE_NAME,
+    LOCK_FILE_NAME,
+    METADATA_FILE_NAMES,
+)
+from steamfitter.lib.filesystem.versions import VERSION_COUNTER_FILE_NAME
+from steamfitter.lib.io import tabular
+from steamfitter.lib.validation import Schema
 
+# Files steamfitter writes next to the data that must never be committed.
+_IGNORED_FILE_NAMES = (
+    *METADATA_FILE_NAMES,
+    JOURNAL_FILE_NAME,
+    LOCK_FILE_NAME,
+    VERSION_COUNTER_FILE_NAME,
+)
 
-class ExtractionSourceDirectory(Directory):
-    DEFAULT_ARCHIVE_POLICY = ARCHIVE_POLICIES.archive
 
-    NAME_TEMPLATE = "{source_count:>06}-{source_name}"
+class ExtractionSourceDirectory(VersionedDirectory):
+    __slots__ = ()
 
-    DEFAULT_EMPTY_ARGS = {
-        ("last_updated", lambda: ""),
-        ("latest_version", lambda: ""),
-        ("best_version", lambda: ""),
-    }
-
-    SUBDIRECTORY_TYPES = (VersionDirectory,)
+    NAME_TEMPLATE = "{source_count:>06}-{source_name}"
 
     @classmethod
     def make_name(cls, root: Path, **kwargs) -> str:
@@ -46,8 +64,54 @@ class ExtractionSourceDirectory(Directory):
         with open(extraction_template_path, "w") as f:
             f.write(templates.EXTRACTION.format(source_name=source_name))
 
+    def convert_csv(
+        self,
+        file_name: str,
+        version: str = None,
+        chunk_size: int = tabular.DEFAULT_CHUNK_SIZE,
+    ) -> tabular.ConversionStats:
+        """Convert a CSV file in a version of the source to a Parquet dataset.
+
+        The dataset is written next to the CSV file with a ``.parquet`` extension, see
+        :func:`steamfitter.lib.io.tabular.convert_csv`. Columns registered with the
+        extracted data directory are read with their registered types. The row count
+        and timing are recorded under ``conversions`` in the version's metadata.
+
+        Parameters
+        ----------
+        file_name
+            The name of the CSV file in the version.
+        version
+            The version to convert. Defaults to the best or else the latest version.
+        chunk_size
+            The number of rows read into memory at a time.
+
+        """
+        version_directory = self.get_version(version)
+        extracted_data_directory = self.parent
+        if extracted_data_directory is None:
+            extracted_data_directory = ExtractedDataDirectory(self.path.parent, lazy=True)
+        csv_path = version_directory.path / file_name
+        stats = tabular.convert_csv(
+            csv_path,
+            dtypes=extracted_data_directory.get_column_dtypes(),
+            chunk_size=chunk_size,
+        )
+        with version_directory.locked_update() as metadata:
+            conversions = metadata["conversions"] if "conversions" in metadata else {}
+            conversions[file_name] = {
+                "output": csv_path.with_suffix(".parquet").name,
+                "row_count": stats.row_count,
+                "part_count": stats.part_count,
+                "seconds": round(stats.seconds, 3),
+            }
+            metadata["conversions"] = conversions
+        return stats
+
 
 class ExtractedDataDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
 
     NAME_TEMPLATE = "extracted_data"
@@ -63,56 +127,52 @@ class ExtractedDataDirectory(Directory):
 
     def add_source(self, source_name: str, description: str):
         """Add a source to the extracted data directory."""
-        sources = self["sources"].copy()
-        if source_name in sources:
-            raise SteamfitterException(f"Source {source_name} already exists.")
+        with self.locked_update():
+            sources = self["sources"].copy()
+            if source_name in sources:
+                raise SteamfitterException(f"Source {source_name} already exists.")
 
-        source_count = self["source_count"] + 1
-        ExtractionSourceDirectory.create(
-            root=self.path,
-            parent=self,
-            source_count=source_count,
-            source_name=source_name,
-            description=description,
-        )
-        self.update(
-            {
-                "source_count": source_count,
-                "sources": {**sources, source_name: source_count},
-            }
-        )
-        self._metadata.persist()
+            source_count = self["source_count"] + 1
+            ExtractionSourceDirectory.create(
+                root=self.path,
+                parent=self,
+                source_count=source_count,
+                source_name=source_name,
+                description=description,
+            )
+            self.update(
+                {
+                    "source_count": source_count,
+                    "sources": {**sources, source_name: source_count},
+                }
+            )
 
-        repo = Repo(self.path)
-        repo.git.add(".")
-        repo.index.commit(f"Added source {source_name}.")
+        self._commit(f"Added source {source_name}.")
 
     def remove_source(self, source_name: str):
         """Remove a source from the extracted data directory."""
-        sources = self["sources"].copy()
-        if source_name not in sources:
-            raise SteamfitterException(f"Source {source_name} does not exist.")
+        with self.locked_update():
+            sources = self["sources"].copy()
+            if source_name not in sources:
+                raise SteamfitterException(f"Source {source_name} does not exist.")
 
-        source_count = sources.pop(source_name)
-        source_path = self.path / ExtractionSourceDirectory.make_name(
-            root=self.path,
-            source_count=source_count,
-            source_name=source_name,
-        )
-        source_path.rmdir()
-        source_path.touch(mode=0o600)
+            source_count = sources.pop(source_name)
+            source_path = self.path / ExtractionSourceDirectory.make_name(
+                root=self.path,
+                source_count=source_count,
+                source_name=source_name,
+            )
+            source_path.rmdir()
+            source_path.touch(mode=0o600)
 
-        # Preserve the count so we can keep adding new sources to the end.
-        self.update(
-            {
-                "sources": self["sources"],
-            }
-        )
-        self._metadata.persist()
+            # Preserve the count so we can keep adding new sources to the end.
+            self.update(
+                {
+                    "sources": self["sources"],
+                }
+            )
 
-        repo = Repo(self.path)
-        repo.git.add(".")
-        repo.index.commit(f"Removed source {source_name}.")
+        self._commit(f"Removed source {source_name}.")
 
     def add_source_column(
         self,
@@ -122,21 +182,78 @@ class ExtractedDataDirectory(Directory):
         description: str,
     ):
         """Add a source column to the extracted data directory."""
-        if source_column_name in self["columns"].values():
-            raise SteamfitterException(f"Source column {source_column_name} already exists.")
-        self.update(
-            {
-                "columns": {
-                    **self["columns"],
-                    source_column_name: (source_column_type, is_nullable, description),
-                },
-            }
+        with self.locked_update():
+            if source_column_name in self["columns"].values():
+                raise SteamfitterException(
+                    f"Source column {source_column_name} already exists."
+                )
+            self.update(
+                {
+                    "columns": {
+                        **self["columns"],
+                        source_column_name: (source_column_type, is_nullable, description),
+                    },
+                }
+            )
+
+        self._commit(f"Added source column {source_column_name}.")
+
+    def get_source(self, source_name: str) -> ExtractionSourceDirectory:
+        """Return the directory of a source."""
+        if source_name not in self["sources"]:
+            raise SteamfitterException(f"Source {source_name} does not exist.")
+        source_path = self.path / ExtractionSourceDirectory.make_name(
+            root=self.path,
+            source_count=self["sources"][source_name],
+            source_name=source_name,
         )
-        self._metadata.persist()
+        return ExtractionSourceDirectory(source_path, parent=self, lazy=True)
+
+    def get_schema(self) -> Schema:
+        """Return the schema of the registered source columns.
+
+        See :class:`steamfitter.lib.validation.Schema`.
+
+        """
+        return Schema.from_columns(self["columns"])
+
+    def get_column_dtypes(self) -> Dict[str, str]:
+        """Return the pandas dtypes of the registered source columns with known types."""
+        return self.get_schema().dtypes
+
+    @contextmanager
+    def batch(self) -> Iterator["ExtractedDataDirectory"]:
+        """Write the metadata and commit the changes once, at the end of a block."""
+        if self._metadata.in_batch:
+            yield self
+            return
 
+        sources, columns = set(self["sources"]), set(self["columns"])
+        try:
+            with super().batch():
+                yield self
+        finally:
+            changes = [
+                ("Added source", set(self["sources"]) - sources),
+                ("Removed source", sources - set(self["sources"])),
+                ("Added source column", set(self["columns"]) - columns),
+            ]
+            message = " ".join(
+                f"{change}{'s' if len(names) > 1 else ''} {', '.join(sorted(names))}."
+                for change, names in changes
+                if names
+            )
+            if message:
+                self._commit(message)
+
+    def _commit(self, message: str):
+        if self._metadata.in_batch:
+            # Committed when the batch ends.
+            return
         repo = Repo(self.path)
+        _ignore_steamfitter_files(repo)
         repo.git.add(".")
-        repo.index.commit(f"Added source column {source_column_name}.")
+        repo.index.commit(message)
 
     @classmethod
     def add_initial_content(cls, path: Path, **kwargs):
@@ -148,3 +265,30 @@ class ExtractedDataDirectory(Directory):
 
         repo.git.add(".")
         repo.index.commit("Initial commit.")
+
+
+def _ignore_steamfitter_files(repo: Repo):
+    """Ignore steamfitter's files in repositories created before they existed.
+
+    Missing entries are added to the ``.gitignore``, and copies that were already
+    committed are removed from the index (but not from disk).
+
+    """
+    gitignore_path = Path(repo.working_tree_dir) / ".gitignore"
+    content = gitignore_path.read_text() if gitignore_path.exists() else ""
+    ignored = set(content.splitlines())
+    missing = [name for name in _IGNORED_FILE_NAMES if name not in ignored]
+    if missing:
+        with open(gitignore_path, "a") as f:
+            if content and not content.endswith("\n"):
+                f.write("\n")
+            f.write("\n# steamfitter files\n" + "".join(f"{name}\n" for name in missing))
+
+    tracked_ignored = repo.git.ls_files("--cached", "--ignored", "--exclude-standard")
+    tracked = [
+        path
+        for path in tracked_ignored.splitlines()
+        if Path(path).name in _IGNORED_FILE_NAMES
+    ]
+    if tracked:
+        repo.git.rm("--cached", "--quiet", "--", *tracked)
@@ -12,23 +12,17 @@ versions of the results of a data cleaning step, a feature engineering step, or
 machine learning model.
 
 """
-from steamfitter.app.directory_structure.version import VersionDirectory
-from steamfitter.lib.filesystem import ARCHIVE_POLICIES, Directory
+from steamfitter.app.directory_structure.version import VersionedDirectory
+from steamfitter.lib.filesystem import Directory
 
 
-class ModelingStageDirectory(Directory):
-    DEFAULT_ARCHIVE_POLICY = ARCHIVE_POLICIES.archive
-
-    DEFAULT_EMPTY_ARGS = {
-        ("last_updated", lambda: ""),
-        ("latest_version", lambda: ""),
-        ("best_version", lambda: ""),
-    }
-
-    SUBDIRECTORY_TYPES = (VersionDirectory,)
+class ModelingStageDirectory(VersionedDirectory):
+    __slots__ = ()
 
 
 class ModelingDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
 
     NAME_TEMPLATE = "modeling"
@@ -9,23 +9,17 @@ been processed where a measure is a domain-specific term for a type of data. For
 in a project that processes data from a hospital, a measure might be "daily admissions".
 
 """
-from steamfitter.app.directory_structure.version import VersionDirectory
-from steamfitter.lib.filesystem import ARCHIVE_POLICIES, Directory
+from steamfitter.app.directory_structure.version import VersionedDirectory
+from steamfitter.lib.filesystem import Directory
 
 
-class ProcessedMeasureDirectory(Directory):
-    DEFAULT_ARCHIVE_POLICY = ARCHIVE_POLICIES.archive
-
-    DEFAULT_EMPTY_ARGS = {
-        ("last_updated", lambda: ""),
-        ("latest_version", lambda: ""),
-        ("best_version", lambda: ""),
-    }
-
-    SUBDIRECTORY_TYPES = (VersionDirectory,)
+class ProcessedMeasureDirectory(VersionedDirectory):
+    __slots__ = ()
 
 
 class ProcessedDataDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
 
     NAME_TEMPLATE = "processed_data"
@@ -7,15 +7,47 @@ A project is the coarsest level of organization in steamfitter and represents a
 of data sources and models aimed at a particular business problem, grant, or other
 initiative. A project directory contains a data directory and a modeling directory.
 
+Stale versions, those that are neither the best nor the latest version, are cleaned up
+according to the archive policy of the directory holding them by
+:meth:`ProjectDirectory.apply_archive_policies`.
+
+Fully loading a large project means reading thousands of metadata files, so
+:meth:`ProjectDirectory.load` keeps a snapshot of the loaded tree in the project's
+``.steamfitter`` directory and only re-reads the directories that changed since it was
+taken.
+
 """
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
 from steamfitter.app.directory_structure.archive import ArchiveDirectory
 from steamfitter.app.directory_structure.data import DataDirectory
 from steamfitter.app.directory_structure.deliverables import DeliverablesDirectory
 from steamfitter.app.directory_structure.modeling import ModelingDirectory
-from steamfitter.lib.filesystem import Directory
+from steamfitter.app.directory_structure.version import VersionedDirectory
+from steamfitter.lib.filesystem import (
+    ARCHIVE_POLICIES,
+    ArchiveStats,
+    Catalog,
+    Directory,
+    load_snapshot,
+    load_tree,
+    save_snapshot,
+)
+from steamfitter.lib.filesystem.catalog import CATALOG_DIRECTORY
+
+SNAPSHOT_FILE_NAME = "snapshot.json"
+
+
+class ArchiveAction(NamedTuple):
+    path: Path
+    policy: str
+    stats: Optional[ArchiveStats]
 
 
 class ProjectDirectory(Directory):
+    __slots__ = ()
+
     IS_INITIAL_DIRECTORY = True
 
     SUBDIRECTORY_TYPES = (
@@ -30,32 +62,116 @@ class ProjectDirectory(Directory):
         inherited_kwargs["project_name"] = metadata_kwargs["name"]
         return inherited_kwargs
 
+    @classmethod
+    def add_initial_content(cls, path: Path, **kwargs):
+        Catalog.create(path)
+
+    @classmethod
+    def load(cls, path: Path, use_snapshot: bool = True) -> "ProjectDirectory":
+        """Fully load a project, starting from its snapshot if it has one.
+
+        The snapshot is refreshed against the filesystem, so only directories that
+        changed since it was taken are re-read, and is rewritten if anything changed.
+
+        Parameters
+        ----------
+        path
+            The root directory of the project.
+        use_snapshot
+            Whether to use the snapshot. If False, the whole tree is read from disk
+            and the snapshot is replaced.
+
+        """
+        snapshot_path = cls.get_snapshot_path(path)
+        project = load_snapshot(snapshot_path, cls) if use_snapshot else None
+        if project is not None and project.is_loaded and project._path == Path(path):
+            changed = project.refresh()
+        else:
+            project = load_tree(path, cls)
+            changed = True
+        if changed and snapshot_path.parent.exists():
+            try:
+                save_snapshot(project, snapshot_path)
+            except TypeError:
+                # Some metadata can't be snapshotted, so always read the tree from disk.
+                snapshot_path.unlink(missing_ok=True)
+        return project
+
+    @classmethod
+    def get_snapshot_path(cls, path: Path) -> Path:
+        return Path(path) / CATALOG_DIRECTORY / SNAPSHOT_FILE_NAME
+
+    @property
+    def catalog(self) -> Catalog:
+        return Catalog(self.path)
+
     @property
     def archive_directory(self) -> ArchiveDirectory:
-        if not hasattr(self, "_archive_directory"):
-            # noinspection PyAttributeOutsideInit
-            self._archive_directory = self.get_solo_directory_by_class(ArchiveDirectory)
-        return self._archive_directory
+        return self.get_solo_directory_by_class(ArchiveDirectory)
 
     @property
     def data_directory(self) -> DataDirectory:
-        if not hasattr(self, "_data_directory"):
-            # noinspection PyAttributeOutsideInit
-            self._data_directory = self.get_solo_directory_by_class(DataDirectory)
-        return self._data_directory
+        return self.get_solo_directory_by_class(DataDirectory)
 
     @property
     def deliverables_directory(self) -> DeliverablesDirectory:
-        if not hasattr(self, "_deliverables_directory"):
-            # noinspection PyAttributeOutsideInit
-            self._deliverables_directory = self.get_solo_directory_by_class(
-                DeliverablesDirectory
-            )
-        return self._deliverables_directory
+        return self.get_solo_directory_by_class(DeliverablesDirectory)
 
     @property
     def modeling_directory(self) -> ModelingDirectory:
-        if not hasattr(self, "_modeling_directory"):
-            # noinspection PyAttributeOutsideInit
-            self._modeling_directory = self.get_solo_directory_by_class(ModelingDirectory)
-        return self._modeling_directory
+        return self.get_solo_directory_by_class(ModelingDirectory)
+
+    def iter_versioned_directories(self) -> Iterator[VersionedDirectory]:
+        """Iterate over the directories holding versions, outside of the archive."""
+        stack = [d for d in self.iter_subdirectories() if not isinstance(d, ArchiveDirectory)]
+        while stack:
+            directory = stack.pop()
+            if isinstance(directory, VersionedDirectory):
+                yield directory
+            else:
+                stack.extend(directory.iter_subdirectories())
+
+    def apply_archive_policies(
+        self,
+        compression_threads: int = None,
+        dry_run: bool = False,
+    ) -> List[ArchiveAction]:
+        """Archive or delete the stale versions in the project.
+
+        Every versioned directory in the project is checked for versions that are
+        neither its best nor its latest version. These are archived into the archive
+        directory if the versioned directory has the ``archive`` policy and moved to
+        the trash if it has the ``delete`` policy. Other policies leave them alone.
+
+        Parameters
+        ----------
+        compression_threads
+            The number of threads compressing each archive. Defaults to the number
+            of CPUs.
+        dry_run
+            Only report what would be done.
+
+        Returns
+        -------
+        List[ArchiveAction]
+            The versions that were (or would be) archived or deleted, with the policy
+            applied and, for archived versions, the archive statistics.
+
+        """
+        actions = []
+        for directory in self.iter_versioned_directories():
+            policy = directory["archive_policy"]
+            if policy not in (ARCHIVE_POLICIES.archive, ARCHIVE_POLICIES.delete):
+                continue
+            for version in directory.stale_versions:
+                stats = None
+                if not dry_run and policy == ARCHIVE_POLICIES.archive:
+                    stats = self.archive_directory.archive_version(
+                        version, compression_threads
+                    )
+                elif not dry_run:
+                    type(version).remove(version.path)
+                actions.append(ArchiveAction(version.path, policy, stats))
+            if not dry_run:
+                directory.refresh(recursive=False, rescan=True)
+        return sorted(actions)
@@ -8,27 +8,151 @@ the terminal directory for most project subdirectories and is intended to provid
 consistent versioning scheme for all project subdirectories so provenance can be tracked
 and data and models can be reproduced.
 
+Directories that hold versions (extraction sources, processed measures, diagnostics and
+modeling stages) share the :class:`VersionedDirectory` base class, which tracks the
+latest and best versions and can hardlink files that are identical across versions.
+
+Data files in versions are read and written with :mod:`steamfitter.lib.io.tabular`, by
+name and without an extension, so readers don't need to know which format a version was
+written in.
+
 """
-import datetime
 from pathlib import Path
+from typing import List, Set
 
-from steamfitter.lib.filesystem import Directory
+import pandas as pd
+
+from steamfitter.lib.filesystem import (
+    ARCHIVE_POLICIES,
+    Catalog,
+    DedupStats,
+    Directory,
+    allocate_version,
+    deduplicate,
+)
+from steamfitter.lib.io import tabular
 
 
 class VersionDirectory(Directory):
+    __slots__ = ()
+
     NAME_TEMPLATE = "{launch_time}.{run_version:0>2}"
     DESCRIPTION_TEMPLATE = "Version {version} of {versionable_dir_name}."
 
     @classmethod
     def make_name(cls, root: Path, **kwargs) -> str:
-        launch_time = datetime.datetime.now().strftime("%Y_%m_%d")
-        today_runs = [
-            int(run_dir.name.split(".")[1])
-            for run_dir in root.iterdir()
-            if run_dir.name.startswith(launch_time)
-        ]
-        run_version = max(today_runs) + 1 if today_runs else 1
-        return cls.NAME_TEMPLATE.format(
-            launch_time=launch_time,
-            run_version=run_version,
+        # Claims the version, so concurrent jobs never get the same name. This happens
+        # when the creation is planned, so a version whose creation fails is skipped.
+        return allocate_version(root)
+
+    def read_data(
+        self,
+        name: str,
+        columns: List[str] = None,
+        filters: tabular.Filters = None,
+        memory_map: bool = True,
+    ) -> pd.DataFrame:
+        """Read a data file in this version.
+
+        See :func:`steamfitter.lib.io.tabular.read`.
+
+        """
+        return tabular.read(self.path / name, columns, filters, memory_map)
+
+    def write_data(self, name: str, data: pd.DataFrame, **kwargs) -> Path:
+        """Write a data file in this version.
+
+        See :func:`steamfitter.lib.io.tabular.write`.
+
+        """
+        return tabular.write(self.path / name, data, **kwargs)
+
+
+class VersionedDirectory(Directory):
+    """Base class for directories whose subdirectories are versions."""
+
+    __slots__ = ()
+
+    DEFAULT_ARCHIVE_POLICY = ARCHIVE_POLICIES.archive
+
+    DEFAULT_EMPTY_ARGS = {
+        ("last_updated", lambda: ""),
+        ("latest_version", lambda: ""),
+        ("best_version", lambda: ""),
+    }
+
+    SUBDIRECTORY_TYPES = (VersionDirectory,)
+
+    @property
+    def versions(self) -> List[VersionDirectory]:
+        """The version directories, excluding links such as ``best`` and ``latest``."""
+        return sorted(
+            (
+                v
+                for v in self.iter_subdirectories(VersionDirectory)
+                if not v._path.is_symlink()
+            ),
+            key=lambda v: v["name"],
+        )
+
+    @property
+    def protected_versions(self) -> Set[str]:
+        """Names of versions that are marked best or latest and must be kept.
+
+        If no version is marked latest, the newest version is protected instead.
+
+        """
+        protected = {self["best_version"], self["latest_version"]}
+        has_latest = bool(self["latest_version"])
+        for version in self.iter_subdirectories(VersionDirectory):
+            if version._path.is_symlink():
+                protected.add(version._path.resolve().name)
+                has_latest |= version._path.name == "latest"
+        if not has_latest:
+            protected.add(max((v["name"] for v in self.versions), default=""))
+        return protected - {""}
+
+    @property
+    def stale_versions(self) -> List[VersionDirectory]:
+        """Versions that are not protected."""
+        protected = self.protected_versions
+        return [v for v in self.versions if v["name"] not in protected]
+
+    def get_version(self, version: str = None) -> VersionDirectory:
+        """Return a version by name, or the best version, or else the latest one.
+
+        Raises
+        ------
+        KeyError
+            If the version does not exist, or there are no versions.
+
+        """
+        versions = {v["name"]: v for v in self.versions}
+        if version is None:
+            version = (
+                self["best_version"] or self["latest_version"] or max(versions, default="")
+            )
+        if version not in versions:
+            raise KeyError(f"{self.path} has no version {version}.")
+        return versions[version]
+
+    def read_data(self, name: str, version: str = None, **kwargs) -> pd.DataFrame:
+        """Read a data file from a version, by default the best or else the latest.
+
+        See :func:`steamfitter.lib.io.tabular.read` for the keyword arguments.
+
+        """
+        return self.get_version(version).read_data(name, **kwargs)
+
+    def deduplicate(self, dry_run: bool = False) -> DedupStats:
+        """Replace files that are identical across versions with hardlinks.
+
+        The copy in the oldest version is kept. See
+        :func:`steamfitter.lib.filesystem.dedup.deduplicate`.
+
+        """
+        return deduplicate(
+            [v.path for v in self.versions],
+            catalog=Catalog.find(self.path),
+            dry_run=dry_run,
         )
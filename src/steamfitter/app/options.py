@@ -8,6 +8,9 @@ This module contains shared options for the steamfitter CLI.
 """
 import click
 
+from steamfitter.lib import io
+from steamfitter.lib.io import tabular
+
 project_name = click.option(
     "--project-name",
     "-P",
@@ -46,3 +49,56 @@ default_project_name = click.option(
     default=None,
     help="The name of the default project.",
 )
+dry_run = click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Report what would be done without changing anything.",
+)
+compression_threads = click.option(
+    "--compression-threads",
+    "-t",
+    type=int,
+    default=None,
+    help="The number of threads used to compress archives. Defaults to the number of CPUs.",
+)
+full_rescan = click.option(
+    "--full",
+    is_flag=True,
+    help="Rescan every directory rather than only those that changed.",
+)
+depth = click.option(
+    "--depth",
+    "-d",
+    type=int,
+    default=None,
+    help="Only show directories up to this many levels below the project.",
+)
+metadata_format = click.option(
+    "--format",
+    "-f",
+    "metadata_format",
+    type=click.Choice(list(io.BACKENDS)),
+    required=True,
+    help="The format to store metadata in.",
+)
+file_name = click.option(
+    "--file",
+    "-F",
+    "file_name",
+    default="raw_data.csv",
+    show_default=True,
+    help="The name of the file in the version.",
+)
+version = click.option(
+    "--version",
+    "-V",
+    default=None,
+    help="The version to use. Defaults to the best or else the latest version.",
+)
+chunk_size = click.option(
+    "--chunk-size",
+    type=int,
+    default=tabular.DEFAULT_CHUNK_SIZE,
+    show_default=True,
+    help="The number of rows held in memory at a time.",
+)
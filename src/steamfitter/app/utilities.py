@@ -50,7 +50,7 @@ def get_project_directory(project_name: str = None) -> ProjectDirectory:
 
     project_name = inflection.dasherize(project_name.replace(" ", "_").lower())
 
-    return ProjectDirectory(config.projects_root / project_name)
+    return ProjectDirectory(config.projects_root / project_name, lazy=True)
 
 
 def clean_string(raw_string: str) -> str:
@@ -7,6 +7,7 @@ from loguru import logger
 
 from steamfitter.lib import paths
 from steamfitter.lib.cli_tools import Metadata
+from steamfitter.lib.filesystem import allocate_version
 from steamfitter.lib.shell_tools import mkdir
 
 
@@ -25,17 +26,14 @@ def get_run_directory(output_root: Union[str, Path]) -> Path:
     output_root
         The root directory for all outputs.
 
+    Notes
+    -----
+    The version is claimed when this is called, so concurrent runs always get
+    different directories even before they are created.
+
     """
     output_root = Path(output_root).resolve()
-    launch_time = datetime.datetime.now().strftime("%Y_%m_%d")
-    today_runs = [
-        int(run_dir.name.split(".")[1])
-        for run_dir in output_root.iterdir()
-        if run_dir.name.startswith(launch_time)
-    ]
-    run_version = max(today_runs) + 1 if today_runs else 1
-    datetime_dir = output_root / f"{launch_time}.{run_version:0>2}"
-    return datetime_dir
+    return output_root / allocate_version(output_root)
 
 
 def get_last_stage_directory(
@@ -1,3 +1,28 @@
-from steamfitter.lib.filesystem.archive import ARCHIVE_POLICIES
-from steamfitter.lib.filesystem.directory import Directory, SteamfitterDirectoryError
-from steamfitter.lib.filesystem.metadata import Metadata
+from steamfitter.lib.filesystem.archive import (
+    ARCHIVE_POLICIES,
+    ArchiveStats,
+    archive_directory,
+    extract_member,
+    read_member,
+    restore_archive,
+)
+from steamfitter.lib.filesystem.catalog import Catalog
+from steamfitter.lib.filesystem.dedup import DedupStats, deduplicate
+from steamfitter.lib.filesystem.directory import (
+    Directory,
+    SteamfitterDirectoryError,
+    get_directory_class,
+)
+from steamfitter.lib.filesystem.metadata import METADATA_CACHE, Metadata
+from steamfitter.lib.filesystem.provenance import LineageEntry, resolve_lineage
+from steamfitter.lib.filesystem.snapshot import load_snapshot, save_snapshot
+from steamfitter.lib.filesystem.trash import (
+    find_trash_root,
+    get_trash_root,
+    move_to_trash,
+    reap,
+)
+from steamfitter.lib.filesystem.tree import load_tree
+from steamfitter.lib.filesystem.usage import DiskUsage, disk_usage, format_size
+from steamfitter.lib.filesystem.versions import allocate_version
+from steamfitter.lib.filesystem.watch import TreeWatcher, inotify_available
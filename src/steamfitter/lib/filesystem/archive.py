@@ -1,4 +1,42 @@
-from typing import NamedTuple
+"""
+=======
+Archive
+=======
+
+Archive policies and compressed archives of directories.
+
+Every steamfitter directory records an ``archive_policy`` describing what should happen
+to stale versions of its data. Directories that are archived are streamed into a
+``.tar.gz`` file by :func:`archive_directory` without ever staging a copy on disk.
+
+The gzip stream is written as a sequence of independently compressed frames, each a
+complete gzip member, so the frames can be compressed in parallel. Multi-member gzip
+files are part of the gzip standard and can be read by ``tar``, ``gzip`` and Python's
+:mod:`tarfile` as usual (though not by its single-member ``r|gz`` streaming mode).
+
+Alongside each archive, a small JSON index records where every frame starts in both the
+compressed and uncompressed streams and where the data of every file starts in the
+uncompressed tar stream. With it, :func:`read_member` and :func:`extract_member` can
+pull a single file out of an archive by decompressing only the frames that hold it, and
+:func:`restore_archive` can decompress all the frames of an archive in parallel. Files
+hardlinked to a file earlier in the archive, such as those left by
+:mod:`~steamfitter.lib.filesystem.dedup`, are stored once and share its index entry.
+
+"""
+import bisect
+import gzip
+import json
+import os
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, NamedTuple, Tuple, Union
+
+# Size of the uncompressed data in each independently compressed frame.
+FRAME_SIZE = 4 * 1024**2
+INDEX_SUFFIX = ".index.json"
+INDEX_FORMAT_VERSION = 1
 
 
 class __Policies(NamedTuple):
@@ -10,3 +48,378 @@ class __Policies(NamedTuple):
 
 
 ARCHIVE_POLICIES = __Policies(*__Policies._fields)
+
+
+class ArchiveStats(NamedTuple):
+    file_count: int
+    data_size: int
+    archive_size: int
+
+
+class _ParallelGzipWriter:
+    """A write-only file object that gzip-compresses fixed size frames in parallel."""
+
+    def __init__(
+        self,
+        output: BinaryIO,
+        threads: int,
+        compression_level: int,
+        frame_size: int = FRAME_SIZE,
+    ):
+        self._output = output
+        self._frame_size = frame_size
+        self._compression_level = compression_level
+        self._buffer = bytearray()
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        # Bound the number of frames in memory at once.
+        self._max_pending = 2 * threads
+        self._pending: Deque = deque()
+        self._compressed_offset = 0
+        self._uncompressed_offset = 0
+        # (compressed offset, uncompressed offset) of the start of each frame.
+        self.frames: List[Tuple[int, int]] = []
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        while len(self._buffer) >= self._frame_size:
+            self._submit(bytes(self._buffer[: self._frame_size]))
+            del self._buffer[: self._frame_size]
+        return len(data)
+
+    @property
+    def compressed_size(self) -> int:
+        return self._compressed_offset
+
+    def _submit(self, frame: bytes) -> None:
+        while len(self._pending) >= self._max_pending:
+            self._write_next()
+        future = self._pool.submit(gzip.compress, frame, self._compression_level, mtime=0)
+        self._pending.append((future, len(frame)))
+
+    def _write_next(self) -> None:
+        future, frame_size = self._pending.popleft()
+        compressed = future.result()
+        self._output.write(compressed)
+        self.frames.append((self._compressed_offset, self._uncompressed_offset))
+        self._compressed_offset += len(compressed)
+        self._uncompressed_offset += frame_size
+
+    def close(self) -> None:
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._write_next()
+        finally:
+            self._pool.shutdown()
+
+
+def archive_directory(
+    source: Union[str, Path],
+    archive_path: Union[str, Path],
+    compression_threads: int = None,
+    compression_level: int = 6,
+    frame_size: int = FRAME_SIZE,
+) -> ArchiveStats:
+    """Stream a directory into a compressed tar archive.
+
+    The archive is written to a temporary file next to ``archive_path`` and moved
+    into place once it is complete, so a partial archive is never visible. Its index
+    is written next to it, see :func:`get_index_path`.
+
+    Parameters
+    ----------
+    source
+        The directory to archive. Paths in the archive are relative to its parent, so
+        the archive unpacks into a directory with the same name.
+    archive_path
+        Where to write the archive.
+    compression_threads
+        The number of threads compressing data. Defaults to the number of CPUs.
+    compression_level
+        The gzip compression level.
+    frame_size
+        The amount of uncompressed data in each independently compressed frame. This
+        is the most data that must be decompressed to read any part of a file.
+
+    Returns
+    -------
+    ArchiveStats
+        The number of files and bytes archived and the size of the archive.
+
+    Raises
+    ------
+    FileExistsError
+        If the archive already exists.
+
+    """
+    source = Path(source)
+    archive_path = Path(archive_path)
+    if archive_path.exists():
+        raise FileExistsError(f"Archive {archive_path} already exists.")
+    compression_threads = compression_threads or os.cpu_count() or 1
+
+    file_count, data_size = 0, 0
+    # Uncompressed offset and size of the data of each file in the tar stream.
+    members: Dict[str, Tuple[int, int]] = {}
+    partial_path = archive_path.with_name(f".{archive_path.name}.partial")
+    index_path = get_index_path(archive_path)
+    try:
+        with partial_path.open("wb") as output:
+            writer = _ParallelGzipWriter(
+                output, compression_threads, compression_level, frame_size
+            )
+            try:
+                with tarfile.open(fileobj=writer, mode="w|") as tar:
+                    for path in _walk(source):
+                        info = tar.gettarinfo(str(path), arcname=_arcname(source, path))
+                        if info.isfile():
+                            with path.open("rb") as f:
+                                tar.addfile(info, f)
+                            # File data is padded to a whole number of blocks.
+                            padded_size = (
+                                -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                            )
+                            members[info.name] = (tar.offset - padded_size, info.size)
+                            file_count += 1
+                            data_size += info.size
+                        elif info.islnk():
+                            # A hardlink to a file earlier in the archive, whose data
+                            # is only stored once.
+                            tar.addfile(info)
+                            members[info.name] = members[info.linkname]
+                            file_count += 1
+                        else:
+                            tar.addfile(info)
+            finally:
+                writer.close()
+        index = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "compressed_size": writer.compressed_size,
+            "frames": writer.frames,
+            "members": members,
+        }
+        with index_path.open("w") as f:
+            json.dump(index, f)
+        os.replace(partial_path, archive_path)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        index_path.unlink(missing_ok=True)
+        raise
+
+    return ArchiveStats(file_count, data_size, archive_path.stat().st_size)
+
+
+def get_index_path(archive_path: Union[str, Path]) -> Path:
+    """Return the path of the index of an archive."""
+    archive_path = Path(archive_path)
+    return archive_path.with_name(f"{archive_path.name}{INDEX_SUFFIX}")
+
+
+def load_index(archive_path: Union[str, Path]) -> Dict[str, Any]:
+    """Load the index of an archive.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the archive has no index, e.g. because it was not written by
+        :func:`archive_directory`.
+
+    """
+    with get_index_path(archive_path).open() as f:
+        return json.load(f)
+
+
+def list_members(archive_path: Union[str, Path]) -> List[str]:
+    """Return the names of the files in an archive, without reading the archive."""
+    return sorted(load_index(archive_path)["members"])
+
+
+def read_member(archive_path: Union[str, Path], member: str) -> bytes:
+    """Read a single file from an archive.
+
+    Only the frames of the archive that contain the file are read and decompressed.
+
+    Parameters
+    ----------
+    archive_path
+        The archive to read from.
+    member
+        The name of the file in the archive, e.g. ``2023_01_01.01/data.csv``.
+
+    Returns
+    -------
+    bytes
+        The contents of the file.
+
+    Raises
+    ------
+    KeyError
+        If the file is not in the archive.
+
+    """
+    return b"".join(_iter_member(archive_path, member))
+
+
+def extract_member(
+    archive_path: Union[str, Path],
+    member: str,
+    destination: Union[str, Path],
+) -> Path:
+    """Extract a single file from an archive to a path.
+
+    Like :func:`read_member`, but streams the file to disk so it never needs to fit
+    in memory.
+
+    Returns
+    -------
+    Path
+        The path of the extracted file.
+
+    """
+    destination = Path(destination)
+    with destination.open("wb") as f:
+        for chunk in _iter_member(archive_path, member):
+            f.write(chunk)
+    return destination
+
+
+def restore_archive(
+    archive_path: Union[str, Path],
+    destination: Union[str, Path],
+    decompression_threads: int = None,
+) -> None:
+    """Extract a whole archive, decompressing its frames in parallel.
+
+    Parameters
+    ----------
+    archive_path
+        The archive to extract.
+    destination
+        The directory to extract into. The archived directory is recreated inside it.
+    decompression_threads
+        The number of threads decompressing data. Defaults to the number of CPUs.
+
+    """
+    archive_path = Path(archive_path)
+    decompression_threads = decompression_threads or os.cpu_count() or 1
+    try:
+        frames = _frame_ranges(load_index(archive_path))
+    except FileNotFoundError:
+        # Not one of ours, so we can't split it up.
+        frames = None
+
+    if frames is None:
+        with tarfile.open(archive_path, mode="r:*") as tar:
+            _extract_all(tar, destination)
+        return
+
+    with archive_path.open("rb") as f:
+        reader = _ParallelGzipReader(f, frames, decompression_threads)
+        try:
+            with tarfile.open(fileobj=reader, mode="r|") as tar:
+                _extract_all(tar, destination)
+        finally:
+            reader.close()
+
+
+class _Frame(NamedTuple):
+    compressed_offset: int
+    compressed_size: int
+    uncompressed_offset: int
+
+
+def _frame_ranges(index: Dict[str, Any]) -> List[_Frame]:
+    offsets = [frame[0] for frame in index["frames"]] + [index["compressed_size"]]
+    return [
+        _Frame(compressed_offset, offsets[i + 1] - compressed_offset, uncompressed_offset)
+        for i, (compressed_offset, uncompressed_offset) in enumerate(index["frames"])
+    ]
+
+
+def _read_frame(f: BinaryIO, frame: _Frame) -> bytes:
+    f.seek(frame.compressed_offset)
+    return gzip.decompress(f.read(frame.compressed_size))
+
+
+def _iter_member(archive_path: Union[str, Path], member: str) -> Iterator[bytes]:
+    """Yield the contents of a file in an archive, one frame at a time."""
+    index = load_index(archive_path)
+    if member not in index["members"]:
+        raise KeyError(f"{member} is not in archive {archive_path}.")
+    start, size = index["members"][member]
+    end = start + size
+    frames = _frame_ranges(index)
+    uncompressed_offsets = [frame.uncompressed_offset for frame in frames]
+    first = bisect.bisect_right(uncompressed_offsets, start) - 1
+
+    with Path(archive_path).open("rb") as f:
+        for frame in frames[first:]:
+            if frame.uncompressed_offset >= end:
+                break
+            data = _read_frame(f, frame)
+            yield data[
+                max(start - frame.uncompressed_offset, 0) : end - frame.uncompressed_offset
+            ]
+
+
+class _ParallelGzipReader:
+    """A read-only file object that decompresses the frames of an archive in parallel."""
+
+    def __init__(self, f: BinaryIO, frames: List[_Frame], threads: int):
+        self._f = f
+        self._frames = iter(frames)
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        # Bound the number of frames in memory at once.
+        self._max_pending = 2 * threads
+        self._pending: Deque = deque()
+        self._buffer = b""
+        self._position = 0
+        self._fill()
+
+    def _fill(self) -> None:
+        while len(self._pending) < self._max_pending:
+            frame = next(self._frames, None)
+            if frame is None:
+                break
+            # Reads are sequential and cheap, decompression is the expensive part.
+            self._f.seek(frame.compressed_offset)
+            compressed = self._f.read(frame.compressed_size)
+            self._pending.append(self._pool.submit(gzip.decompress, compressed))
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self._buffer) - self._position < size) and self._pending:
+            self._buffer = self._buffer[self._position :] + self._pending.popleft().result()
+            self._position = 0
+            self._fill()
+        end = len(self._buffer) if size < 0 else self._position + size
+        data = self._buffer[self._position : end]
+        self._position += len(data)
+        return data
+
+    def close(self) -> None:
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown()
+
+
+def _extract_all(tar: tarfile.TarFile, destination: Union[str, Path]) -> None:
+    if hasattr(tarfile, "tar_filter"):
+        tar.extractall(destination, filter="tar")
+    else:
+        tar.extractall(destination)
+
+
+def _walk(source: Path):
+    """Yield a directory and everything below it, parents before children."""
+    yield source
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(dirnames + filenames):
+            yield Path(dirpath) / name
+
+
+def _arcname(source: Path, path: Path) -> str:
+    return str(Path(source.name) / path.relative_to(source))
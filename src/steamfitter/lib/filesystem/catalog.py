@@ -0,0 +1,489 @@
+"""
+=======
+Catalog
+=======
+
+A per-project SQLite index of steamfitter managed directories.
+
+The catalog lives at ``.steamfitter/catalog.sqlite`` under the project root and holds one
+row per managed directory with its type, class, parent, name and a handful of commonly
+queried metadata fields, alongside a JSON copy of its full metadata. It is kept up to date
+by writing through from :meth:`Directory.create <steamfitter.lib.filesystem.Directory.create>`,
+:meth:`Directory.remove <steamfitter.lib.filesystem.Directory.remove>` and
+:meth:`Metadata.persist <steamfitter.lib.filesystem.Metadata.persist>`, so questions like
+"which versions exist for this source" can be answered with a single indexed query
+rather than by loading the project tree from disk.
+
+If the catalog falls out of sync with the filesystem (e.g. because directories were
+edited by hand), :meth:`Catalog.rebuild` recreates it from disk.
+
+The catalog also caches the disk usage of every directory in the project, managed or
+not, so :func:`steamfitter.lib.filesystem.usage.disk_usage` only needs to rescan the
+directories that changed since it last ran, and the content hashes of files checked by
+:func:`steamfitter.lib.filesystem.dedup.deduplicate`.
+
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from steamfitter.lib.shell_tools import mkdir
+
+CATALOG_DIRECTORY = ".steamfitter"
+CATALOG_FILE_NAME = "catalog.sqlite"
+
+# Metadata fields stored in their own columns so they can be filtered on.
+INDEXED_FIELDS = (
+    "name",
+    "directory_type",
+    "directory_class",
+    "archive_policy",
+    "last_updated",
+    "latest_version",
+    "best_version",
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    {", ".join(f"{field} TEXT" for field in INDEXED_FIELDS)},
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+CREATE INDEX IF NOT EXISTS directories_type ON directories (directory_type, name);
+CREATE TABLE IF NOT EXISTS usage (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    subdirectories TEXT NOT NULL,
+    links TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (device, inode)
+);
+"""
+
+# The project root, or None if there is no catalog, of recently looked up directories,
+# along with when it was looked up. Cached roots are trusted for as long as their catalog
+# exists. Missing catalogs are only trusted for a short time, so catalogs created by
+# other processes are found.
+_PROJECT_ROOTS: "OrderedDict[Path, Tuple[Optional[Path], float]]" = OrderedDict()
+_PROJECT_ROOTS_SIZE = 4096
+_MISSING_CATALOG_TTL = 5.0
+_PROJECT_ROOTS_LOCK = threading.Lock()
+
+
+class Catalog:
+    """An index of the steamfitter managed directories in a project."""
+
+    def __init__(self, project_root: Union[str, Path]):
+        self.project_root = Path(project_root)
+        self.path = self.project_root / CATALOG_DIRECTORY / CATALOG_FILE_NAME
+
+    @classmethod
+    def create(cls, project_root: Union[str, Path], exists_ok: bool = False) -> "Catalog":
+        """Create an empty catalog for a project.
+
+        Parameters
+        ----------
+        project_root
+            The root directory of the project.
+        exists_ok
+            Whether to raise an error if the catalog already exists.
+
+        Returns
+        -------
+        Catalog
+            The new catalog.
+
+        Raises
+        ------
+        FileExistsError
+            If the catalog already exists and `exists_ok` is False.
+
+        """
+        catalog = cls(project_root)
+        if catalog.path.exists() and not exists_ok:
+            raise FileExistsError(f"Catalog {catalog.path} already exists.")
+        mkdir(catalog.path.parent, exists_ok=True)
+        with catalog._connect() as connection:
+            connection.executescript(_SCHEMA)
+        # Directories at or below the root that were looked up before now belong to it.
+        with _PROJECT_ROOTS_LOCK:
+            for path in list(_PROJECT_ROOTS):
+                if path == catalog.project_root or catalog.project_root in path.parents:
+                    del _PROJECT_ROOTS[path]
+        _cache_project_root([catalog.project_root], catalog.project_root, time.monotonic())
+        return catalog
+
+    @classmethod
+    def find(cls, path: Union[str, Path]) -> Optional["Catalog"]:
+        """Find the catalog of the project containing a path, if there is one."""
+        path = Path(path)
+        project_root, looked_up = None, time.monotonic()
+        checked = []
+        for candidate in (path, *path.parents):
+            cached = _get_cached_project_root(candidate)
+            if cached is not None:
+                project_root, looked_up = cached
+                break
+            checked.append(candidate)
+            if (candidate / CATALOG_DIRECTORY / CATALOG_FILE_NAME).exists():
+                project_root = candidate
+                break
+        _cache_project_root(checked, project_root, looked_up)
+        return cls(project_root) if project_root is not None else None
+
+    def exists(self) -> bool:
+        """Check if the catalog file exists."""
+        return self.path.exists()
+
+    def unregister(self) -> None:
+        """Stop treating the project root as known, e.g. after the project is removed."""
+        with _PROJECT_ROOTS_LOCK:
+            for path, (project_root, _) in list(_PROJECT_ROOTS.items()):
+                if project_root == self.project_root:
+                    del _PROJECT_ROOTS[path]
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection and commit on success."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as connection:
+            connection.row_factory = sqlite3.Row
+            with connection:
+                yield connection
+
+    #################
+    # Write-through #
+    #################
+
+    def record(self, metadata: Dict[str, Any]) -> None:
+        """Insert or update the row for a directory from its metadata."""
+        if "directory_type" not in metadata:
+            # Not a steamfitter managed directory, e.g. a bare run metadata file.
+            return
+        self.record_many([metadata])
+
+    def record_many(self, metadata: List[Dict[str, Any]]) -> None:
+        """Insert or update the rows for many directories in a single transaction."""
+        columns = ("path", "parent", *INDEXED_FIELDS, "metadata")
+        statement = (
+            f"INSERT OR REPLACE INTO directories ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        with self._connect() as connection:
+            connection.executemany(statement, [_to_row(m) for m in metadata])
+
+    def forget(self, path: Union[str, Path]) -> None:
+        """Remove a directory and all of its descendants from the catalog."""
+        path = str(path)
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM directories WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (path, _escape_like(path.rstrip("/")) + "/%"),
+            )
+
+    def rebuild(self, directory_tree) -> int:
+        """Replace the contents of the catalog with a loaded directory tree.
+
+        Parameters
+        ----------
+        directory_tree
+            A fully loaded :class:`Directory`, typically the project directory.
+
+        Returns
+        -------
+        int
+            The number of directories recorded.
+
+        """
+        metadata = []
+        stack = [directory_tree]
+        while stack:
+            directory = stack.pop()
+            metadata.append(directory.metadata)
+            stack.extend(directory.iter_subdirectories())
+
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+            connection.execute("DELETE FROM directories")
+        self.record_many(metadata)
+        return len(metadata)
+
+    ##############
+    # Disk usage #
+    ##############
+
+    def load_usage(self, root: Union[str, Path]) -> Dict[str, tuple]:
+        """Return the cached usage of every directory at or below a root, keyed by path.
+
+        Each value is a ``(mtime_ns, size, file_count, subdirectories, links)`` tuple
+        describing the files directly inside the directory, where `links` holds a
+        ``(device, inode, size)`` tuple for each file with more than one link. Their
+        size is not included in `size`.
+
+        """
+        root = str(root)
+        with self._connect() as connection:
+            _create_usage_table(connection)
+            rows = connection.execute(
+                "SELECT * FROM usage WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (root, _escape_like(root.rstrip("/")) + "/%"),
+            ).fetchall()
+        return {
+            row["path"]: (
+                row["mtime_ns"],
+                row["size"],
+                row["file_count"],
+                tuple(json.loads(row["subdirectories"])),
+                tuple(tuple(link) for link in json.loads(row["links"])),
+            )
+            for row in rows
+        }
+
+    def record_usage(self, root: Union[str, Path], usage: Dict[str, tuple]) -> None:
+        """Replace the cached usage of every directory at or below a root.
+
+        Parameters
+        ----------
+        root
+            The root of the directories being recorded. Cached usage for directories
+            below it that are not in `usage` is discarded.
+        usage
+            ``(mtime_ns, size, file_count, subdirectories, links)`` tuples keyed by
+            path, as returned by :meth:`load_usage`.
+
+        """
+        root = str(root)
+        with self._connect() as connection:
+            _create_usage_table(connection)
+            connection.execute(
+                "DELETE FROM usage WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (root, _escape_like(root.rstrip("/")) + "/%"),
+            )
+            connection.executemany(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        path,
+                        mtime_ns,
+                        size,
+                        file_count,
+                        json.dumps(list(subdirectories)),
+                        json.dumps(list(links)),
+                    )
+                    for path, (
+                        mtime_ns,
+                        size,
+                        file_count,
+                        subdirectories,
+                        links,
+                    ) in usage.items()
+                ],
+            )
+
+    def invalidate_usage(self, paths: Iterable[Union[str, Path]]) -> None:
+        """Force directories to be rescanned the next time their usage is computed.
+
+        Needed when files in a directory change without changing its mtime, e.g.
+        when another link to one of them is created elsewhere.
+
+        """
+        with self._connect() as connection:
+            _create_usage_table(connection)
+            connection.executemany(
+                "UPDATE usage SET mtime_ns = -1 WHERE path = ?",
+                [(str(path),) for path in paths],
+            )
+
+    ###############
+    # File hashes #
+    ###############
+
+    def load_file_hashes(
+        self, files: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], tuple]:
+        """Return the cached hashes of files.
+
+        Parameters
+        ----------
+        files
+            ``(device, inode)`` pairs identifying the files.
+
+        Returns
+        -------
+        Dict[Tuple[int, int], tuple]
+            ``(mtime_ns, size, digest)`` tuples keyed by ``(device, inode)`` for the
+            files that have a cached hash.
+
+        """
+        hashes = {}
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+            for device, inode in files:
+                row = connection.execute(
+                    "SELECT mtime_ns, size, digest FROM file_hashes "
+                    "WHERE device = ? AND inode = ?",
+                    (device, inode),
+                ).fetchone()
+                if row is not None:
+                    hashes[(device, inode)] = tuple(row)
+        return hashes
+
+    def record_file_hashes(self, hashes: Dict[Tuple[int, int], tuple]) -> None:
+        """Cache the hashes of files, as returned by :meth:`load_file_hashes`."""
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+            connection.executemany(
+                "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?)",
+                [(*key, *value) for key, value in hashes.items()],
+            )
+
+    #########
+    # Query #
+    #########
+
+    def get(self, path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """Return the metadata of the directory at a path, if it is in the catalog."""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT metadata FROM directories WHERE path = ?", (str(path),)
+            ).fetchone()
+        return json.loads(row["metadata"]) if row else None
+
+    def query(
+        self,
+        parent: Union[str, Path] = None,
+        **fields: str,
+    ) -> List[Dict[str, Any]]:
+        """Return the metadata of every directory matching the given criteria.
+
+        Parameters
+        ----------
+        parent
+            Only return direct children of this directory.
+        fields
+            Values that the indexed metadata fields must match,
+            e.g. ``directory_type="version"``.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            The metadata of the matching directories, sorted by path.
+
+        Raises
+        ------
+        ValueError
+            If a field is not indexed.
+
+        """
+        unknown_fields = set(fields).difference(INDEXED_FIELDS)
+        if unknown_fields:
+            raise ValueError(f"Cannot query on unindexed fields {sorted(unknown_fields)}.")
+
+        conditions = [f"{field} = ?" for field in fields]
+        parameters = [str(value) for value in fields.values()]
+        if parent is not None:
+            conditions.append("parent = ?")
+            parameters.append(str(parent))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT metadata FROM directories {where} ORDER BY path", parameters
+            ).fetchall()
+        return [json.loads(row["metadata"]) for row in rows]
+
+    def versions(self, parent: Union[str, Path]) -> List[str]:
+        """Return the names of the versions of a versioned directory."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT name FROM directories "
+                "WHERE parent = ? AND directory_type = 'version' ORDER BY name",
+                (str(parent),),
+            ).fetchall()
+        return [row["name"] for row in rows]
+
+    def best_versions(self, directory_type: str) -> Dict[str, str]:
+        """Return the best version of every directory of a given type, keyed by name."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT name, best_version FROM directories "
+                "WHERE directory_type = ? ORDER BY name",
+                (directory_type,),
+            ).fetchall()
+        return {row["name"]: row["best_version"] for row in rows}
+
+
+def _to_row(metadata: Dict[str, Any]) -> tuple:
+    path = Path(metadata["root"])
+    indexed = [metadata.get(field) for field in INDEXED_FIELDS]
+    indexed = [str(value) if value is not None else None for value in indexed]
+    return (
+        str(path),
+        str(path.parent),
+        *indexed,
+        json.dumps(metadata, default=str),
+    )
+
+
+def _create_usage_table(connection: sqlite3.Connection) -> None:
+    # Catalogs created before usage was tracked don't have the table yet.
+    connection.executescript(_SCHEMA)
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(usage)")}
+    if "links" not in columns:
+        # Usage cached before hardlinks were tracked counted linked files once per
+        # link, so it can't be reused.
+        connection.executescript("DROP TABLE usage;" + _SCHEMA)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _get_cached_project_root(path: Path) -> Optional[Tuple[Optional[Path], float]]:
+    """Return the cached project root of a directory and when it was looked up.
+
+    Returns None if the directory isn't cached or its cached root is no longer valid.
+
+    """
+    with _PROJECT_ROOTS_LOCK:
+        cached = _PROJECT_ROOTS.get(path)
+    if cached is None:
+        return None
+    project_root, looked_up = cached
+    if project_root is None:
+        valid = time.monotonic() - looked_up < _MISSING_CATALOG_TTL
+    else:
+        # The catalog may have been removed, e.g. by rolling back the project's creation.
+        valid = (project_root / CATALOG_DIRECTORY / CATALOG_FILE_NAME).exists()
+    with _PROJECT_ROOTS_LOCK:
+        if _PROJECT_ROOTS.get(path) == cached:
+            if valid:
+                _PROJECT_ROOTS.move_to_end(path)
+            else:
+                del _PROJECT_ROOTS[path]
+    return cached if valid else None
+
+
+def _cache_project_root(
+    paths: Iterable[Path], project_root: Optional[Path], looked_up: float
+) -> None:
+    with _PROJECT_ROOTS_LOCK:
+        for path in paths:
+            _PROJECT_ROOTS[path] = (project_root, looked_up)
+            _PROJECT_ROOTS.move_to_end(path)
+        while len(_PROJECT_ROOTS) > _PROJECT_ROOTS_SIZE:
+            _PROJECT_ROOTS.popitem(last=False)
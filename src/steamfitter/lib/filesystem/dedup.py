@@ -0,0 +1,215 @@
+"""
+=============
+Deduplication
+=============
+
+Hardlinking identical files across directories.
+
+Consecutive versions of a data source or model often contain many byte-identical
+files. :func:`deduplicate` finds them by content hash and replaces all but one copy
+with hardlinks to it, so the data is stored once while every path stays where readers
+expect it.
+
+Only files of the same size are hashed, in parallel, and hashes are cached in the
+project :class:`~steamfitter.lib.filesystem.catalog.Catalog` keyed by device and inode
+along with the file's mtime and size, so later passes only hash new or changed files.
+
+Hardlinked files share their contents, so they must not be modified in place. This
+holds for versioned data, which is written once. Metadata files, which are updated
+as a directory changes, their journals and their lock files are never linked. Nor are
+empty files, which take no space to store and are often used as locks or markers.
+
+"""
+import hashlib
+import os
+import stat
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from steamfitter.lib.filesystem.catalog import Catalog
+from steamfitter.lib.filesystem.metadata import (
+    JOURNAL_FILE_NAME,
+    LOCK_FILE_NAME,
+    METADATA_FILE_NAMES,
+)
+
+DEFAULT_MAX_WORKERS = 16
+
+_HASH_BLOCK_SIZE = 1024**2
+
+
+class DedupStats(NamedTuple):
+    files_linked: int
+    bytes_reclaimed: int
+
+
+class _File(NamedTuple):
+    path: str
+    stat: os.stat_result
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return self.stat.st_dev, self.stat.st_ino
+
+
+def deduplicate(
+    directories: Iterable[Union[str, Path]],
+    catalog: Catalog = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    dry_run: bool = False,
+) -> DedupStats:
+    """Replace identical files in a set of directories with hardlinks to one copy.
+
+    Parameters
+    ----------
+    directories
+        The directories to deduplicate across, e.g. the versions of a data source.
+        When several copies of a file exist, the one in the earliest directory (in
+        sorted path order) is kept.
+    catalog
+        A catalog to read cached hashes from and write new hashes to.
+    max_workers
+        The maximum number of threads used to hash files.
+    dry_run
+        Only report what would be reclaimed.
+
+    Returns
+    -------
+    DedupStats
+        The number of files replaced by links and the bytes freed by doing so.
+
+    """
+    files = [f for directory in sorted(map(str, directories)) for f in _walk_files(directory)]
+
+    # Files with a unique size can't have a duplicate. Files that are already linked
+    # together only need hashing once.
+    by_size: Dict[int, Dict[Tuple[int, int], _File]] = defaultdict(dict)
+    for f in files:
+        by_size[f.stat.st_size].setdefault(f.key, f)
+    candidates = {
+        key: f
+        for same_size in by_size.values()
+        if len(same_size) > 1
+        for key, f in same_size.items()
+    }
+    digests = _hash_files(candidates, catalog, max_workers)
+
+    by_digest: Dict[str, List[_File]] = defaultdict(list)
+    for f in files:
+        if f.key in digests:
+            by_digest[digests[f.key]].append(f)
+
+    files_linked, bytes_reclaimed = 0, 0
+    linked_to = set()
+    for copies in by_digest.values():
+        original = copies[0]
+        if _changed(original):
+            continue
+        # A file's other links may be outside the directories, in which case
+        # relinking it frees nothing.
+        remaining_links = defaultdict(lambda: 0)
+        for f in copies:
+            if f.key == original.key or not _can_link(original, f) or _changed(f):
+                continue
+            if not dry_run:
+                _replace_with_link(original.path, f.path)
+                linked_to.add(os.path.dirname(original.path))
+            files_linked += 1
+            remaining_links[f.key] += 1
+            if remaining_links[f.key] == f.stat.st_nlink:
+                bytes_reclaimed += f.stat.st_blocks * 512
+    if catalog is not None and linked_to:
+        # Linking to a file doesn't change the mtime of its directory, so its cached
+        # disk usage would still count the file as unlinked.
+        catalog.invalidate_usage(sorted(linked_to))
+    return DedupStats(files_linked, bytes_reclaimed)
+
+
+def _walk_files(directory: str) -> List[_File]:
+    """List the non-empty regular files below a directory, except metadata files."""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name in METADATA_FILE_NAMES or name in (JOURNAL_FILE_NAME, LOCK_FILE_NAME):
+                continue
+            path = os.path.join(dirpath, name)
+            file_stat = os.lstat(path)
+            if stat.S_ISREG(file_stat.st_mode) and file_stat.st_size:
+                files.append(_File(path, file_stat))
+    return files
+
+
+def _hash_files(
+    files: Dict[Tuple[int, int], _File],
+    catalog: Catalog,
+    max_workers: int,
+) -> Dict[Tuple[int, int], str]:
+    """Return the content hash of each file, using cached hashes where still valid."""
+    cached = catalog.load_file_hashes(files) if catalog is not None else {}
+    digests, to_hash = {}, []
+    for key, f in files.items():
+        mtime_ns, size, digest = cached.get(key, (None, None, None))
+        if mtime_ns == f.stat.st_mtime_ns and size == f.stat.st_size:
+            digests[key] = digest
+        else:
+            to_hash.append(f)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        new_digests = dict(zip([f.key for f in to_hash], pool.map(_hash_file, to_hash)))
+    digests.update(new_digests)
+
+    if catalog is not None and new_digests:
+        catalog.record_file_hashes(
+            {
+                key: (files[key].stat.st_mtime_ns, files[key].stat.st_size, digest)
+                for key, digest in new_digests.items()
+            }
+        )
+    return digests
+
+
+def _hash_file(f: _File) -> str:
+    digest = hashlib.sha256()
+    with open(f.path, "rb") as fh:
+        for block in iter(lambda: fh.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _can_link(original: _File, duplicate: _File) -> bool:
+    """Whether a duplicate can be linked to the original without changing its attributes."""
+    return (
+        original.stat.st_dev == duplicate.stat.st_dev
+        and original.stat.st_mode == duplicate.stat.st_mode
+        and original.stat.st_uid == duplicate.stat.st_uid
+        and original.stat.st_gid == duplicate.stat.st_gid
+    )
+
+
+def _changed(f: _File) -> bool:
+    """Whether a file has changed since we listed it."""
+    try:
+        current = os.lstat(f.path)
+    except FileNotFoundError:
+        return True
+    return (current.st_ino, current.st_mtime_ns, current.st_size) != (
+        f.stat.st_ino,
+        f.stat.st_mtime_ns,
+        f.stat.st_size,
+    )
+
+
+def _replace_with_link(original: str, duplicate: str) -> None:
+    """Atomically replace a file with a hardlink to another."""
+    temporary = os.path.join(
+        os.path.dirname(duplicate), f".{os.path.basename(duplicate)}.{os.getpid()}.link"
+    )
+    os.link(original, temporary)
+    try:
+        os.replace(temporary, duplicate)
+    except BaseException:
+        os.unlink(temporary)
+        raise
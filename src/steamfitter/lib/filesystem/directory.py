@@ -1,16 +1,33 @@
 from __future__ import annotations
 
+import os
 import shutil
 from collections import defaultdict
+from contextlib import contextmanager
 from importlib import import_module
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Set, Tuple, Type, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import inflection
 
 from steamfitter.lib.exceptions import SteamfitterException
 from steamfitter.lib.filesystem.archive import ARCHIVE_POLICIES
+from steamfitter.lib.filesystem.catalog import Catalog
 from steamfitter.lib.filesystem.metadata import Metadata
+from steamfitter.lib.filesystem.trash import move_to_trash
 from steamfitter.lib.shell_tools import mkdir
 
 DEFAULT_VALUE_FACTORY = Callable[[], Any]
@@ -24,8 +41,98 @@ class SteamfitterDirectoryError(SteamfitterException):
     pass
 
 
+# Maps the import path recorded in a directory's ``directory_class`` metadata field
+# to the class itself. Populated automatically as Directory subclasses are defined.
+_DIRECTORY_CLASS_REGISTRY: Dict[str, Type["Directory"]] = {}
+
+
+def get_directory_class(import_path: str) -> Type["Directory"]:
+    """Resolve a ``directory_class`` import path to a directory class.
+
+    Registered classes are resolved with a single dictionary lookup. Unregistered
+    classes are imported, which registers them as a side effect.
+
+    Parameters
+    ----------
+    import_path
+        The fully qualified import path of the directory class.
+
+    Returns
+    -------
+    Type[Directory]
+        The directory class.
+
+    """
+    try:
+        return _DIRECTORY_CLASS_REGISTRY[import_path]
+    except KeyError:
+        module_path, _, class_name = import_path.rpartition(".")
+        directory_class = getattr(import_module(module_path), class_name)
+        _DIRECTORY_CLASS_REGISTRY[import_path] = directory_class
+        return directory_class
+
+
+class PlannedDirectory(NamedTuple):
+    """A directory that is about to be created."""
+
+    directory_class: Type["Directory"]
+    path: Path
+    metadata: Dict[str, Any]
+    creation_args: Dict[str, Any]
+
+
+def _execute_creation_plan(plan: List[PlannedDirectory], exists_ok: bool) -> List[Metadata]:
+    """Create planned directories on disk, rolling back everything on failure."""
+    paths = [planned.path for planned in plan]
+    if len(set(paths)) != len(paths):
+        duplicates = sorted({str(p) for p in paths if paths.count(p) > 1})
+        raise SteamfitterDirectoryError(f"Directories {duplicates} are planned twice.")
+
+    created_paths, metadata_paths, metadata = [], [], []
+    try:
+        for planned in plan:
+            if planned.path.exists():
+                if not exists_ok:
+                    raise FileExistsError(f"Directory {planned.path} already exists.")
+            else:
+                mkdir(planned.path)
+                created_paths.append(planned.path)
+            metadata.append(Metadata.create(**planned.metadata))
+            metadata_paths.append(planned.path)
+            planned.directory_class.add_initial_content(planned.path, **planned.creation_args)
+    except BaseException:
+        created = set(created_paths)
+        for path in metadata_paths:
+            if path not in created:
+                Metadata.delete(path)
+        for path in reversed(created_paths):
+            shutil.rmtree(path, ignore_errors=True)
+        raise
+
+    catalogs = {}
+    for planned, directory_metadata in zip(plan, metadata):
+        catalog = Catalog.find(planned.path)
+        if catalog is not None:
+            catalogs.setdefault(catalog.project_root, (catalog, []))[1].append(
+                directory_metadata.as_dict()
+            )
+    for catalog, catalog_metadata in catalogs.values():
+        catalog.record_many(catalog_metadata)
+
+    return metadata
+
+
 class Directory:
-    """Base class for all directories in a project."""
+    """Base class for all directories in a project.
+
+    Projects can hold tens of thousands of directories, so instances are kept small:
+    attributes live in ``__slots__`` and subdirectories are held in a flat tuple.
+    Subclasses should declare ``__slots__ = ()`` so they don't reintroduce a
+    per-instance ``__dict__``.
+
+    """
+
+    __slots__ = ("_path", "_parent", "_lazy", "_metadata", "_subdirectories", "_mtime_ns")
 
     IS_INITIAL_DIRECTORY: bool = False
     DEFAULT_ARCHIVE_POLICY: bool = ARCHIVE_POLICIES.invalid
@@ -38,15 +145,72 @@ class Directory:
 
     SUBDIRECTORY_TYPES: Tuple[Type[Directory], ...] = ()
 
-    def __init__(self, path: Path, parent: DirectoryType = None):
-        if not self.is_directory_type(path):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _DIRECTORY_CLASS_REGISTRY[cls.make_import_path()] = cls
+
+    def __init__(self, path: Path, parent: DirectoryType = None, lazy: bool = False):
+        try:
+            metadata = Metadata.from_directory(path)
+        except FileNotFoundError:
+            metadata = None
+        self._initialize(path, metadata, parent, lazy)
+        if not lazy:
+            self._subdirectories = self.collect_subdirectories(path)
+
+    def _initialize(
+        self,
+        path: Path,
+        metadata: Optional[Metadata],
+        parent: Optional[DirectoryType],
+        lazy: bool,
+    ) -> None:
+        if metadata is None or metadata["directory_type"] != self.make_directory_type():
             raise SteamfitterDirectoryError(
                 f"Directory {path} is not of type {self.make_directory_type()}."
             )
 
+        self._path = Path(path)
         self._parent = parent
-        self._metadata = Metadata.from_directory(path)
-        self._subdirectories = self.collect_subdirectories(path)
+        self._lazy = lazy
+        self._metadata = metadata
+        # In lazy mode, subdirectories are discovered the first time they are requested.
+        self._subdirectories: Optional[Tuple[DirectoryType, ...]] = None
+        # The directory mtime when the subdirectories were collected.
+        self._mtime_ns: Optional[int] = None
+
+    @classmethod
+    def from_metadata(
+        cls,
+        path: Path,
+        metadata: Metadata,
+        parent: DirectoryType = None,
+        lazy: bool = True,
+    ) -> DirectoryType:
+        """Build a directory from already loaded metadata.
+
+        The directory's subdirectories are not collected.
+
+        Parameters
+        ----------
+        path
+            The path to the directory.
+        metadata
+            The metadata of the directory.
+        parent
+            The parent directory, if any.
+        lazy
+            Whether subdirectories of this directory should be loaded lazily.
+
+        Returns
+        -------
+        Directory
+            The directory.
+
+        """
+        directory = cls.__new__(cls)
+        directory._initialize(path, metadata, parent, lazy)
+        return directory
 
     @classmethod
     def is_directory_type(cls, path: Path):
@@ -57,32 +221,142 @@ class Directory:
         except FileNotFoundError:
             return False
 
-    def collect_subdirectories(self, path: Path) -> Dict[str, List[DirectoryType]]:
-        """Collect all subdirectories of this directory."""
-        subdirectories = defaultdict(list)
+    def collect_subdirectories(
+        self, path: Path, existing: Dict[str, DirectoryType] = None
+    ) -> Tuple[DirectoryType, ...]:
+        """Collect all subdirectories of this directory.
+
+        Parameters
+        ----------
+        path
+            The path to this directory.
+        existing
+            Already loaded subdirectories keyed by path. These are reused as is
+            rather than being rebuilt from disk.
+
+        """
+        existing = existing if existing is not None else {}
+        self._mtime_ns = os.stat(path).st_mtime_ns
+        subdirectories = []
         for subdirectory in path.iterdir():
-            if subdirectory.is_dir():
+            if str(subdirectory) in existing:
+                subdirectories.append(existing[str(subdirectory)])
+            elif subdirectory.is_dir():
                 try:
                     subdirectory_metadata = Metadata.from_directory(subdirectory)
-                    subdirectory_type = subdirectory_metadata["directory_type"]
-                    subdirectory_import_path = subdirectory_metadata["directory_class"]
-                    module_path, _, class_name = subdirectory_import_path.rpartition(".")
-                    subdirectory_class = getattr(import_module(module_path), class_name)
-                    subdirectory = subdirectory_class(subdirectory, parent=self)
-                    subdirectories[subdirectory_type].append(subdirectory)
+                    subdirectory_class = get_directory_class(
+                        subdirectory_metadata["directory_class"]
+                    )
+                    subdirectories.append(
+                        subdirectory_class(subdirectory, parent=self, lazy=self._lazy)
+                    )
                 except FileNotFoundError:
                     pass
+        return tuple(subdirectories)
+
+    def refresh(self, recursive: bool = True, rescan: bool = False) -> bool:
+        """Bring this directory up to date with the filesystem.
+
+        The metadata is only re-read if its file changed on disk, and the
+        subdirectories are only rescanned if the directory's mtime changed, in which
+        case previously loaded subdirectories are reused. Subdirectories that have not
+        been loaded yet are left alone.
+
+        Parameters
+        ----------
+        recursive
+            Whether to also refresh loaded subdirectories.
+        rescan
+            Whether to rescan this directory's subdirectories even if its mtime is
+            unchanged, e.g. because we know it changed within the mtime resolution.
+
+        Returns
+        -------
+        bool
+            True if anything changed.
+
+        Raises
+        ------
+        FileNotFoundError
+            If this directory or its metadata file no longer exists.
+
+        """
+        changed = False
+        if Metadata.is_stale(self._path, self._metadata.signature):
+            self._metadata = Metadata.from_directory(self._path)
+            changed = True
+
+        if self._subdirectories is None:
+            return changed
+
+        existing = {str(d._path): d for d in self.iter_subdirectories()}
+        if rescan or os.stat(self._path).st_mtime_ns != self._mtime_ns:
+            self._subdirectories = self.collect_subdirectories(self._path, existing)
+            collected = {str(d._path) for d in self.iter_subdirectories()}
+            changed |= collected != set(existing)
+
+        if recursive:
+            kept = []
+            for directory in self._subdirectories:
+                if str(directory._path) not in existing:
+                    # Newly collected, so already up to date.
+                    kept.append(directory)
+                    continue
+                try:
+                    changed |= directory.refresh(recursive=True)
+                    kept.append(directory)
+                except FileNotFoundError:
+                    changed = True
+            self._subdirectories = tuple(kept)
+
+        return changed
+
+    @property
+    def subdirectories(self) -> Dict[str, List[DirectoryType]]:
+        """Return the subdirectories of this directory keyed by directory type."""
+        subdirectories = defaultdict(list)
+        for directory in self.iter_subdirectories():
+            subdirectories[directory["directory_type"]].append(directory)
         return subdirectories
 
+    @property
+    def is_loaded(self) -> bool:
+        """Return True if the subdirectories of this directory have been collected."""
+        return self._subdirectories is not None
+
+    def iter_subdirectories(
+        self, directory_class: Type[DirectoryType] = None
+    ) -> Iterator[DirectoryType]:
+        """Iterate over the subdirectories of this directory.
+
+        Parameters
+        ----------
+        directory_class
+            If provided, only subdirectories of this class are returned.
+
+        """
+        if self._subdirectories is None:
+            self._subdirectories = self.collect_subdirectories(self._path)
+        if directory_class is None:
+            yield from self._subdirectories
+        else:
+            directory_type = directory_class.make_directory_type()
+            for directory in self._subdirectories:
+                if directory["directory_type"] == directory_type:
+                    yield directory
+
     def get_solo_directory_by_class(
         self, directory_class: Type[DirectoryType]
     ) -> DirectoryType:
         """Return the directory of the given class in the current directory."""
-        directory_type = directory_class.make_directory_type()
-        directory = self._subdirectories[directory_type]
+        directory = list(self.iter_subdirectories(directory_class))
         assert len(directory) == 1
         return directory[0]
 
+    @property
+    def parent(self) -> Optional[DirectoryType]:
+        return self._parent
+
     @property
     def path(self) -> Path:
         return Path(self._metadata["root"])
@@ -103,6 +377,26 @@ class Directory:
         """Update the metadata of a directory."""
         self._metadata.update(new_metadata)
 
+    @contextmanager
+    def batch(self) -> Iterator[DirectoryType]:
+        """Write the metadata of the directory once, at the end of a block of changes.
+
+        See :meth:`Metadata.batch <steamfitter.lib.filesystem.Metadata.batch>`.
+
+        """
+        with self._metadata.batch():
+            yield self
+
+    @contextmanager
+    def locked_update(self) -> Iterator[Metadata]:
+        """Update the metadata of a directory while holding an exclusive lock on it.
+
+        See :meth:`Metadata.locked_update <steamfitter.lib.filesystem.Metadata.locked_update>`.
+
+        """
+        with self._metadata.locked_update() as metadata:
+            yield metadata
+
     def __repr__(self):
         return f"{self.__class__.__name__}(path={self.path}, metadata={self.metadata})"
 
@@ -119,6 +413,71 @@ class Directory:
         **kwargs,
     ) -> DirectoryType:
         """Create a new directory."""
+        plan = cls.plan_creation(root, **kwargs)
+        metadata = _execute_creation_plan(plan, exists_ok=exists_ok)
+        return cls.from_metadata(plan[0].path, metadata[0], parent=parent)
+
+    @staticmethod
+    def create_many(
+        specs: Iterable[Tuple[Type[DirectoryType], Path, Dict[str, Any]]],
+        exists_ok: bool = False,
+    ) -> List[DirectoryType]:
+        """Create many directories, along with their initial subdirectories, at once.
+
+        Every path and metadata payload is planned (see :meth:`plan_creation`) before
+        any directory is created. If any directory fails to be created, everything
+        created by this call is rolled back.
+
+        Parameters
+        ----------
+        specs
+            ``(directory_class, root, kwargs)`` tuples with the arguments that would
+            otherwise be passed to ``directory_class.create(root, **kwargs)``.
+        exists_ok
+            Whether to allow directories that already exist on disk.
+
+        Returns
+        -------
+        List[Directory]
+            The new directories, in the order of the specs.
+
+        Raises
+        ------
+        SteamfitterDirectoryError
+            If two specs would create the same directory.
+
+        """
+        plans = [
+            directory_class.plan_creation(root, **kwargs)
+            for directory_class, root, kwargs in specs
+        ]
+        plan = [planned for directory_plan in plans for planned in directory_plan]
+        metadata = _execute_creation_plan(plan, exists_ok=exists_ok)
+
+        directories, position = [], 0
+        for directory_plan in plans:
+            planned = directory_plan[0]
+            directories.append(
+                planned.directory_class.from_metadata(planned.path, metadata[position])
+            )
+            position += len(directory_plan)
+        return directories
+
+    @classmethod
+    def plan_creation(cls, root: Path, **kwargs) -> List["PlannedDirectory"]:
+        """Plan the creation of a directory and its initial subdirectories.
+
+        No directories are created, but :meth:`make_name` may reserve names on disk
+        (e.g. versions, see :func:`~steamfitter.lib.filesystem.versions.allocate_version`),
+        so a planned directory that is never created can leave a gap in its siblings'
+        names.
+
+        Returns
+        -------
+        List[PlannedDirectory]
+            The directories to create, parents before children.
+
+        """
         name = cls.make_name(root=root, **kwargs)
         path = root / name
 
@@ -127,47 +486,54 @@ class Directory:
             "name": name,
             "description": cls.make_description(**kwargs),
             "directory_type": cls.make_directory_type(),
-            "directory_class": f"{cls.__module__}.{cls.__name__}",
+            "directory_class": cls.make_import_path(),
             "archive_policy": kwargs.get("archive_policy", cls.DEFAULT_ARCHIVE_POLICY),
         }
         extra_fields = cls.make_extra_metadata_fields(metadata_args, **kwargs)
         metadata_args.update(extra_fields)
 
-        mkdir(path, exists_ok=exists_ok)
-
-        Metadata.create(**metadata_args)
-        cls.add_initial_content(path, **kwargs)
-
-        kwargs = cls.add_subdirectory_creation_args(metadata_args, kwargs)
-        directory = cls(path, parent=parent)
-        for subdirectory_type in directory.SUBDIRECTORY_TYPES:
+        plan = [PlannedDirectory(cls, path, metadata_args, kwargs)]
+        subdirectory_kwargs = cls.add_subdirectory_creation_args(metadata_args, {**kwargs})
+        for subdirectory_type in cls.SUBDIRECTORY_TYPES:
             if subdirectory_type.IS_INITIAL_DIRECTORY:
-                subdirectory_type.create(
-                    root=path,
-                    parent=directory,
-                    exists_ok=exists_ok,
-                    **kwargs,
-                )
-
-        return cls(path)
+                plan.extend(subdirectory_type.plan_creation(path, **subdirectory_kwargs))
+        return plan
 
     @classmethod
     def remove(cls, path: Path, safe=True, **kwargs):
-        """Rollback the creation of a directory."""
+        """Rollback the creation of a directory.
+
+        The directory is atomically moved into the trash, so this returns immediately
+        regardless of the size of the directory. Use
+        :func:`steamfitter.lib.filesystem.trash.reap` to delete it permanently.
+
+        """
         if safe:
-            instance = cls(path, **kwargs)
+            instance = cls(path, lazy=True, **kwargs)
             managed = instance["directory_type"] == cls.make_directory_type()
             if not managed:
                 raise SteamfitterDirectoryError(
                     f"Cannot remove {str(path)} because it is not managed by steamfitter."
                 )
-        shutil.rmtree(path, ignore_errors=True)
+        catalog = Catalog.find(path)
+        if Path(path).exists():
+            move_to_trash(path)
+        if catalog is not None:
+            if catalog.exists():
+                catalog.forget(path)
+            else:
+                catalog.unregister()
 
     @classmethod
     def add_subdirectory_creation_args(cls, metadata_kwargs, inherited_kwargs):
         """Add kwargs to be used in name and description templates for child directories."""
         return inherited_kwargs
 
+    @classmethod
+    def make_import_path(cls) -> str:
+        """Make the import path recorded in the ``directory_class`` metadata field."""
+        return f"{cls.__module__}.{cls.__name__}"
+
     @classmethod
     def make_directory_type(cls) -> str:
         return inflection.underscore(cls.__name__.split("Directory")[0])
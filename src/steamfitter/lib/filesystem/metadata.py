@@ -8,6 +8,10 @@ additional information beyond what the filesystem can provide and is especially
 providing information about the provenance of a project directory.
 
 Metadata is stored in a YAML file named ``metadata.yaml`` in all directories in a project.
+It may instead be stored as ``metadata.json`` or ``metadata.msgpack``, which are much
+faster to read and write for large machine-written documents; the format of each file is
+picked by its extension (see :mod:`steamfitter.lib.io`), and existing files keep their
+format when persisted.
 The information it stores is specific to the type of directory. For example, a directory
 containing a model will contain information about the model run parameters, the model run
 time, the data sources used, etc. A directory representing an extracted data source
@@ -22,24 +26,268 @@ versioned directory of an application run. It is intended to be used on director
 are created with user applications that are built on top of ``steamfitter`` such as source
 specific data extraction applications and modeling applications.
 
+Metadata files are replaced atomically when persisted, so readers never see a partially
+written file. Processes that update the same metadata concurrently (e.g. many jobs
+registering results with a shared parent directory) should do so with
+:meth:`Metadata.locked_update`, which serializes read-modify-write cycles with an
+advisory lock so no update is lost.
+
+Code that makes many changes to the same metadata in a row can wrap them in
+:meth:`Metadata.batch`, which holds back every :meth:`Metadata.persist` in the block and
+writes the file once when the block exits.
+
+Metadata classes with ``JOURNALED`` set (such as :class:`RunMetadata`, whose provenance
+grows with every stage of a pipeline) don't rewrite the whole document when persisted.
+Instead, the changes since the metadata was last read or written are appended as a single
+JSON line to a journal, ``metadata.log``, next to the metadata file. The journal is
+replayed whenever the metadata is loaded, and once it grows larger than the metadata
+file it is compacted back into it. Until then, it doubles as a timestamped record of
+every change.
+
 """
+import copy
 import datetime
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Union
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Tuple, Union
+
+from steamfitter.lib import io
+from steamfitter.lib.filesystem.catalog import Catalog
+
+FileSignature = Tuple[int, int]
+
+# Fields of a prior stage's metadata copied into the provenance references to it.
+PROVENANCE_FIELDS = ("name", "version", "run_time", "end_time", "run_time_seconds")
+
+# Metadata fields whose values repeat across most directories in a project. These, and
+# all metadata keys, are interned so every loaded directory shares one copy.
+INTERNED_FIELDS = ("directory_type", "directory_class", "archive_policy")
+
+
+# Metadata file names in the order they're looked for. New metadata files are YAML unless
+# a metadata class says otherwise.
+METADATA_FILE_NAMES = ("metadata.yaml", "metadata.json", "metadata.msgpack")
+JOURNAL_FILE_NAME = "metadata.log"
+LOCK_FILE_NAME = ".metadata.lock"
+
+# Journals are compacted once they're larger than the metadata file, or this size,
+# whichever is larger.
+JOURNAL_COMPACTION_MIN_SIZE = 64 * 1024
+
+
+def file_signature(path: Path) -> FileSignature:
+    """Return the ``(st_mtime_ns, st_size)`` signature used to detect file changes."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def metadata_signature(path: Path) -> FileSignature:
+    """Return the signature of a metadata file combined with that of its journal.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the metadata file does not exist.
+
+    """
+    mtime_ns, size = file_signature(path)
+    try:
+        journal_mtime_ns, journal_size = file_signature(path.with_name(JOURNAL_FILE_NAME))
+    except FileNotFoundError:
+        return mtime_ns, size
+    # Appending to the journal always grows it, so the combined size always changes.
+    return max(mtime_ns, journal_mtime_ns), size + journal_size
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class MetadataCache:
+    """A process-wide LRU cache of parsed metadata files.
+
+    Entries are keyed on the file path and validated against the file's
+    ``(st_mtime_ns, st_size)`` signature, so a file is parsed once and reused until
+    it changes on disk. Callers always receive a deep copy of the cached data and are
+    free to mutate it.
+
+    """
 
-from steamfitter.lib.io import yaml as io
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: Path) -> Dict:
+        """Load a metadata file, parsing it only if it changed since it was last read.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the metadata file does not exist.
+
+        """
+        return self.load_with_signature(path)[1]
+
+    def load_with_signature(self, path: Path) -> Tuple[FileSignature, Dict]:
+        """Load a metadata file along with the file signature it was validated against.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the metadata file does not exist.
+
+        """
+        key = str(path)
+        signature = metadata_signature(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return signature, copy.deepcopy(entry[1])
+            self.misses += 1
+
+        data = _intern(_load_journaled(path))
+        with self._lock:
+            self._entries[key] = (signature, copy.deepcopy(data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return signature, data
+
+    def invalidate(self, path: Path) -> None:
+        """Drop the cached entry for a metadata file, if there is one."""
+        with self._lock:
+            self._entries.pop(str(path), None)
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset the hit and miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Return the cache statistics."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+METADATA_CACHE = MetadataCache()
+
+
+def _intern(data: Dict) -> Dict:
+    """Intern the keys and frequently repeated values of a metadata dict."""
+    interned = {}
+    for key, value in data.items():
+        if isinstance(key, str):
+            key = sys.intern(key)
+        if key in INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        interned[key] = value
+    return interned
+
+
+def metadata_digest(data: Dict) -> str:
+    """Return a hash of the content of a metadata dict, whatever format it's stored in."""
+    content = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _load_journaled(path: Path) -> Dict:
+    """Load a metadata file and replay its journal, if it has one."""
+    data = io.load(path)
+    try:
+        with path.with_name(JOURNAL_FILE_NAME).open() as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The last record of a writer that crashed.
+                    continue
+                _apply_changes(data, record)
+    except FileNotFoundError:
+        pass
+    return data
+
+
+def _diff(old: Dict, new: Dict, path: Tuple = ()) -> Dict[str, list]:
+    """Return the paths set and deleted to get from one metadata dict to another."""
+    changes = {"set": [], "delete": []}
+    for key, value in new.items():
+        if key not in old:
+            changes["set"].append([[*path, key], value])
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            nested = _diff(old[key], value, (*path, key))
+            changes["set"].extend(nested["set"])
+            changes["delete"].extend(nested["delete"])
+        elif value != old[key]:
+            changes["set"].append([[*path, key], value])
+    changes["delete"].extend([*path, key] for key in old if key not in new)
+    return changes
+
+
+def _apply_changes(data: Dict, record: Dict) -> None:
+    for path, value in record["set"]:
+        *parents, key = path
+        target = data
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = value
+    for path in record["delete"]:
+        *parents, key = path
+        target = data
+        for parent in parents:
+            target = target.get(parent, {})
+        target.pop(key, None)
+
+
+class _Batch:
+    """The state of an open :meth:`Metadata.batch`."""
+
+    __slots__ = ("dirty", "lock_fd")
+
+    def __init__(self):
+        # Whether persist was called during the batch.
+        self.dirty = False
+        # The lock taken by a locked_update during the batch, held until it ends.
+        self.lock_fd: Optional[int] = None
 
 
 class Metadata:
     """An in-memory representation of a metadata file."""
 
+    __slots__ = ("_metadata", "signature", "_batch", "_journal_base")
+
     _FILE_NAME: str = "metadata.yaml"
+    _LOCK_FILE_NAME: str = LOCK_FILE_NAME
+
+    # Whether to persist changes by appending them to a journal.
+    JOURNALED: bool = False
 
     def __init__(self, metadata_dict: Dict = None, **kwargs):
         if kwargs:
             raise ValueError("The base metadata class does not accept keyword arguments.")
         self._metadata = metadata_dict if metadata_dict is not None else {}
+        # The signature of the file this metadata was loaded from, if any.
+        self.signature: Optional[FileSignature] = None
+        self._batch: Optional[_Batch] = None
+        # For journaled metadata, the metadata as last read from or written to disk.
+        self._journal_base: Optional[Dict] = None
 
     @classmethod
     def from_directory(cls, directory: Path) -> "Metadata":
@@ -56,8 +304,59 @@ class Metadata:
             The representation of the metadata file.
 
         """
-        metadata_dict = io.load(directory / cls._FILE_NAME)
-        return cls(metadata_dict)
+        # Try each format in turn rather than looking for the file first, so the usual
+        # case costs a single stat.
+        for path in cls._candidate_files(directory):
+            try:
+                signature, metadata_dict = METADATA_CACHE.load_with_signature(path)
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            raise FileNotFoundError(f"No metadata file in {directory}.")
+        metadata = cls(metadata_dict)
+        metadata.signature = signature
+        metadata._reset_journal_base()
+        return metadata
+
+    @classmethod
+    def is_stale(cls, directory: Path, signature: Optional[FileSignature]) -> bool:
+        """Return True if the metadata file in a directory no longer matches a signature.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the metadata file does not exist.
+
+        """
+        for path in cls._candidate_files(directory):
+            try:
+                return metadata_signature(path) != signature
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f"No metadata file in {directory}.")
+
+    @classmethod
+    def find_file(cls, directory: Path) -> Path:
+        """Return the path of the metadata file in a directory, whatever its format.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the directory has no metadata file.
+
+        """
+        for path in cls._candidate_files(directory):
+            if path.exists():
+                return path
+        raise FileNotFoundError(f"No metadata file in {directory}.")
+
+    @classmethod
+    def _candidate_files(cls, directory: Path) -> Iterator[Path]:
+        yield directory / cls._FILE_NAME
+        for file_name in METADATA_FILE_NAMES:
+            if file_name != cls._FILE_NAME:
+                yield directory / file_name
 
     #####################
     # Interface methods #
@@ -84,8 +383,166 @@ class Metadata:
         return self._metadata.copy()
 
     def persist(self):
-        """Persist the metadata to disk."""
-        io.dump(Path(self._metadata["root"]) / self._FILE_NAME, self._metadata, exist_ok=True)
+        """Persist the metadata to disk.
+
+        Inside a :meth:`batch`, the metadata is written when the batch ends instead.
+
+        """
+        if self._batch is not None:
+            self._batch.dirty = True
+        else:
+            self._write()
+
+    def _write(self):
+        root = Path(self._metadata["root"])
+        try:
+            metadata_path = self.find_file(root)
+        except FileNotFoundError:
+            metadata_path = root / self._FILE_NAME
+        if not (self._journal_base is not None and self._append_to_journal(metadata_path)):
+            io.dump(metadata_path, self._metadata, exist_ok=True)
+            # Everything in the journal is now in the metadata file.
+            metadata_path.with_name(JOURNAL_FILE_NAME).unlink(missing_ok=True)
+        METADATA_CACHE.invalidate(metadata_path)
+        self._reset_journal_base()
+
+        catalog = Catalog.find(root)
+        if catalog is not None:
+            catalog.record(self._metadata)
+
+    def _reset_journal_base(self) -> None:
+        if self.JOURNALED:
+            self._journal_base = copy.deepcopy(self._metadata)
+
+    def _append_to_journal(self, metadata_path: Path) -> bool:
+        """Append the changes since the metadata was last read or written to its journal.
+
+        Returns False if the changes can't be journaled and the whole metadata file must
+        be written instead.
+
+        """
+        changes = _diff(self._journal_base, self._metadata)
+        if not changes["set"] and not changes["delete"]:
+            return True
+        try:
+            record = json.dumps({"time": datetime.datetime.now().isoformat(), **changes})
+        except (TypeError, ValueError):
+            # Values JSON can't represent, e.g. dates.
+            return False
+        if {**json.loads(record), "time": None} != {**changes, "time": None}:
+            # Values JSON changes, e.g. int keys become strings and tuples become lists.
+            return False
+
+        journal_path = metadata_path.with_name(JOURNAL_FILE_NAME)
+        with self._lock():
+            if not metadata_path.exists():
+                return False
+            with journal_path.open("a") as f:
+                f.write(record + "\n")
+                journal_size = f.tell()
+            if journal_size > max(JOURNAL_COMPACTION_MIN_SIZE, metadata_path.stat().st_size):
+                # Compact what's on disk, which may include changes made by others.
+                io.dump(metadata_path, _load_journaled(metadata_path), exist_ok=True)
+                journal_path.unlink()
+        return True
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        """Hold the metadata lock, unless a locked update in this batch already does."""
+        if self._batch is not None and self._batch.lock_fd is not None:
+            yield
+            return
+        root = Path(self._metadata["root"])
+        fd = os.open(root / self._LOCK_FILE_NAME, os.O_RDWR | os.O_CREAT, 0o664)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the file releases the lock.
+            os.close(fd)
+
+    @property
+    def in_batch(self) -> bool:
+        """Whether a :meth:`batch` is open on this metadata."""
+        return self._batch is not None
+
+    @contextmanager
+    def batch(self) -> Iterator["Metadata"]:
+        """Defer persisting the metadata until the end of a block.
+
+        Every call to :meth:`persist` in the block only marks the metadata as changed,
+        and it is written once when the block exits, including when it exits with an
+        error. Batches may be nested, in which case the metadata is written when the
+        outermost one exits.
+
+        Examples
+        --------
+
+        .. code-block:: python
+
+            with metadata.batch():
+                for column in columns:
+                    metadata["columns"][column] = ...
+                    metadata.persist()  # Nothing is written yet.
+
+        """
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = batch = _Batch()
+        try:
+            yield self
+        finally:
+            self._batch = None
+            try:
+                if batch.dirty:
+                    self.persist()
+            finally:
+                if batch.lock_fd is not None:
+                    # Closing the file releases the lock.
+                    os.close(batch.lock_fd)
+
+    @contextmanager
+    def locked_update(self) -> Iterator["Metadata"]:
+        """Update the metadata while holding an exclusive lock on it.
+
+        The metadata is re-read from disk once the lock is acquired, so changes made
+        by other processes are never overwritten, and persisted when the block exits
+        without an error. Other processes calling this on the same directory wait
+        until then.
+
+        Inside a :meth:`batch`, the lock is taken by the first locked update and held
+        until the batch ends, so a run of locked updates reads and writes the file
+        once.
+
+        Examples
+        --------
+
+        .. code-block:: python
+
+            with metadata.locked_update() as md:
+                md["run_count"] += 1
+
+        """
+        with self.batch():
+            batch = self._batch
+            if batch.lock_fd is None:
+                if batch.dirty:
+                    # Write earlier changes in the batch before they're re-read.
+                    self._write()
+                    batch.dirty = False
+                root = Path(self._metadata["root"])
+                batch.lock_fd = os.open(
+                    root / self._LOCK_FILE_NAME, os.O_RDWR | os.O_CREAT, 0o664
+                )
+                fcntl.lockf(batch.lock_fd, fcntl.LOCK_EX)
+                self.signature, self._metadata = METADATA_CACHE.load_with_signature(
+                    self.find_file(root)
+                )
+                self._reset_journal_base()
+            yield self
+            self.persist()
 
     #######################
     # Metadata generation #
@@ -119,9 +576,66 @@ class Metadata:
             "root": str(root),
             **kwargs,
         }
+        for file_name in METADATA_FILE_NAMES:
+            if (root / file_name).exists():
+                raise FileExistsError(f"File {root / file_name} already exists.")
         io.dump(metadata_path, metadata_dict, exist_ok=False)
+        METADATA_CACHE.invalidate(metadata_path)
         return cls.from_directory(root)
 
+    @classmethod
+    def delete(cls, root: Path) -> None:
+        """Delete a metadata file and its journal, if they exist."""
+        for file_name in METADATA_FILE_NAMES:
+            metadata_path = root / file_name
+            metadata_path.unlink(missing_ok=True)
+            METADATA_CACHE.invalidate(metadata_path)
+        (root / JOURNAL_FILE_NAME).unlink(missing_ok=True)
+
+    @classmethod
+    def convert(cls, root: Path, file_name: str) -> Optional[Path]:
+        """Convert the metadata file in a directory to another format.
+
+        The journal, if any, is folded into the converted file.
+
+        Parameters
+        ----------
+        root
+            The directory containing the metadata file.
+        file_name
+            The new name of the metadata file, one of ``METADATA_FILE_NAMES``.
+
+        Returns
+        -------
+        Optional[Path]
+            The path of the converted file, or None if it was already in that format.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the directory has no metadata file.
+
+        """
+        if file_name not in METADATA_FILE_NAMES:
+            raise ValueError(f"Unknown metadata file name {file_name}.")
+        metadata_path = cls.find_file(root)
+        if metadata_path.name == file_name:
+            return None
+
+        new_path = root / file_name
+        fd = os.open(root / cls._LOCK_FILE_NAME, os.O_RDWR | os.O_CREAT, 0o664)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            io.dump(new_path, _load_journaled(metadata_path), exist_ok=False)
+            metadata_path.unlink()
+            (root / JOURNAL_FILE_NAME).unlink(missing_ok=True)
+        finally:
+            # Closing the file releases the lock.
+            os.close(fd)
+        METADATA_CACHE.invalidate(metadata_path)
+        METADATA_CACHE.invalidate(new_path)
+        return new_path
+
     def __repr__(self):
         return f"{self.__class__.__name__}({self._metadata})"
 
@@ -129,6 +643,10 @@ class Metadata:
 class RunMetadata(Metadata):
     """Extension of the base metadata class to store information about a tool run."""
 
+    __slots__ = ("application_name",)
+
+    JOURNALED = True
+
     def __init__(self, metadata_dict: Dict = None, application_name: str = None, **kwargs):
         if application_name is None:
             raise ValueError("RunMetadata requires an application name.")
@@ -163,11 +681,34 @@ class RunMetadata(Metadata):
         self._metadata[self.application_name].update(**new_metadata)
 
     def record_prior_stage_provenance(self, prior_stage_metadata_file: Union[str, Path]):
-        """Records provenance information from a prior stage."""
+        """Records a reference to the metadata of a prior stage.
+
+        Rather than copying the prior stage's metadata, which includes the provenance of
+        every stage before it, only a hash of its content and a few key fields are
+        recorded under ``provenance``, keyed by the prior stage's directory so the
+        reference survives the metadata file being converted to another format. The
+        full lineage of a run can be rebuilt on demand with
+        :func:`~steamfitter.lib.filesystem.provenance.resolve_lineage`.
+
+        """
         metadata_path = Path(prior_stage_metadata_file)
-        if not metadata_path.name == self._FILE_NAME:
-            raise ValueError("Can only update from `metadata.yaml` files.")
-        self.update(io.load(metadata_path))
+        if metadata_path.name not in METADATA_FILE_NAMES:
+            raise ValueError(f"Can only update from {', '.join(METADATA_FILE_NAMES)} files.")
+        metadata_path = metadata_path.resolve()
+        prior_metadata = METADATA_CACHE.load(metadata_path)
+
+        reference = {"sha256": metadata_digest(prior_metadata)}
+        reference.update(
+            {f: prior_metadata[f] for f in PROVENANCE_FIELDS if f in prior_metadata}
+        )
+        for application_name, namespace in prior_metadata.items():
+            if isinstance(namespace, dict) and "provenance" in namespace:
+                reference["application"] = application_name
+                reference.update(
+                    {f: namespace[f] for f in PROVENANCE_FIELDS if f in namespace}
+                )
+                break
+        self["provenance"][str(metadata_path.parent)] = reference
 
     def persist(self):
         """Persist the metadata to disk."""
@@ -0,0 +1,143 @@
+"""
+==========
+Provenance
+==========
+
+Rebuilding the lineage of a run from provenance references.
+
+:meth:`RunMetadata.record_prior_stage_provenance
+<steamfitter.lib.filesystem.metadata.RunMetadata.record_prior_stage_provenance>` records
+a reference to the metadata of each prior stage (its directory, a hash of its content
+and a few key fields) rather than a copy of it, so metadata files stay the same size
+however long a pipeline gets. :func:`resolve_lineage` follows those references back through
+every prior stage and returns the metadata of each one, checking along the way that it
+hasn't changed since it was referenced.
+
+Metadata files are read through the process-wide metadata cache, and content hashes are
+cached against the metadata file signatures, so resolving the lineage of several runs
+that share prior stages only reads and hashes each stage once.
+
+"""
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from steamfitter.lib.filesystem.metadata import (
+    METADATA_CACHE,
+    METADATA_FILE_NAMES,
+    FileSignature,
+    Metadata,
+    metadata_digest,
+)
+
+
+class LineageEntry(NamedTuple):
+    """A stage in the lineage of a run."""
+
+    # The metadata of the stage, or None if its metadata file no longer exists.
+    metadata: Optional[Dict]
+    # The directories of the stages it references.
+    upstream: Tuple[str, ...]
+    # Whether the stage is unchanged since every stage referencing it was recorded.
+    verified: bool
+
+
+_digests: Dict[str, Tuple[FileSignature, str]] = {}
+_digests_lock = threading.Lock()
+
+
+def resolve_lineage(path: Union[str, Path]) -> Dict[str, LineageEntry]:
+    """Rebuild the full lineage of a run from the provenance references in its metadata.
+
+    Parameters
+    ----------
+    path
+        The directory of the run, or its metadata file.
+
+    Returns
+    -------
+    Dict[str, LineageEntry]
+        Every stage in the lineage keyed by its directory, starting with the run itself
+        and then in breadth first order. Stages referenced by more than one later stage
+        appear once.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the run has no metadata file.
+
+    """
+    root = _stage_directory(Path(path).resolve())
+    root_digest, root_metadata = _load(root)
+    if root_metadata is None:
+        raise FileNotFoundError(f"No metadata file in {root}.")
+
+    loaded = {root: (root_digest, root_metadata)}
+    verified = {root: True}
+    order = [root]
+    queue: Deque[str] = deque([root])
+    while queue:
+        path = queue.popleft()
+        for upstream_path, recorded_digest in _iter_references(loaded[path][1]):
+            if upstream_path not in loaded:
+                loaded[upstream_path] = _load(upstream_path)
+                verified[upstream_path] = True
+                order.append(upstream_path)
+                if loaded[upstream_path][1] is not None:
+                    queue.append(upstream_path)
+            if loaded[upstream_path][0] != recorded_digest:
+                verified[upstream_path] = False
+
+    return {
+        path: LineageEntry(
+            metadata=loaded[path][1],
+            upstream=tuple(dict.fromkeys(p for p, _ in _iter_references(loaded[path][1]))),
+            verified=verified[path],
+        )
+        for path in order
+    }
+
+
+def _stage_directory(path: Path) -> str:
+    """Return the directory of a stage given the directory or its metadata file."""
+    return str(path.parent if path.name in METADATA_FILE_NAMES else path)
+
+
+def _load(directory: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """Load the metadata of a stage along with the hash of its content."""
+    try:
+        metadata_path = Metadata.find_file(Path(directory))
+        signature, metadata = METADATA_CACHE.load_with_signature(metadata_path)
+    except FileNotFoundError:
+        return None, None
+    path = str(metadata_path)
+    with _digests_lock:
+        cached = _digests.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1], metadata
+    digest = metadata_digest(metadata)
+    with _digests_lock:
+        _digests[path] = (signature, digest)
+    return digest, metadata
+
+
+def _iter_references(metadata: Optional[Dict]) -> Iterator[Tuple[str, str]]:
+    """Yield the directory and recorded hash of every stage a metadata dict references."""
+    if metadata is None:
+        return
+    provenances: List[Dict] = [metadata.get("provenance")]
+    provenances.extend(
+        namespace.get("provenance")
+        for namespace in metadata.values()
+        if isinstance(namespace, dict)
+    )
+    for provenance in provenances:
+        if not isinstance(provenance, dict):
+            continue
+        for path, reference in provenance.items():
+            # Older runs copied prior stages' metadata rather than referencing it.
+            if isinstance(reference, dict) and "sha256" in reference:
+                # References were once keyed by the metadata file rather than its
+                # directory.
+                yield _stage_directory(Path(path)), reference["sha256"]
@@ -0,0 +1,178 @@
+"""
+========
+Snapshot
+========
+
+Snapshots of loaded directory trees.
+
+Loading a project tree means parsing a YAML metadata file for every directory in it.
+:func:`save_snapshot` writes a whole loaded tree (directory classes, paths, metadata
+and children) to a single JSON file, and :func:`load_snapshot` rebuilds the tree from
+it without touching any metadata files. The loaded tree can then be brought up to date
+with :meth:`Directory.refresh <steamfitter.lib.filesystem.Directory.refresh>`, which
+only costs a ``stat`` of each directory and metadata file and re-reads only what
+changed since the snapshot was taken.
+
+Snapshots are a cache: they are written atomically, carry a format version, and any
+snapshot that can't be read is simply ignored. They hold only plain data, so loading one
+never runs code, even though they live in group writable project directories.
+
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Type, Union
+
+from steamfitter.lib.filesystem.directory import (
+    Directory,
+    DirectoryType,
+    get_directory_class,
+)
+from steamfitter.lib.filesystem.metadata import Metadata
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+# Directories and metadata files modified this recently may change again within the
+# resolution of their mtime, so they're always checked again after loading.
+_RACY_INTERVAL_NS = 2 * 10**9
+
+
+def save_snapshot(directory: Directory, snapshot_path: Union[str, Path]) -> int:
+    """Save a loaded directory tree to a snapshot file.
+
+    Only the parts of the tree that have been loaded are saved, so a lazily loaded
+    tree is restored with the same directories loaded.
+
+    Parameters
+    ----------
+    directory
+        The root of the tree.
+    snapshot_path
+        Where to write the snapshot.
+
+    Returns
+    -------
+    int
+        The number of directories saved.
+
+    Raises
+    ------
+    TypeError
+        If any metadata holds values that can't be represented in JSON.
+
+    """
+    snapshot_path = Path(snapshot_path)
+    racy_after_ns = time.time_ns() - _RACY_INTERVAL_NS
+
+    # One (directory class, path, parent index, metadata, metadata signature, mtime,
+    # lazy, loaded) tuple per directory, parents before children.
+    nodes: List[tuple] = []
+    stack: List[Tuple[Directory, int]] = [(directory, -1)]
+    while stack:
+        node, parent_index = stack.pop()
+        signature = node._metadata.signature
+        if signature is not None and signature[0] >= racy_after_ns:
+            signature = None
+        mtime_ns = node._mtime_ns
+        if mtime_ns is not None and mtime_ns >= racy_after_ns:
+            mtime_ns = None
+        nodes.append(
+            (
+                node.make_import_path(),
+                str(node._path),
+                parent_index,
+                node._metadata.as_dict(),
+                signature,
+                mtime_ns,
+                node._lazy,
+                node.is_loaded,
+            )
+        )
+        if node.is_loaded:
+            index = len(nodes) - 1
+            # Reversed so children come out of the stack, and the snapshot, in order.
+            stack.extend((child, index) for child in reversed(node._subdirectories))
+
+    snapshot = {"format_version": SNAPSHOT_FORMAT_VERSION, "nodes": nodes}
+    partial_path = snapshot_path.with_name(f".{snapshot_path.name}.{os.getpid()}.partial")
+    try:
+        with partial_path.open("w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(partial_path, snapshot_path)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+    return len(nodes)
+
+
+def load_snapshot(
+    snapshot_path: Union[str, Path],
+    directory_class: Type[DirectoryType] = None,
+) -> Optional[DirectoryType]:
+    """Load a directory tree from a snapshot file.
+
+    The tree is returned as it was when the snapshot was taken. Call
+    :meth:`Directory.refresh <steamfitter.lib.filesystem.Directory.refresh>` on it to
+    pick up changes made since.
+
+    Parameters
+    ----------
+    snapshot_path
+        The snapshot to load.
+    directory_class
+        The expected class of the root directory.
+
+    Returns
+    -------
+    Optional[Directory]
+        The root of the tree, or None if there is no usable snapshot.
+
+    """
+    try:
+        with Path(snapshot_path).open("rb") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Truncated, corrupt or written by an incompatible version of steamfitter.
+        return None
+    if not isinstance(snapshot, dict) or (
+        snapshot.get("format_version") != SNAPSHOT_FORMAT_VERSION
+    ):
+        return None
+
+    directories: List[Directory] = []
+    children: List[Optional[list]] = []
+    for (
+        import_path,
+        path,
+        parent_index,
+        metadata_dict,
+        signature,
+        mtime_ns,
+        lazy,
+        is_loaded,
+    ) in snapshot["nodes"]:
+        try:
+            node_class = get_directory_class(import_path)
+        except (ImportError, AttributeError):
+            return None
+        metadata = Metadata(metadata_dict)
+        metadata.signature = tuple(signature) if signature is not None else None
+        parent = directories[parent_index] if parent_index >= 0 else None
+        directory = node_class.from_metadata(Path(path), metadata, parent=parent, lazy=lazy)
+        directory._mtime_ns = mtime_ns
+        directories.append(directory)
+        children.append([] if is_loaded else None)
+        if parent is not None:
+            children[parent_index].append(directory)
+
+    for directory, directory_children in zip(directories, children):
+        if directory_children is not None:
+            directory._subdirectories = tuple(directory_children)
+
+    root = directories[0]
+    if directory_class is not None and not isinstance(root, directory_class):
+        return None
+    return root
@@ -1,7 +1,12 @@
 EXTRACTION = '''
 """Extraction template for {source_name}."""
+from pathlib import Path
+
 import click
 
+from steamfitter.app.directory_structure import ExtractedDataDirectory
+from steamfitter.lib.io import tabular
+
 def extract_data(output_root: Path):
     """Extract data from the source."""
     pass
@@ -10,35 +15,22 @@ def extract_data(output_root: Path):
 def format_data(output_root: Path):
     """Format data for use in the project."""
     # E.g.:
-    df = pd.read_csv(output_root / "raw_data.csv")
+    df = tabular.read(output_root / "raw_data.csv")
     # ... data formatting code ...
-    df.to_csv(output_root / "formatted_data.csv")
+    # Written as Parquet when pyarrow is installed, and as CSV otherwise.
+    tabular.write(output_root / "formatted_data", df)
 
 
 def validate_data(output_root: Path):
     """Validate data for use in the project."""
-    schema = [
-        # (column_name, column_type, is_nullable)
-        ("column_1", int, True),
-        ("column_2", str, True),
-        ("column_3", float, False),
-    ]
-
-    df = pd.read_csv(output_root / "formatted_data.csv")
-    extra = df.columns.difference({{column_name for column_name, _, _ in schema}})
-    missing = {{column_name for column_name, _, _ in schema}}.difference(df.columns)
-    if extra:
-        raise ValueError(f"Data contains unexpected columns: {{extra}}")
-    if missing:
-        raise ValueError(f"Data is missing columns: {{missing}}")
-
-    for column_name, column_type, is_nullable in schema:
-        if column_name not in df.columns:
-            raise ValueError(f"Column {{column_name}} not found in data.")
-        if not is_nullable and df[column_name].isnull().any():
-            raise ValueError(f"Column {{column_name}} contains null values.")
-        if df[column_name].dtype != column_type:
-            raise ValueError(f"Column {{column_name}} is not of type {{column_type}}.")
+    # Columns registered with `sf source column add`. A schema can also be built
+    # by hand with, e.g., Schema.from_columns({{"column_1": ("int", True, "")}}).
+    extracted_data_root = Path(__file__).resolve().parent.parent
+    schema = ExtractedDataDirectory(extracted_data_root, lazy=True).get_schema()
+
+    # Reads the data in chunks, so it never needs to fit in memory.
+    report = schema.validate(output_root / "formatted_data")
+    report.raise_for_errors()
 
 
 @click.command(name=extract_{source_name})
@@ -165,8 +157,15 @@ notebooks/
 
 # metadata files
 metadata.yaml
+metadata.json
+metadata.msgpack
+metadata.log
 
 # Versioned data directories
 */*/***
 
+# steamfitter bookkeeping files
+.version_counter
+.metadata.lock
+
 """
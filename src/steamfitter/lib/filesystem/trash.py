@@ -0,0 +1,164 @@
+"""
+=====
+Trash
+=====
+
+Two-phase removal of directories.
+
+Deleting a large directory tree on a network filesystem can take many minutes, so
+:meth:`Directory.remove <steamfitter.lib.filesystem.Directory.remove>` does not delete
+anything itself. Instead, :func:`move_to_trash` atomically renames the directory into a
+trash area, ``.steamfitter/trash``, at the root of the enclosing project (or next to the
+directory if it is not part of a project, as is the case for projects themselves). This
+returns immediately and removes the directory from the project's view.
+
+The contents of a trash area are deleted later by :func:`reap`, which unlinks files in
+parallel and reports its progress. Reaping only ever deletes things already in the
+trash, so an interrupted reap can safely be resumed by running it again.
+
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import tqdm
+
+from steamfitter.lib.filesystem.catalog import CATALOG_DIRECTORY
+from steamfitter.lib.filesystem.metadata import Metadata
+from steamfitter.lib.shell_tools import mkdir
+
+TRASH_DIRECTORY = "trash"
+# The directory type recorded in the metadata of project directories.
+PROJECT_DIRECTORY_TYPE = "project"
+
+DEFAULT_MAX_WORKERS = 16
+
+
+def get_trash_root(root: Union[str, Path]) -> Path:
+    """Return the trash area located at a project or projects root."""
+    return Path(root) / CATALOG_DIRECTORY / TRASH_DIRECTORY
+
+
+def find_trash_root(path: Union[str, Path]) -> Path:
+    """Return the trash area that a path is moved to when it is removed.
+
+    Parameters
+    ----------
+    path
+        The path to be removed.
+
+    Returns
+    -------
+    Path
+        The trash area of the project containing the path, or a trash area alongside
+        the path if it is not inside a project.
+
+    """
+    path = Path(path)
+    # Every directory between a project and the directories inside it is managed, so
+    # stop at the first one without metadata.
+    for candidate in (path.parent, *path.parent.parents):
+        try:
+            metadata = Metadata.from_directory(candidate)
+        except FileNotFoundError:
+            break
+        if metadata["directory_type"] == PROJECT_DIRECTORY_TYPE:
+            return get_trash_root(candidate)
+    return get_trash_root(path.parent)
+
+
+def move_to_trash(path: Union[str, Path]) -> Path:
+    """Atomically move a file or directory into its trash area.
+
+    Parameters
+    ----------
+    path
+        The path to remove.
+
+    Returns
+    -------
+    Path
+        The location of the path in the trash.
+
+    """
+    path = Path(path)
+    trash_root = find_trash_root(path)
+    mkdir(trash_root, exists_ok=True, parents=True)
+    # Names are unique and sort in the order things were trashed.
+    trashed_path = trash_root / f"{time.time_ns()}-{os.getpid()}-{path.name}"
+    os.rename(path, trashed_path)
+    return trashed_path
+
+
+def reap(
+    trash_root: Union[str, Path],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress_bar: bool = False,
+) -> int:
+    """Permanently delete everything in a trash area.
+
+    Parameters
+    ----------
+    trash_root
+        The trash area to empty.
+    max_workers
+        The maximum number of threads used to unlink files.
+    progress_bar
+        Whether to display a progress bar.
+
+    Returns
+    -------
+    int
+        The number of files deleted.
+
+    """
+    trash_root = Path(trash_root)
+    if not trash_root.exists():
+        return 0
+
+    files, directories = _scan(trash_root)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(
+            tqdm.tqdm(
+                pool.map(_unlink, files),
+                total=len(files),
+                desc=f"Reaping {trash_root}",
+                unit="file",
+                disable=not progress_bar,
+            )
+        )
+    # Deepest directories first so each one is empty when we get to it.
+    for directory in sorted(directories, key=lambda d: d.count(os.sep), reverse=True):
+        try:
+            os.rmdir(directory)
+        except FileNotFoundError:
+            pass
+    return len(files)
+
+
+def _scan(trash_root: Path) -> Tuple[List[str], List[str]]:
+    """Collect every file and directory below a trash root, without following links."""
+    files, directories = [], []
+    stack = [str(trash_root)]
+    while stack:
+        path = stack.pop()
+        try:
+            entries = list(os.scandir(path))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+                stack.append(entry.path)
+            else:
+                files.append(entry.path)
+    return files, directories
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
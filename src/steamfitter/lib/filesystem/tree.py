@@ -0,0 +1,113 @@
+"""
+====
+Tree
+====
+
+Concurrent loading of whole directory trees.
+
+:meth:`Directory.collect_subdirectories <steamfitter.lib.filesystem.Directory.collect_subdirectories>`
+walks a tree one directory and one metadata file at a time. On network filesystems the
+latency of each call dominates the cost of loading a large project, so
+:func:`load_tree` walks the tree breadth first, listing every directory in a level and
+reading every metadata file in the next level concurrently in a bounded thread pool.
+The resulting object graph is the same as eagerly instantiating the root directory.
+
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple, Type, Union
+
+from steamfitter.lib.filesystem.directory import (
+    Directory,
+    DirectoryType,
+    get_directory_class,
+)
+from steamfitter.lib.filesystem.metadata import Metadata
+
+DEFAULT_MAX_WORKERS = 16
+
+
+def load_tree(
+    path: Union[str, Path],
+    directory_class: Type[DirectoryType] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> DirectoryType:
+    """Load a directory and all of its descendants.
+
+    Parameters
+    ----------
+    path
+        The path to the root of the tree.
+    directory_class
+        The expected class of the root directory. If not provided, the class recorded
+        in the root directory's metadata is used.
+    max_workers
+        The maximum number of threads used to list directories and read metadata.
+
+    Returns
+    -------
+    Directory
+        The root directory with all of its subdirectories collected.
+
+    Raises
+    ------
+    SteamfitterDirectoryError
+        If a directory's metadata does not match the class it claims to be.
+
+    """
+    path = Path(path)
+    try:
+        root_metadata = Metadata.from_directory(path)
+    except FileNotFoundError:
+        root_metadata = None
+
+    if directory_class is None:
+        directory_class = (
+            get_directory_class(root_metadata["directory_class"])
+            if root_metadata
+            else Directory
+        )
+    root = directory_class.from_metadata(path, root_metadata, lazy=False)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        level = [root]
+        while level:
+            listings = list(pool.map(_list_child_directories, [d._path for d in level]))
+            child_metadata = iter(
+                pool.map(_read_metadata, [p for _, paths in listings for p in paths])
+            )
+
+            next_level = []
+            for parent, (mtime_ns, paths) in zip(level, listings):
+                subdirectories = []
+                for child_path in paths:
+                    metadata = next(child_metadata)
+                    if metadata is None:
+                        continue
+                    child_class = get_directory_class(metadata["directory_class"])
+                    child = child_class.from_metadata(
+                        child_path, metadata, parent=parent, lazy=False
+                    )
+                    subdirectories.append(child)
+                    next_level.append(child)
+                parent._subdirectories = tuple(subdirectories)
+                parent._mtime_ns = mtime_ns
+            level = next_level
+
+    return root
+
+
+def _list_child_directories(path: Path) -> Tuple[int, List[Path]]:
+    """List the child directories of a path, following symlinks, and its mtime."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with os.scandir(path) as entries:
+        return mtime_ns, [Path(entry.path) for entry in entries if entry.is_dir()]
+
+
+def _read_metadata(path: Path) -> Optional[Metadata]:
+    """Read the metadata of a directory, returning None for unmanaged directories."""
+    try:
+        return Metadata.from_directory(path)
+    except FileNotFoundError:
+        return None
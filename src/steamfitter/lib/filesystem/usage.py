@@ -0,0 +1,181 @@
+"""
+==========
+Disk Usage
+==========
+
+Incremental accounting of the disk space used by directory trees.
+
+Walking a large project with ``du`` means a ``stat`` call for every file, which takes
+hours on a network filesystem. :func:`disk_usage` instead records, for every directory,
+its mtime along with the size and number of the files directly inside it. Adding,
+removing or renaming an entry changes the mtime of the directory containing it, so on
+later runs any directory whose mtime is unchanged reuses its recorded totals and only
+costs a single ``stat``. Changed directories are rescanned in parallel.
+
+Files modified in place (e.g. appended to) don't change the mtime of their directory,
+so they're only picked up by a full rescan. Versioned data in steamfitter is written
+once, so in practice this is rare.
+
+Usage is cached in the project :class:`~steamfitter.lib.filesystem.catalog.Catalog`
+when one is provided. Sizes count allocated blocks, like ``du``, and symlinks are never
+followed. Files with several hardlinks in the tree (e.g. versions deduplicated by
+:func:`~steamfitter.lib.filesystem.dedup.deduplicate`) are also counted once, in the
+first directory they're found in by sorted path.
+
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+from steamfitter.lib.filesystem.catalog import Catalog
+
+DEFAULT_MAX_WORKERS = 16
+
+# Directories modified this recently may change again within the resolution of their
+# mtime, so their usage is not trusted on the next run.
+_RACY_INTERVAL_NS = 2 * 10**9
+
+
+class _DirectoryRecord(NamedTuple):
+    """The files directly inside a directory."""
+
+    mtime_ns: int
+    size: int
+    file_count: int
+    subdirectories: Tuple[str, ...]
+    # (device, inode, size) of the files with more than one link. They may be linked
+    # from elsewhere in the tree, so aren't included in size.
+    links: Tuple[Tuple[int, int, int], ...]
+
+
+class DiskUsage(NamedTuple):
+    """The disk usage of a directory and everything below it."""
+
+    size: int
+    file_count: int
+    directory_count: int
+
+
+def disk_usage(
+    root: Union[str, Path],
+    catalog: Catalog = None,
+    full: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[Path, DiskUsage]:
+    """Compute the disk usage of every directory in a tree.
+
+    Parameters
+    ----------
+    root
+        The root of the tree.
+    catalog
+        A catalog to read previous results from and write new results to. If not
+        provided, every directory is scanned.
+    full
+        Whether to rescan every directory, even those that haven't changed.
+    max_workers
+        The maximum number of threads used to scan directories.
+
+    Returns
+    -------
+    Dict[Path, DiskUsage]
+        The usage of every directory in the tree, including its descendants.
+
+    """
+    root = Path(root)
+    cached = catalog.load_usage(root) if catalog is not None and not full else {}
+    racy_before_ns = time.time_ns() - _RACY_INTERVAL_NS
+
+    records: Dict[str, _DirectoryRecord] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        level = [str(root)]
+        while level:
+            results = pool.map(
+                lambda path: _scan_directory(path, cached.get(path), racy_before_ns),
+                level,
+            )
+            next_level = []
+            for path, record in zip(level, results):
+                if record is None:
+                    # Removed while we were scanning.
+                    continue
+                records[path] = record
+                next_level.extend(os.path.join(path, name) for name in record.subdirectories)
+            level = next_level
+
+    if catalog is not None:
+        catalog.record_usage(root, records)
+    return _total(records)
+
+
+def format_size(size: int) -> str:
+    """Format a number of bytes for humans."""
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if size < 1024 or unit == "TB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+def _scan_directory(
+    path: str,
+    cached: Optional[tuple],
+    racy_before_ns: int,
+) -> Optional[_DirectoryRecord]:
+    try:
+        mtime_ns = os.stat(path, follow_symlinks=False).st_mtime_ns
+        if cached is not None and cached[0] == mtime_ns:
+            return _DirectoryRecord(*cached)
+
+        size, file_count, subdirectories, links = 0, 0, [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.name)
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if stat.st_nlink > 1:
+                    links.append((stat.st_dev, stat.st_ino, stat.st_blocks * 512))
+                else:
+                    size += stat.st_blocks * 512
+                file_count += 1
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    if mtime_ns >= racy_before_ns:
+        # Force a rescan next time.
+        mtime_ns = -1
+    return _DirectoryRecord(
+        mtime_ns, size, file_count, tuple(sorted(subdirectories)), tuple(sorted(links))
+    )
+
+
+def _total(records: Dict[str, _DirectoryRecord]) -> Dict[Path, DiskUsage]:
+    """Add the usage of each directory to all of its ancestors."""
+    totals = {}
+    seen_links = set()
+    for path in sorted(records):
+        record = records[path]
+        size = record.size
+        for device, inode, link_size in record.links:
+            if (device, inode) not in seen_links:
+                seen_links.add((device, inode))
+                size += link_size
+        totals[path] = DiskUsage(size, record.file_count, 1)
+    # Deepest directories first so each one is complete before it's added to its parent.
+    for path in sorted(records, key=lambda p: p.count(os.sep), reverse=True):
+        parent = os.path.dirname(path)
+        if parent in totals and path != parent:
+            size, file_count, directory_count = totals[parent]
+            child = totals[path]
+            totals[parent] = DiskUsage(
+                size + child.size,
+                file_count + child.file_count,
+                directory_count + child.directory_count,
+            )
+    return {Path(path): usage for path, usage in totals.items()}
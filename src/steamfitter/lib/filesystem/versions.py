@@ -0,0 +1,96 @@
+"""
+=================
+Version Allocator
+=================
+
+Concurrency-safe allocation of ``YYYY_MM_DD.VV`` version names.
+
+Finding the next version by listing a directory is slow for directories with many
+versions and races when many jobs start at once: two jobs can see the same highest
+version and pick the same name. :func:`allocate_version` instead keeps the last
+version handed out today in a small counter file, ``.version_counter``, in the
+directory holding the versions, and increments it under an exclusive ``fcntl`` lock.
+Each allocation reads and writes a single line, and every caller gets a different
+version.
+
+The directory is only listed when the counter is missing, unreadable, or from a
+previous day, so versions created before the counter existed (or by other tools) are
+never reused.
+
+"""
+import datetime
+import fcntl
+import os
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+VERSION_COUNTER_FILE_NAME = ".version_counter"
+
+VERSION_DATE_FORMAT = "%Y_%m_%d"
+
+
+def allocate_version(root: Union[str, Path], launch_time: str = None) -> str:
+    """Claim the next version name in a directory.
+
+    Parameters
+    ----------
+    root
+        The directory that holds the versions.
+    launch_time
+        The date part of the version. Defaults to today.
+
+    Returns
+    -------
+    str
+        A version name of the form ``{launch_time}.{run_version:0>2}`` that has not
+        been handed out before and does not exist in `root`.
+
+    """
+    root = Path(root)
+    launch_time = launch_time or datetime.datetime.now().strftime(VERSION_DATE_FORMAT)
+
+    fd = os.open(root / VERSION_COUNTER_FILE_NAME, os.O_RDWR | os.O_CREAT, 0o664)
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        counter = _parse_counter(os.read(fd, 1024))
+        if counter is not None and counter[0] == launch_time:
+            run_version = counter[1] + 1
+        else:
+            run_version = _scan_latest_version(root, launch_time) + 1
+        # Guard against versions created without going through the counter.
+        while (root / _format_version(launch_time, run_version)).exists():
+            run_version += 1
+
+        content = f"{launch_time} {run_version}\n".encode()
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, content)
+        os.fsync(fd)
+    finally:
+        # Closing the file releases the lock.
+        os.close(fd)
+    return _format_version(launch_time, run_version)
+
+
+def _format_version(launch_time: str, run_version: int) -> str:
+    return f"{launch_time}.{run_version:0>2}"
+
+
+def _parse_counter(content: bytes) -> Optional[Tuple[str, int]]:
+    try:
+        launch_time, run_version = content.decode().split()
+        return launch_time, int(run_version)
+    except ValueError:
+        # Empty, or left half written by a crash.
+        return None
+
+
+def _scan_latest_version(root: Path, launch_time: str) -> int:
+    """Find the highest version for a date by listing the directory."""
+    latest = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            date, _, run_version = entry.name.partition(".")
+            if date == launch_time and run_version.isdigit():
+                latest = max(latest, int(run_version))
+    return latest
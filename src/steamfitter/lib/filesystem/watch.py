@@ -0,0 +1,467 @@
+"""
+=====
+Watch
+=====
+
+Live views of directory trees for long-running processes.
+
+A :class:`TreeWatcher` keeps an already loaded :class:`Directory` tree (typically a
+:class:`ProjectDirectory`) in sync with the filesystem from a background thread. On
+Linux it subscribes to inotify events for every loaded directory and refreshes only the
+directories that reported a change, which picks up new version directories,
+``metadata.yaml`` rewrites and ``best``/``latest`` symlink moves as they happen.
+Everywhere else, or when explicitly requested, it falls back to periodically calling
+:meth:`Directory.refresh <steamfitter.lib.filesystem.Directory.refresh>` on the root.
+
+The tree is modified in place by the watcher thread, so readers that need a consistent
+view should hold :attr:`TreeWatcher.lock` while they read it.
+
+Examples
+--------
+
+.. code-block:: python
+
+    project = ProjectDirectory(project_root)
+    with TreeWatcher(project) as watcher:
+        while True:
+            with watcher.lock:
+                show(project.modeling_directory)
+            time.sleep(10)
+
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from steamfitter.lib.filesystem.directory import Directory, SteamfitterDirectoryError
+
+# Constants from <sys/inotify.h>
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+# Files are only picked up once they're closed (or moved into place) so we never read
+# a partially written metadata file.
+_WATCH_MASK = (
+    _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+# Seconds to wait before retrying directories that failed to refresh.
+_RETRY_INTERVAL = 0.1
+
+
+def _load_libc_inotify() -> Optional[ctypes.CDLL]:
+    """Return libc if it provides inotify, otherwise None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    except OSError:
+        return None
+    if not all(
+        hasattr(libc, name)
+        for name in ["inotify_init1", "inotify_add_watch", "inotify_rm_watch"]
+    ):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def inotify_available() -> bool:
+    """Return True if inotify can be used on this system."""
+    return _load_libc_inotify() is not None
+
+
+class TreeWatcher:
+    """Keeps a loaded directory tree in sync with the filesystem.
+
+    Parameters
+    ----------
+    root
+        The root of the tree to keep in sync.
+    use_inotify
+        Whether to use inotify. If None, inotify is used when it is available and the
+        watcher falls back to polling otherwise. If True and inotify is not available,
+        an error is raised.
+    poll_interval
+        Seconds between refreshes when polling.
+    on_change
+        An optional callback invoked from the watcher thread with each directory
+        that changed.
+
+    """
+
+    def __init__(
+        self,
+        root: Directory,
+        use_inotify: bool = None,
+        poll_interval: float = 5.0,
+        on_change: Callable[[Directory], None] = None,
+    ):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.lock = threading.RLock()
+
+        self._libc = _load_libc_inotify() if use_inotify in (None, True) else None
+        if use_inotify and self._libc is None:
+            raise SteamfitterDirectoryError("inotify is not available on this system.")
+        self.backend = "inotify" if self._libc is not None else "polling"
+
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, Set[str]] = defaultdict(set)
+        self._watched_paths: Dict[str, int] = {}
+        self._directories: Dict[str, Directory] = {}
+        # The watched children, managed or not, of each loaded directory.
+        self._children: Dict[str, Set[str]] = {}
+        # Directories that should be watched but couldn't be.
+        self._unwatched: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "TreeWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def is_degraded(self) -> bool:
+        """Whether some directories couldn't be watched, so their changes are missed.
+
+        This happens when the inotify watch limit (``fs.inotify.max_user_watches``) is
+        reached or a directory can't be read. Callers that need every change should
+        fall back to polling by restarting the watcher with ``use_inotify=False``.
+
+        """
+        return bool(self._unwatched)
+
+    @property
+    def unwatched_paths(self) -> Set[str]:
+        """The directories that couldn't be watched."""
+        with self.lock:
+            return set(self._unwatched)
+
+    def start(self) -> None:
+        """Start watching the tree in a background thread."""
+        if self.is_running:
+            return
+        self._stop.clear()
+        if self.backend == "inotify":
+            fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd < 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error))
+            self._fd = fd
+            with self.lock:
+                # Catch anything that changed between loading the tree and now.
+                self.root.refresh()
+                self._sync_watches()
+            target = self._watch_inotify
+        else:
+            target = self._watch_polling
+        self._thread = threading.Thread(
+            target=target, name="steamfitter-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching the tree."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._watches.clear()
+        self._watched_paths.clear()
+        self._directories.clear()
+        self._children.clear()
+        self._unwatched.clear()
+
+    ###########
+    # Polling #
+    ###########
+
+    def _watch_polling(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                with self.lock:
+                    changed = self.root.refresh()
+                if changed and self.on_change is not None:
+                    self.on_change(self.root)
+            except Exception:
+                logger.exception(f"Failed to refresh {self.root.path}.")
+
+    ###########
+    # inotify #
+    ###########
+
+    def _watch_inotify(self) -> None:
+        retry: Set[str] = set()
+        while not self._stop.is_set():
+            timeout = _RETRY_INTERVAL if retry else 0.5
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+            events = self._read_events() if readable else []
+            if events or retry:
+                retry = self._handle_events(events, retry)
+
+    def _read_events(self) -> List[tuple]:
+        """Read all pending inotify events as (wd, mask, name) tuples."""
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset : offset + name_length].rstrip(b"\0").decode()
+            offset += name_length
+            events.append((wd, mask, name))
+        return events
+
+    def _handle_events(self, events: List[tuple], retry: Set[str]) -> Set[str]:
+        """Refresh the directories affected by a batch of events.
+
+        Returns the paths that could not be refreshed and should be retried, e.g.
+        because a metadata file was read while another process was still writing it.
+
+        """
+        changed_paths = set(retry)
+        full_refresh = False
+        for wd, mask, name in events:
+            if mask & _IN_Q_OVERFLOW:
+                full_refresh = True
+            elif mask & _IN_IGNORED:
+                for path in self._watches.pop(wd, set()):
+                    self._watched_paths.pop(path, None)
+            elif _is_partial_file(mask, name, self._watches.get(wd, set())):
+                continue
+            else:
+                for path in self._watches.get(wd, set()):
+                    changed_paths.add(path)
+                    if name:
+                        # The entry itself may be a loaded directory, e.g. a moved symlink.
+                        changed_paths.add(os.path.join(path, name))
+
+        with self.lock:
+            if full_refresh:
+                _, changed, failed = self._refresh_paths(
+                    {str(self.root._path)}, recursive=True
+                )
+                self._sync_watches()
+            else:
+                refreshed, changed, failed = self._refresh_paths(changed_paths)
+                failed |= self._update_watches(refreshed)
+
+        if self.on_change is not None:
+            for directory in changed:
+                self.on_change(directory)
+        return failed
+
+    def _refresh_paths(
+        self, paths: Set[str], recursive: bool = False
+    ) -> Tuple[List[Directory], List[Directory], Set[str]]:
+        """Refresh the directories nearest to each changed path.
+
+        Returns the directories that were refreshed, those that changed and the paths
+        that failed to refresh.
+
+        """
+        directories = {}
+        for path in paths:
+            directory = self._nearest_directory(path)
+            if directory is not None:
+                directories[str(directory._path)] = directory
+
+        refreshed, changed, failed = [], [], set()
+        # Refresh parents before children so removed children are dropped first.
+        # A change in an unmanaged directory (e.g. a new version directory whose
+        # metadata was just written) rescans its nearest managed ancestor. Events can
+        # arrive within the mtime resolution of the filesystem, so always rescan.
+        for path in sorted(directories, key=len):
+            directory = directories[path]
+            try:
+                if directory.refresh(recursive=recursive, rescan=True):
+                    changed.append(directory)
+                refreshed.append(directory)
+            except FileNotFoundError:
+                # Removed; its parent's refresh takes care of it.
+                pass
+            except Exception:
+                logger.opt(exception=True).debug(f"Failed to refresh {path}, will retry.")
+                failed.add(path)
+        return refreshed, changed, failed
+
+    def _nearest_directory(self, path: str) -> Optional[Directory]:
+        candidate = Path(path)
+        for candidate in (candidate, *candidate.parents):
+            if str(candidate) in self._directories:
+                return self._directories[str(candidate)]
+        return None
+
+    def _sync_watches(self) -> None:
+        """Watch every loaded directory and any unmanaged children of loaded directories."""
+        for path in list(self._watched_paths):
+            self._remove_watch(path)
+        self._unwatched.clear()
+        self._directories.clear()
+        self._children.clear()
+        self._add_tree(self.root)
+
+    def _update_watches(self, refreshed: List[Directory]) -> Set[str]:
+        """Update the watches below directories that were just refreshed.
+
+        Only the refreshed directories are rescanned. Their new children are watched,
+        along with everything loaded below them, and everything below their removed
+        children is no longer watched.
+
+        Returns the paths of directories with newly watched unmanaged children. These
+        should be refreshed again, as a child may have become managed before its
+        watch was in place.
+
+        """
+        recheck = set()
+        for directory in refreshed:
+            path = str(directory._path)
+            if self._directories.get(path) is not directory:
+                # Dropped from the tree when its parent was refreshed.
+                continue
+            previous = self._children.pop(path, set())
+            managed = self._watch_children(directory)
+            if self._children.get(path, set()).difference(
+                previous, (str(child._path) for child in managed)
+            ):
+                recheck.add(path)
+            for child in managed:
+                child_path = str(child._path)
+                if self._directories.get(child_path) is child and (
+                    child_path in self._children or not child.is_loaded
+                ):
+                    continue
+                # New, replaced, or loaded since it was last watched.
+                for grandchild_path in self._children.pop(child_path, ()):
+                    self._remove_tree(grandchild_path)
+                self._add_tree(child)
+            for child_path in previous.difference(self._children.get(path, set())):
+                self._remove_tree(child_path)
+        return recheck
+
+    def _add_tree(self, directory: Directory) -> None:
+        """Watch a directory and everything loaded below it."""
+        stack = [directory]
+        while stack:
+            directory = stack.pop()
+            path = str(directory._path)
+            self._directories[path] = directory
+            self._add_watch(path)
+            stack.extend(self._watch_children(directory))
+
+    def _watch_children(self, directory: Directory) -> List[Directory]:
+        """Watch the unmanaged children of a loaded directory and record all its children.
+
+        Returns the managed children, which the caller is responsible for watching.
+
+        """
+        if not directory.is_loaded:
+            return []
+        path = str(directory._path)
+        subdirectories = list(directory.iter_subdirectories())
+        children = {str(d._path) for d in subdirectories}
+        # Watch directories that aren't managed yet so we notice when they get a
+        # metadata file.
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir() and entry.path not in children:
+                        children.add(entry.path)
+                        self._add_watch(entry.path)
+        except FileNotFoundError:
+            pass
+        self._children[path] = children
+        return subdirectories
+
+    def _remove_tree(self, path: str) -> None:
+        """Stop watching a path and everything below it."""
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            self._directories.pop(path, None)
+            self._remove_watch(path)
+            stack.extend(self._children.pop(path, ()))
+
+    def _add_watch(self, path: str) -> None:
+        if path in self._watched_paths:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            # The directory was removed before we got to it, its parent hears about it.
+            if error not in (errno.ENOENT, errno.ENOTDIR) and path not in self._unwatched:
+                self._unwatched.add(path)
+                hint = (
+                    " Raise fs.inotify.max_user_watches or use polling instead."
+                    if error == errno.ENOSPC
+                    else ""
+                )
+                logger.warning(
+                    f"Can't watch {path} ({errno.errorcode.get(error, error)}: "
+                    f"{os.strerror(error)}), changes in it will be missed.{hint}"
+                )
+            return
+        self._unwatched.discard(path)
+        self._watches[wd].add(path)
+        self._watched_paths[path] = wd
+
+    def _remove_watch(self, path: str) -> None:
+        self._unwatched.discard(path)
+        wd = self._watched_paths.pop(path, None)
+        if wd is None:
+            return
+        self._watches[wd].discard(path)
+        if not self._watches[wd]:
+            del self._watches[wd]
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+
+def _is_partial_file(mask: int, name: str, paths: Set[str]) -> bool:
+    """Whether an event is the creation of a regular file that is still being written."""
+    if not mask & _IN_CREATE or mask & _IN_ISDIR:
+        return False
+    return not any(os.path.islink(os.path.join(path, name)) for path in paths)
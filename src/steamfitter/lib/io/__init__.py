@@ -0,0 +1,39 @@
+"""
+===
+I/O
+===
+
+Reading and writing data files in several serialization formats.
+
+Each format is implemented by a backend module with the same small interface: a
+``load(path)`` function, a ``dump(path, data, exist_ok=False)`` function and the
+``EXTENSIONS`` it handles. :func:`load` and :func:`dump` pick the backend from the file
+extension, defaulting to YAML for files with an unrecognized extension.
+
+"""
+from pathlib import Path
+from types import ModuleType
+from typing import Dict
+
+from steamfitter.lib.io import json, msgpack, yaml
+
+BACKENDS = {"yaml": yaml, "json": json, "msgpack": msgpack}
+
+_BACKENDS_BY_EXTENSION = {
+    extension: backend for backend in BACKENDS.values() for extension in backend.EXTENSIONS
+}
+
+
+def get_backend(path: Path) -> ModuleType:
+    """Return the backend module for a file, based on its extension."""
+    return _BACKENDS_BY_EXTENSION.get(Path(path).suffix, yaml)
+
+
+def load(path: Path) -> Dict:
+    """Load a data file with the backend for its extension."""
+    return get_backend(path).load(path)
+
+
+def dump(path: Path, data: Dict, exist_ok: bool = False) -> None:
+    """Dump data to a file with the backend for its extension."""
+    get_backend(path).dump(path, data, exist_ok=exist_ok)
@@ -0,0 +1,62 @@
+"""
+======
+atomic
+======
+
+Atomic file writes shared by the I/O backends.
+
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+# Permissions of newly created files. Existing files keep their permissions.
+DEFAULT_FILE_MODE = 0o664
+
+
+@contextmanager
+def atomic_write(path: Path, exist_ok: bool = False, binary: bool = False) -> Iterator[IO]:
+    """Open a temporary file that replaces `path` once the block exits without error.
+
+    Data is written to a temporary file in the same directory which is then moved
+    into place, so readers only ever see a complete file.
+
+    Parameters
+    ----------
+    path
+        The path to the file to write.
+    exist_ok
+        Whether to replace the file if it already exists.
+    binary
+        Whether to open the temporary file in binary mode.
+
+    Raises
+    ------
+    FileExistsError
+        If the file already exists and `exist_ok` is False.
+
+    """
+    if path.exists() and not exist_ok:
+        raise FileExistsError(f"File {path} already exists.")
+
+    try:
+        mode = path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = DEFAULT_FILE_MODE
+
+    fd, temporary_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb" if binary else "w") as f:
+            yield f
+            os.fchmod(f.fileno(), mode)
+        if exist_ok:
+            os.replace(temporary_path, path)
+        else:
+            # Linking fails if someone else created the file since we checked.
+            os.link(temporary_path, path)
+            os.unlink(temporary_path)
+    except BaseException:
+        Path(temporary_path).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,63 @@
+"""
+====
+json
+====
+
+JSON file I/O.
+
+JSON is much faster to read and write than YAML while staying human readable, which
+makes it a good fit for large machine-written metadata such as run provenance. Files are
+written atomically, see :func:`~steamfitter.lib.io.atomic.atomic_write`.
+
+"""
+import json
+from pathlib import Path
+from typing import Dict
+
+from steamfitter.lib.io.atomic import atomic_write
+
+EXTENSIONS = (".json",)
+
+
+def load(path: Path) -> Dict:
+    """Load a JSON file.
+
+    Parameters
+    ----------
+    path
+        The path to the file.
+
+    Returns
+    -------
+    Dict
+        The data dictionary.
+
+    """
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Metadata file {path} does not exist.")
+    with f:
+        return json.load(f)
+
+
+def dump(path: Path, data: Dict, exist_ok: bool = False) -> None:
+    """Dump the data to disk.
+
+    Parameters
+    ----------
+    path
+        The path to the file to write.
+    data
+        The data to dump.
+    exist_ok
+        Whether to raise an error if the file already exists.
+
+    Raises
+    ------
+    FileExistsError
+        If the file already exists and `exist_ok` is False.
+
+    """
+    with atomic_write(path, exist_ok=exist_ok) as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,78 @@
+"""
+=======
+msgpack
+=======
+
+MessagePack file I/O.
+
+MessagePack is a compact binary format that is the fastest of the supported formats to
+read and write, at the cost of not being human readable. It requires the optional
+``msgpack`` package (``pip install steamfitter[msgpack]``). Files are written
+atomically, see :func:`~steamfitter.lib.io.atomic.atomic_write`.
+
+"""
+from pathlib import Path
+from typing import Dict
+
+try:
+    import msgpack
+except ModuleNotFoundError:
+    msgpack = None
+
+from steamfitter.lib.io.atomic import atomic_write
+
+EXTENSIONS = (".msgpack",)
+
+
+def load(path: Path) -> Dict:
+    """Load a MessagePack file.
+
+    Parameters
+    ----------
+    path
+        The path to the file.
+
+    Returns
+    -------
+    Dict
+        The data dictionary.
+
+    """
+    _check_installed()
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Metadata file {path} does not exist.")
+    with f:
+        return msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+
+
+def dump(path: Path, data: Dict, exist_ok: bool = False) -> None:
+    """Dump the data to disk.
+
+    Parameters
+    ----------
+    path
+        The path to the file to write.
+    data
+        The data to dump.
+    exist_ok
+        Whether to raise an error if the file already exists.
+
+    Raises
+    ------
+    FileExistsError
+        If the file already exists and `exist_ok` is False.
+
+    """
+    _check_installed()
+    with atomic_write(path, exist_ok=exist_ok, binary=True) as f:
+        f.write(msgpack.packb(data, use_bin_type=True))
+
+
+def _check_installed() -> None:
+    if msgpack is None:
+        raise ModuleNotFoundError(
+            "No module named 'msgpack', which is required to read and write MessagePack "
+            "files. Install it with 'pip install steamfitter[msgpack]'."
+        )
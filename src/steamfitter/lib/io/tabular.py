@@ -0,0 +1,400 @@
+"""
+=======
+tabular
+=======
+
+Tabular data file I/O.
+
+Data is read and written as Parquet, Feather or CSV, picked by file extension. Parquet
+and Feather are columnar binary formats that are many times faster to read than CSV and
+keep column types, and they support:
+
+- column projection, where only the requested columns are read from disk;
+- row filtering, where Parquet files skip whole row groups whose statistics show they
+  hold no matching rows; and
+- memory mapped reads, where data is used in place from the page cache instead of being
+  copied into memory (see :func:`read_table`).
+
+Parquet and Feather require the optional ``pyarrow`` package (``pip install
+steamfitter[tabular]``). Without it, data is written as CSV and only CSV files can be
+read.
+
+Paths may be given without an extension, in which case :func:`read` reads whichever of
+``.parquet``, ``.feather`` or ``.csv`` exists, in that order, and :func:`write` writes
+the preferred format available. Files are written atomically, see
+:func:`~steamfitter.lib.io.atomic.atomic_write`.
+
+CSV files too large to fit in memory can be converted with :func:`convert_csv`, which
+streams them in fixed size chunks into a Parquet dataset: a ``.parquet`` directory with
+one file per chunk, which :func:`read` reads like a single file.
+
+"""
+import operator
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Sequence, Tuple, Union
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ModuleNotFoundError:
+    pyarrow = None
+
+from steamfitter.lib.io.atomic import atomic_write
+
+FORMATS = {
+    "parquet": (".parquet", ".pq"),
+    "feather": (".feather", ".arrow"),
+    "csv": (".csv",),
+}
+
+_EXTENSIONS = {extension for extensions in FORMATS.values() for extension in extensions}
+
+# Rows read from a file at a time by iter_chunks and convert_csv.
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+_DATASET_FORMATS = {"parquet": "parquet", "feather": "ipc"}
+
+# (column, operator, value) conditions, all of which rows must satisfy.
+Filters = Sequence[Tuple[str, str, Any]]
+
+_OPERATORS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda column, values: column.isin(values),
+    "not in": lambda column, values: ~column.isin(values),
+}
+
+
+def get_format(path: Union[str, Path]) -> str:
+    """Return the format of a data file from its extension.
+
+    Raises
+    ------
+    ValueError
+        If the extension isn't one of a supported format.
+
+    """
+    suffix = Path(path).suffix
+    for file_format, extensions in FORMATS.items():
+        if suffix in extensions:
+            return file_format
+    raise ValueError(f"Unknown tabular data format for {path}.")
+
+
+def find_file(path: Union[str, Path]) -> Path:
+    """Return a data file, trying each format in order of preference if it has no extension.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no data file exists.
+
+    """
+    path = Path(path)
+    if path.suffix in _EXTENSIONS:
+        candidates = [path]
+    else:
+        candidates = [path.with_name(path.name + f[0]) for f in FORMATS.values()]
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(f"No data file found at {path}.")
+
+
+def read(
+    path: Union[str, Path],
+    columns: List[str] = None,
+    filters: Filters = None,
+    memory_map: bool = True,
+) -> pd.DataFrame:
+    """Read a data file into a data frame.
+
+    Parameters
+    ----------
+    path
+        The data file, with or without an extension.
+    columns
+        Only read these columns.
+    filters
+        Only read rows satisfying every ``(column, operator, value)`` condition. The
+        supported operators are ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in`` and
+        ``not in``. Parquet files skip row groups that can't hold matching rows.
+    memory_map
+        Whether to memory map Parquet and Feather files rather than reading them.
+
+    Returns
+    -------
+    pd.DataFrame
+        The data.
+
+    """
+    path = find_file(path)
+    file_format = get_format(path)
+    if file_format == "csv":
+        data = pd.read_csv(
+            path,
+            usecols=_with_filter_columns(columns, filters),
+            engine="pyarrow" if pyarrow is not None else None,
+        )
+        if filters:
+            data = data.loc[_filter_mask(data, filters)].reset_index(drop=True)
+        return data[columns] if columns is not None else data
+    return read_table(path, columns, filters, memory_map).to_pandas(
+        split_blocks=True, self_destruct=True
+    )
+
+
+def read_table(
+    path: Union[str, Path],
+    columns: List[str] = None,
+    filters: Filters = None,
+    memory_map: bool = True,
+) -> "pyarrow.Table":
+    """Read a Parquet or Feather file into an Arrow table.
+
+    Arrow tables read from memory mapped, uncompressed Feather files refer to the data in
+    the page cache rather than copying it, so reading them is nearly free and the memory
+    they use is shared by every process reading the same file.
+
+    See :func:`read` for the parameters.
+
+    """
+    _check_installed()
+    path = find_file(path)
+    file_format = get_format(path)
+    if file_format == "parquet":
+        return parquet.read_table(
+            path,
+            columns=columns,
+            filters=[tuple(f) for f in filters] if filters else None,
+            memory_map=memory_map,
+        )
+    elif file_format == "feather":
+        table = feather.read_table(
+            path, columns=_with_filter_columns(columns, filters), memory_map=memory_map
+        )
+        if filters:
+            filter_columns = table.select([column for column, _, _ in filters]).to_pandas()
+            table = table.filter(pyarrow.array(_filter_mask(filter_columns, filters)))
+        return table.select(columns) if columns is not None else table
+    raise ValueError(f"Can only read Parquet and Feather files as tables, not {path}.")
+
+
+def get_columns(path: Union[str, Path]) -> List[str]:
+    """Return the column names of a data file without reading its data."""
+    path = find_file(path)
+    file_format = get_format(path)
+    if file_format == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    _check_installed()
+    return pyarrow.dataset.dataset(path, format=_DATASET_FORMATS[file_format]).schema.names
+
+
+def iter_chunks(
+    path: Union[str, Path],
+    columns: List[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    csv_dtype: Any = None,
+) -> Iterator[pd.DataFrame]:
+    """Read a data file a fixed number of rows at a time.
+
+    Parameters
+    ----------
+    path
+        The data file, with or without an extension.
+    columns
+        Only read these columns.
+    chunk_size
+        The most rows in each chunk.
+    csv_dtype
+        The dtype, or dtype of each column, to read CSV files with. For example,
+        ``str`` reads every value as it's written in the file.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next chunk of data.
+
+    """
+    path = find_file(path)
+    file_format = get_format(path)
+    if file_format == "csv":
+        yield from pd.read_csv(path, usecols=columns, dtype=csv_dtype, chunksize=chunk_size)
+        return
+
+    _check_installed()
+    dataset = pyarrow.dataset.dataset(path, format=_DATASET_FORMATS[file_format])
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def write(
+    path: Union[str, Path],
+    data: pd.DataFrame,
+    exist_ok: bool = False,
+    row_group_size: int = None,
+    compression: str = None,
+) -> Path:
+    """Write a data frame to a data file.
+
+    Parameters
+    ----------
+    path
+        The data file to write. Without an extension, the data is written as Parquet
+        if ``pyarrow`` is installed and as CSV otherwise.
+    data
+        The data to write. The index is not written.
+    exist_ok
+        Whether to replace the file if it already exists.
+    row_group_size
+        The maximum number of rows in each row group of a Parquet file. Smaller row
+        groups make filtered reads more selective.
+    compression
+        The compression codec of a Parquet or Feather file. Feather files must be
+        uncompressed (``"uncompressed"``) to be read without copying.
+
+    Returns
+    -------
+    Path
+        The path of the written file.
+
+    """
+    path = Path(path)
+    if path.suffix not in _EXTENSIONS:
+        preferred = "parquet" if pyarrow is not None else "csv"
+        path = path.with_name(path.name + FORMATS[preferred][0])
+    file_format = get_format(path)
+    if file_format != "csv":
+        _check_installed()
+
+    with atomic_write(path, exist_ok=exist_ok, binary=True) as f:
+        if file_format == "parquet":
+            kwargs = {"compression": compression} if compression else {}
+            parquet.write_table(
+                pyarrow.Table.from_pandas(data, preserve_index=False),
+                f,
+                row_group_size=row_group_size,
+                **kwargs,
+            )
+        elif file_format == "feather":
+            feather.write_feather(data.reset_index(drop=True), f, compression=compression)
+        else:
+            data.to_csv(f, index=False)
+    return path
+
+
+class ConversionStats(NamedTuple):
+    row_count: int
+    part_count: int
+    seconds: float
+
+
+def convert_csv(
+    csv_path: Union[str, Path],
+    output_path: Union[str, Path] = None,
+    dtypes: Dict[str, str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    compression: str = None,
+) -> ConversionStats:
+    """Convert a CSV file to a Parquet dataset without loading it all into memory.
+
+    The CSV file is read ``chunk_size`` rows at a time and each chunk is written as one
+    file of the dataset, so memory use depends on the chunk size rather than the size
+    of the CSV file. The dataset is written to a temporary directory and moved into
+    place once it is complete.
+
+    Parameters
+    ----------
+    csv_path
+        The CSV file to convert.
+    output_path
+        The dataset directory to write. Defaults to the CSV path with a ``.parquet``
+        extension.
+    dtypes
+        The pandas dtype of each column. Columns without a dtype are inferred from the
+        first chunk, and later chunks must match.
+    chunk_size
+        The number of rows in each file of the dataset.
+    compression
+        The compression codec of the Parquet files.
+
+    Returns
+    -------
+    ConversionStats
+        The number of rows and files written and how long it took.
+
+    Raises
+    ------
+    FileExistsError
+        If the output already exists.
+    ValueError
+        If a chunk's inferred column types don't match the first chunk's.
+
+    """
+    _check_installed()
+    start = time.time()
+    csv_path = Path(csv_path)
+    output_path = Path(output_path) if output_path else csv_path.with_suffix(".parquet")
+    if output_path.exists():
+        raise FileExistsError(f"File {output_path} already exists.")
+
+    partial_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.partial")
+    partial_path.mkdir()
+    kwargs = {"compression": compression} if compression else {}
+    schema, row_count, part_count = None, 0, 0
+    try:
+        for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunk_size):
+            try:
+                table = pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+                raise ValueError(
+                    f"Rows {row_count} to {row_count + len(chunk)} of {csv_path} don't "
+                    f"match the column types of earlier rows. Declare the column types. {e}"
+                )
+            schema = table.schema
+            parquet.write_table(
+                table, partial_path / f"part-{part_count:05}.parquet", **kwargs
+            )
+            row_count += len(chunk)
+            part_count += 1
+        os.rename(partial_path, output_path)
+    except BaseException:
+        shutil.rmtree(partial_path, ignore_errors=True)
+        raise
+    return ConversionStats(row_count, part_count, time.time() - start)
+
+
+def _with_filter_columns(columns: List[str] = None, filters: Filters = None):
+    """Add the columns needed to apply filters to a column projection."""
+    if columns is None or not filters:
+        return columns
+    return list(dict.fromkeys([*columns, *(column for column, _, _ in filters)]))
+
+
+def _filter_mask(data: pd.DataFrame, filters: Filters) -> pd.Series:
+    mask = pd.Series(True, index=data.index)
+    for column, op, value in filters:
+        if op not in _OPERATORS:
+            raise ValueError(f"Unknown filter operator {op}.")
+        mask &= _OPERATORS[op](data[column], value)
+    return mask
+
+
+def _check_installed() -> None:
+    if pyarrow is None:
+        raise ModuleNotFoundError(
+            "No module named 'pyarrow', which is required to read and write Parquet and "
+            "Feather files. Install it with 'pip install steamfitter[tabular]'."
+        )
@@ -5,12 +5,29 @@ yaml
 
 YAML file I/O.
 
+Files are written atomically, see :func:`~steamfitter.lib.io.atomic.atomic_write`.
+
+Files are parsed and emitted with the libyaml C bindings when PyYAML was built with
+them, which is several times faster than its pure Python implementation. Both produce
+the same data, so it's safe to mix them.
+
 """
 from pathlib import Path
 from typing import Dict
 
 import yaml
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    # PyYAML was built without libyaml.
+    from yaml import SafeDumper, SafeLoader
+
+from steamfitter.lib.io.atomic import atomic_write
+
+EXTENSIONS = (".yaml", ".yml")
+
 
 def load(path: Path) -> Dict:
     """Load a YAML file.
@@ -26,10 +43,12 @@ def load(path: Path) -> Dict:
         The data dictionary.
 
     """
-    if not path.exists():
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
         raise FileNotFoundError(f"Metadata file {path} does not exist.")
-    with path.open() as f:
-        data = yaml.safe_load(f)
+    with f:
+        data = yaml.load(f, Loader=SafeLoader)
 
     return data
 
@@ -48,12 +67,9 @@ def dump(path: Path, data: Dict, exist_ok: bool = False) -> None:
 
     Raises
     ------
-    ValueError
-        If the metadata file already exists and `exist_ok` is False.
+    FileExistsError
+        If the file already exists and `exist_ok` is False.
 
     """
-    if path.exists() and not exist_ok:
-        raise FileExistsError(f"File {path} already exists.")
-
-    with path.open("w") as f:
-        yaml.safe_dump(data, f)
+    with atomic_write(path, exist_ok=exist_ok) as f:
+        yaml.dump(data, f, Dumper=SafeDumper)
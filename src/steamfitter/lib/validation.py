@@ -0,0 +1,264 @@
+"""
+==========
+Validation
+==========
+
+Validation of tabular data files against a schema of expected columns.
+
+A :class:`Schema` is built once from column definitions, such as the source columns
+registered with an extracted data directory, and can then validate any number of data
+files. Files are read in fixed size chunks (see
+:func:`steamfitter.lib.io.tabular.iter_chunks`) and each chunk is checked a whole column
+at a time, so validating a file takes memory for one chunk however large the file is.
+
+Validation doesn't stop at the first problem. It returns a :class:`ValidationReport`
+with the missing and unexpected columns and, for every expected column, how many values
+are null and how many can't be read as the column's type.
+
+"""
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import pandas as pd
+from pandas.api import types
+
+from steamfitter.lib.exceptions import SteamfitterException
+from steamfitter.lib.io import tabular
+
+# The pandas dtypes of column types. Integer columns that may be null use pandas'
+# nullable integer type.
+COLUMN_DTYPES = {
+    "int": "int64",
+    "integer": "int64",
+    "float": "float64",
+    "str": "string",
+    "string": "string",
+    "bool": "boolean",
+    "boolean": "boolean",
+}
+
+_BOOLEAN_STRINGS = {"true", "false", "t", "f", "yes", "no", "1", "0"}
+
+
+class SchemaValidationError(SteamfitterException):
+    """An exception raised when data does not match its schema."""
+
+    pass
+
+
+class ColumnSchema(NamedTuple):
+    name: str
+    # The pandas dtype of the column, or None if values of any type are allowed.
+    dtype: Optional[str]
+    is_nullable: bool
+
+
+class ColumnReport(NamedTuple):
+    dtype: Optional[str]
+    is_nullable: bool
+    null_count: int
+    invalid_count: int
+
+    @property
+    def is_valid(self) -> bool:
+        return self.invalid_count == 0 and (self.is_nullable or self.null_count == 0)
+
+
+class ValidationReport(NamedTuple):
+    row_count: int
+    missing_columns: Tuple[str, ...]
+    unexpected_columns: Tuple[str, ...]
+    columns: Dict[str, ColumnReport]
+
+    @property
+    def is_valid(self) -> bool:
+        return (
+            not self.missing_columns
+            and not self.unexpected_columns
+            and all(column.is_valid for column in self.columns.values())
+        )
+
+    def errors(self) -> List[str]:
+        """Describe every problem found."""
+        errors = []
+        if self.missing_columns:
+            errors.append(f"Data is missing columns: {', '.join(self.missing_columns)}.")
+        if self.unexpected_columns:
+            errors.append(
+                f"Data contains unexpected columns: {', '.join(self.unexpected_columns)}."
+            )
+        for name, column in self.columns.items():
+            if column.null_count and not column.is_nullable:
+                errors.append(f"Column {name} contains {column.null_count} null values.")
+            if column.invalid_count:
+                errors.append(
+                    f"Column {name} contains {column.invalid_count} values that are not "
+                    f"of type {column.dtype}."
+                )
+        return errors
+
+    def raise_for_errors(self) -> None:
+        """Raise a :class:`SchemaValidationError` describing every problem, if any."""
+        errors = self.errors()
+        if errors:
+            raise SchemaValidationError("\n".join(errors))
+
+
+class Schema:
+    """The columns expected in a data file."""
+
+    def __init__(self, columns: Iterable[ColumnSchema]):
+        self.columns = {column.name: column for column in columns}
+        self._checks: Dict[str, Callable[[pd.Series], int]] = {
+            column.name: _TYPE_CHECKS.get(column.dtype, _count_nothing)
+            for column in self.columns.values()
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence]) -> "Schema":
+        """Build a schema from ``{name: (type, is_nullable, description)}`` definitions.
+
+        Types are names like ``int``, ``float``, ``str`` or ``bool``. Columns with
+        other types are only checked for nulls. Every value in a CSV file is text, so
+        ``str`` columns accept any value there, but in typed formats like Parquet they
+        must hold strings.
+
+        """
+        return cls(
+            ColumnSchema(name, COLUMN_DTYPES.get(str(column_type).lower()), bool(is_nullable))
+            for name, (column_type, is_nullable, *_) in columns.items()
+        )
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        """The pandas dtypes of the columns with known types."""
+        return {
+            name: "Int64" if column.dtype == "int64" and column.is_nullable else column.dtype
+            for name, column in self.columns.items()
+            if column.dtype is not None
+        }
+
+    def validate(
+        self,
+        path: Union[str, Path],
+        chunk_size: int = tabular.DEFAULT_CHUNK_SIZE,
+    ) -> ValidationReport:
+        """Validate a data file against the schema.
+
+        Parameters
+        ----------
+        path
+            The data file, with or without an extension.
+        chunk_size
+            The number of rows held in memory at a time.
+
+        Returns
+        -------
+        ValidationReport
+            Every problem found in the file.
+
+        """
+        file_columns = tabular.get_columns(path)
+        present = [name for name in self.columns if name in file_columns]
+        null_counts = dict.fromkeys(present, 0)
+        invalid_counts = dict.fromkeys(present, 0)
+        row_count = 0
+        if present:
+            # Read CSV values as written, so values of the wrong type aren't coerced.
+            for chunk in tabular.iter_chunks(path, present, chunk_size, csv_dtype=str):
+                row_count += len(chunk)
+                for name in present:
+                    column = chunk[name]
+                    null_counts[name] += int(column.isna().sum())
+                    invalid_counts[name] += self._checks[name](column)
+        else:
+            row_count = sum(
+                len(chunk) for chunk in tabular.iter_chunks(path, chunk_size=chunk_size)
+            )
+
+        return ValidationReport(
+            row_count=row_count,
+            missing_columns=tuple(name for name in self.columns if name not in file_columns),
+            unexpected_columns=tuple(
+                name for name in file_columns if name not in self.columns
+            ),
+            columns={
+                name: ColumnReport(
+                    self.columns[name].dtype,
+                    self.columns[name].is_nullable,
+                    null_counts[name],
+                    invalid_counts[name],
+                )
+                for name in present
+            },
+        )
+
+
+###############
+# Type checks #
+###############
+# Each returns the number of non-null values in a column that aren't of a type.
+
+
+def _count_nothing(column: pd.Series) -> int:
+    return 0
+
+
+def _count_non_integers(column: pd.Series) -> int:
+    if types.is_bool_dtype(column):
+        return int(column.notna().sum())
+    if types.is_integer_dtype(column):
+        return 0
+    if types.is_numeric_dtype(column):
+        numbers = column
+    else:
+        numbers = pd.to_numeric(column, errors="coerce")
+    present = column.notna()
+    return int((present & (numbers.isna() | (numbers % 1 != 0))).sum())
+
+
+def _count_non_floats(column: pd.Series) -> int:
+    if types.is_bool_dtype(column):
+        return int(column.notna().sum())
+    if types.is_numeric_dtype(column):
+        return 0
+    numbers = pd.to_numeric(column, errors="coerce")
+    return int((column.notna() & numbers.isna()).sum())
+
+
+def _count_non_booleans(column: pd.Series) -> int:
+    if types.is_bool_dtype(column):
+        return 0
+    if types.is_numeric_dtype(column):
+        return int((column.notna() & ~column.isin([0, 1])).sum())
+    strings = column.astype("string").str.lower()
+    return int((column.notna() & ~strings.isin(_BOOLEAN_STRINGS)).sum())
+
+
+def _count_non_strings(column: pd.Series) -> int:
+    # CSV values are read as strings, so this only finds values in typed formats.
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype(object)
+    if isinstance(column.dtype, pd.StringDtype):
+        return 0
+    if types.is_object_dtype(column):
+        return int(sum(not isinstance(value, str) for value in column.dropna()))
+    return int(column.notna().sum())
+
+
+_TYPE_CHECKS = {
+    "int64": _count_non_integers,
+    "float64": _count_non_floats,
+    "boolean": _count_non_booleans,
+    "string": _count_non_strings,
+}
@@ -0,0 +1,20 @@
+from steamfitter.app import commands
+from steamfitter.lib.filesystem import Catalog
+from steamfitter.lib.testing import invoke_cli
+
+
+def test_catalog_rebuild(projects_root):
+    project_name = "test-project"
+    invoke_cli(commands.create_config, [str(projects_root)])
+    invoke_cli(commands.add_project, [project_name, "-m", "test", "-d"])
+
+    catalog = Catalog(projects_root / project_name)
+    expected = catalog.query()
+    catalog.path.unlink()
+
+    result = invoke_cli(commands.rebuild_catalog)
+    assert (
+        f"Catalog for project {project_name} rebuilt with {len(expected)} directories."
+        in result.output
+    )
+    assert catalog.query() == expected
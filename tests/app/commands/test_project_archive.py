@@ -0,0 +1,32 @@
+from steamfitter.app import commands
+from steamfitter.app.directory_structure import ModelingStageDirectory, VersionDirectory
+from steamfitter.lib.testing import invoke_cli
+
+
+def test_archive_project(projects_root):
+    project_name = "test-project"
+    invoke_cli(commands.create_config, [str(projects_root)])
+    invoke_cli(commands.add_project, [project_name, "-m", "test", "-d"])
+    modeling_path = projects_root / project_name / "modeling"
+    stage = ModelingStageDirectory.create(modeling_path, name="stage", description="test")
+    for version in range(2):
+        VersionDirectory.create(stage.path, version=version, versionable_dir_name="stage")
+    stale_version, latest_version = sorted(p.name for p in stage.path.iterdir() if p.is_dir())
+    (stage.path / "latest").symlink_to(latest_version)
+
+    result = invoke_cli(commands.archive_project, ["--dry-run"])
+    assert f"Would archive {stage.path / stale_version}" in result.output
+    assert (stage.path / stale_version).exists()
+
+    result = invoke_cli(commands.archive_project, ["-t", "2"])
+    assert f"Archived {stage.path / stale_version}" in result.output
+    assert "1 stale versions processed." in result.output
+    assert not (stage.path / stale_version).exists()
+    assert (
+        projects_root
+        / project_name
+        / "archive"
+        / "modeling"
+        / "stage"
+        / f"{stale_version}.tar.gz"
+    ).exists()
@@ -0,0 +1,25 @@
+from steamfitter.app import commands
+from steamfitter.app.directory_structure import ModelingStageDirectory, VersionDirectory
+from steamfitter.lib.testing import invoke_cli
+
+
+def test_dedup_project(projects_root):
+    project_name = "test-project"
+    invoke_cli(commands.create_config, [str(projects_root)])
+    invoke_cli(commands.add_project, [project_name, "-m", "test", "-d"])
+    modeling_path = projects_root / project_name / "modeling"
+    stage = ModelingStageDirectory.create(modeling_path, name="stage", description="test")
+    for version in range(3):
+        version = VersionDirectory.create(
+            stage.path, version=version, versionable_dir_name="stage"
+        )
+        (version.path / "reference.csv").write_text("a,b\n1,2\n" * 1000)
+
+    result = invoke_cli(commands.dedup_project, ["--dry-run"])
+    assert "Would link 2 duplicate files" in result.output
+
+    result = invoke_cli(commands.dedup_project)
+    assert "Linked 2 duplicate files" in result.output
+
+    result = invoke_cli(commands.dedup_project)
+    assert "Linked 0 duplicate files, reclaiming 0 B." in result.output
@@ -0,0 +1,29 @@
+from steamfitter.app import commands
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.lib.filesystem import Metadata
+from steamfitter.lib.testing import invoke_cli
+
+
+def test_migrate_metadata(projects_root):
+    project_name = "test-project"
+    invoke_cli(commands.create_config, [str(projects_root)])
+    invoke_cli(commands.add_project, [project_name, "-m", "test", "-d"])
+    project_path = projects_root / project_name
+    names = sorted(d["name"] for d in ProjectDirectory(project_path).iter_subdirectories())
+
+    result = invoke_cli(commands.migrate_metadata, ["--format", "json", "--dry-run"])
+    assert "Would convert" in result.output
+    assert (project_path / "metadata.yaml").exists()
+
+    result = invoke_cli(commands.migrate_metadata, ["--format", "json"])
+    assert "Converted" in result.output
+    assert not list(project_path.rglob("metadata.yaml"))
+    assert (project_path / "metadata.json").exists()
+    project = ProjectDirectory(project_path)
+    assert sorted(d["name"] for d in project.iter_subdirectories()) == names
+
+    result = invoke_cli(commands.migrate_metadata, ["--format", "json"])
+    assert "Converted 0 of" in result.output
+
+    invoke_cli(commands.migrate_metadata, ["--format", "yaml"])
+    assert Metadata.find_file(project_path).name == "metadata.yaml"
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from steamfitter.app import commands
+from steamfitter.app.directory_structure import ProjectDirectory, VersionDirectory
+from steamfitter.lib.filesystem import Metadata
+from steamfitter.lib.io import tabular
+from steamfitter.lib.testing import invoke_cli
+
+
+def test_convert_source(projects_root):
+    pytest.importorskip("pyarrow")
+    project_name = "test-project"
+    invoke_cli(commands.create_config, [str(projects_root)])
+    invoke_cli(commands.add_project, [project_name, "-m", "test", "-d"])
+    invoke_cli(commands.add_source, ["source", "-m", "test"])
+    extracted_data = ProjectDirectory(
+        projects_root / project_name
+    ).data_directory.extracted_data_directory
+    extracted_data.add_source_column("value", "int", True, "A value.")
+    source = extracted_data.get_source("source")
+    version = VersionDirectory.create(source.path, version=0, versionable_dir_name="source")
+    tabular.write(version.path / "raw_data.csv", pd.DataFrame({"value": range(10)}))
+
+    result = invoke_cli(commands.convert_source, ["source", "--chunk-size", "4"])
+
+    assert "Converted 10 rows of raw_data.csv into 3 Parquet files" in result.output
+    assert str(version.read_data("raw_data")["value"].dtype) == "Int64"
+    conversion = Metadata.from_directory(version.path)["conversions"]["raw_data.csv"]
+    assert conversion["row_count"] == 10
+    assert conversion["output"] == "raw_data.parquet"
@@ -0,0 +1,23 @@
+from steamfitter.app import commands
+from steamfitter.app.directory_structure import DeliverablesDirectory
+from steamfitter.lib.filesystem import get_trash_root
+from steamfitter.lib.testing import invoke_cli
+
+
+def test_reap_trash_empty(projects_root):
+    invoke_cli(commands.create_config, [str(projects_root)])
+
+    result = invoke_cli(commands.reap_trash)
+    assert "Deleted 0 files from the trash." in result.output
+
+
+def test_reap_trash(projects_root):
+    project_path = projects_root / "test-project"
+    invoke_cli(commands.create_config, [str(projects_root)])
+    invoke_cli(commands.add_project, ["test-project", "-m", "test"])
+    (project_path / "deliverables" / "report.pdf").write_text("report")
+    DeliverablesDirectory.remove(project_path / "deliverables")
+
+    result = invoke_cli(commands.reap_trash)
+    assert "Deleted 2 files from the trash." in result.output
+    assert list(get_trash_root(project_path).iterdir()) == []
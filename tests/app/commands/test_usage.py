@@ -0,0 +1,24 @@
+from steamfitter.app import commands
+from steamfitter.app.directory_structure import ModelingStageDirectory
+from steamfitter.lib.testing import invoke_cli
+
+
+def test_usage(projects_root):
+    project_name = "test-project"
+    invoke_cli(commands.create_config, [str(projects_root)])
+    invoke_cli(commands.add_project, [project_name, "-m", "test", "-d"])
+    modeling_path = projects_root / project_name / "modeling"
+    for name, size in [("small", 10), ("large", 100_000)]:
+        stage = ModelingStageDirectory.create(modeling_path, name=name, description="test")
+        (stage.path / "data.csv").write_text("x" * size)
+
+    result = invoke_cli(commands.show_usage)
+    lines = result.output.splitlines()
+    assert lines[0].endswith(f"  {project_name}")
+    names = [line.split()[-1] for line in lines]
+    assert names.index("large") < names.index("small")
+
+    result = invoke_cli(commands.show_usage, ["--depth", "1", "--full"])
+    names = [line.split()[-1] for line in result.output.splitlines()]
+    assert "modeling" in names
+    assert "large" not in names
@@ -0,0 +1,75 @@
+import pytest
+
+from steamfitter.app import configuration as configuration_module
+from steamfitter.app.configuration import Configuration
+
+
+@pytest.fixture
+def writes(monkeypatch, config_path):
+    """Record the configurations written to disk."""
+    written = []
+    dump = configuration_module.io.dump
+
+    def record(path, data, exist_ok=False):
+        if path == config_path:
+            written.append(data.copy())
+        dump(path, data, exist_ok=exist_ok)
+
+    monkeypatch.setattr(configuration_module.io, "dump", record)
+    return written
+
+
+def test_batch_writes_once(projects_root, writes):
+    config = Configuration.create(str(projects_root))
+    writes.clear()
+
+    with config.batch():
+        config.projects_root = projects_root / "new"
+        with config.batch():
+            config.default_project = "project"
+        assert writes == []
+        config.default_project = "other-project"
+        assert writes == []
+
+    assert writes == [
+        {
+            "projects_root": str(projects_root / "new"),
+            "projects": {},
+            "default_project": "other-project",
+        }
+    ]
+    assert Configuration().default_project == "other-project"
+
+
+def test_batch_without_changes(projects_root, writes):
+    config = Configuration.create(str(projects_root))
+    writes.clear()
+    with config.batch():
+        pass
+    assert writes == []
+
+
+def test_configuration_in_batch_keeps_pending_changes(projects_root, writes):
+    config = Configuration.create(str(projects_root))
+    with config.batch():
+        config.default_project = "project"
+        # Configuration is a singleton, and mustn't reload the file mid batch.
+        assert Configuration() is config
+        assert Configuration().default_project == "project"
+    assert Configuration().default_project == "project"
+
+
+def test_batch_writes_on_error(projects_root, writes):
+    config = Configuration.create(str(projects_root))
+    writes.clear()
+    with pytest.raises(RuntimeError):
+        with config.batch():
+            config.default_project = "project"
+            raise RuntimeError
+
+    assert len(writes) == 1
+    assert Configuration().default_project == "project"
+    with config.batch():
+        config.default_project = "other-project"
+    # The failed batch was closed, so later changes are still written.
+    assert len(writes) == 2
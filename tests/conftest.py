@@ -9,3 +9,34 @@ def caplog(caplog: LogCaptureFixture):
     handler_id = logger.add(caplog.handler, format="{message}")
     yield caplog
     logger.remove(handler_id)
+
+
+@pytest.fixture
+def project_directory_path(tmp_path):
+    """A freshly created project directory."""
+    from steamfitter.app.directory_structure import ProjectDirectory
+
+    ProjectDirectory.create(tmp_path, name="test-project", description="test")
+    return tmp_path / "test-project"
+
+
+@pytest.fixture
+def populated_project_path(project_directory_path):
+    """A project directory with a few modeling stages and versions."""
+    from steamfitter.app.directory_structure import (
+        ModelingStageDirectory,
+        VersionDirectory,
+    )
+
+    modeling_path = project_directory_path / "modeling"
+    for stage_name in ["stage-a", "stage-b"]:
+        ModelingStageDirectory.create(
+            modeling_path, name=stage_name, description=f"Stage {stage_name}."
+        )
+        for version in range(3):
+            VersionDirectory.create(
+                modeling_path / stage_name,
+                version=version,
+                versionable_dir_name=stage_name,
+            )
+    return project_directory_path
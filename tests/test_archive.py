@@ -0,0 +1,237 @@
+import gzip
+import os
+import tarfile
+
+import pytest
+
+from steamfitter.app.directory_structure import (
+    ModelingStageDirectory,
+    ProjectDirectory,
+)
+from steamfitter.lib.filesystem import (
+    ARCHIVE_POLICIES,
+    archive_directory,
+    read_member,
+    restore_archive,
+)
+from steamfitter.lib.filesystem.archive import (
+    _ParallelGzipWriter,
+    get_index_path,
+    list_members,
+    load_index,
+)
+
+
+def _make_tree(root):
+    (root / "sub").mkdir(parents=True)
+    (root / "a.csv").write_text("a,b\n1,2\n")
+    (root / "sub" / "b.bin").write_bytes(bytes(range(256)) * 1000)
+    (root / "link").symlink_to("a.csv")
+
+
+def test_archive_directory(tmp_path):
+    source = tmp_path / "source"
+    _make_tree(source)
+    archive_path = tmp_path / "source.tar.gz"
+
+    stats = archive_directory(source, archive_path, compression_threads=2)
+
+    assert stats.file_count == 2
+    assert stats.data_size == 8 + 256_000
+    assert stats.archive_size == archive_path.stat().st_size
+    assert not (tmp_path / ".source.tar.gz.partial").exists()
+    with tarfile.open(archive_path) as tar:
+        assert sorted(tar.getnames()) == [
+            "source",
+            "source/a.csv",
+            "source/link",
+            "source/sub",
+            "source/sub/b.bin",
+        ]
+        assert tar.getmember("source/link").issym()
+        assert tar.extractfile("source/sub/b.bin").read() == bytes(range(256)) * 1000
+
+    with pytest.raises(FileExistsError):
+        archive_directory(source, archive_path)
+
+
+def test_parallel_gzip_writer_frames(tmp_path):
+    data = bytes(range(256)) * 100
+    output_path = tmp_path / "data.gz"
+    with output_path.open("wb") as output:
+        writer = _ParallelGzipWriter(output, threads=3, compression_level=1, frame_size=1000)
+        for i in range(0, len(data), 777):
+            writer.write(data[i : i + 777])
+        writer.close()
+
+    compressed = output_path.read_bytes()
+    # One gzip member per frame.
+    assert compressed.count(b"\x1f\x8b\x08") >= len(data) // 1000
+    assert gzip.decompress(compressed) == data
+
+
+def _make_large_tree(root):
+    root.mkdir()
+    for i in range(20):
+        # Incompressible data, so files span several small frames.
+        (root / f"file-{i}.bin").write_bytes(os.urandom(3000 + 997 * i))
+    (root / "empty.txt").write_text("")
+    (root / "nested").mkdir()
+    (root / "nested" / "data.csv").write_text("a,b\n1,2\n" * 500)
+
+
+@pytest.fixture
+def archived_tree(tmp_path):
+    source = tmp_path / "source"
+    _make_large_tree(source)
+    archive_path = tmp_path / "source.tar.gz"
+    archive_directory(source, archive_path, compression_threads=4, frame_size=4096)
+    return source, archive_path
+
+
+def test_archive_index(archived_tree):
+    source, archive_path = archived_tree
+    index = load_index(archive_path)
+    assert len(index["frames"]) > 10
+    assert index["compressed_size"] == archive_path.stat().st_size
+    assert list_members(archive_path) == sorted(
+        str(p.relative_to(source.parent)) for p in source.rglob("*") if p.is_file()
+    )
+
+
+def test_read_member(archived_tree, monkeypatch):
+    source, archive_path = archived_tree
+    decompressed = []
+    decompress = gzip.decompress
+    monkeypatch.setattr(
+        "steamfitter.lib.filesystem.archive.gzip.decompress",
+        lambda data: decompressed.append(data) or decompress(data),
+    )
+    for path in source.rglob("*"):
+        if path.is_file():
+            assert read_member(archive_path, str(path.relative_to(source.parent))) == (
+                path.read_bytes()
+            )
+            # Never more than the frames holding the file.
+            assert len(decompressed) <= path.stat().st_size // 4096 + 2
+            decompressed.clear()
+
+    with pytest.raises(KeyError):
+        read_member(archive_path, "source/missing.csv")
+
+
+def test_restore_archive(archived_tree, tmp_path):
+    source, archive_path = archived_tree
+    destination = tmp_path / "restored"
+    destination.mkdir()
+    restore_archive(archive_path, destination, decompression_threads=3)
+
+    restored = destination / "source"
+    for path in source.rglob("*"):
+        restored_path = restored / path.relative_to(source)
+        assert restored_path.exists()
+        if path.is_file():
+            assert restored_path.read_bytes() == path.read_bytes()
+
+
+def test_restore_archive_without_index(archived_tree, tmp_path):
+    source, archive_path = archived_tree
+    get_index_path(archive_path).unlink()
+    restore_archive(archive_path, tmp_path / "restored")
+    assert (tmp_path / "restored" / "source" / "nested" / "data.csv").read_text() == (
+        "a,b\n1,2\n" * 500
+    )
+
+
+def _versions(stage_path):
+    return sorted(p.name for p in stage_path.iterdir() if p.is_dir() and not p.is_symlink())
+
+
+def test_archive_hardlinks(tmp_path):
+    source = tmp_path / "v1"
+    source.mkdir()
+    (source / "x.csv").write_text("a,b\n1,2\n")
+    os.link(source / "x.csv", source / "y.csv")
+    archive_path = tmp_path / "v1.tar.gz"
+
+    stats = archive_directory(source, archive_path)
+
+    assert stats.file_count == 2
+    assert stats.data_size == 8
+    with tarfile.open(archive_path) as tar:
+        assert tar.getmember("v1/y.csv").islnk()
+    assert list_members(archive_path) == ["v1/x.csv", "v1/y.csv"]
+    assert read_member(archive_path, "v1/y.csv") == b"a,b\n1,2\n"
+
+    restore_archive(archive_path, tmp_path / "restored")
+    assert (tmp_path / "restored" / "v1" / "y.csv").read_text() == "a,b\n1,2\n"
+
+
+def test_apply_archive_policies(populated_project_path):
+    modeling_path = populated_project_path / "modeling"
+    stage_a = ModelingStageDirectory(modeling_path / "stage-a")
+    first, second, third = _versions(stage_a.path)
+    stage_a["best_version"] = first
+    stage_a._metadata.persist()
+    (stage_a.path / "latest").symlink_to(third)
+    stage_b = ModelingStageDirectory(modeling_path / "stage-b")
+    stage_b["archive_policy"] = ARCHIVE_POLICIES.delete
+    stage_b._metadata.persist()
+    *stage_b_stale, stage_b_newest = _versions(stage_b.path)
+
+    project = ProjectDirectory(populated_project_path, lazy=True)
+    dry_run = project.apply_archive_policies(dry_run=True)
+    assert [(a.path.name, a.policy) for a in dry_run] == [
+        (second, ARCHIVE_POLICIES.archive),
+        *[(v, ARCHIVE_POLICIES.delete) for v in stage_b_stale],
+    ]
+    assert _versions(stage_a.path) == [first, second, third]
+
+    actions = project.apply_archive_policies(compression_threads=2)
+    assert [(a.path, a.policy) for a in actions] == [(a.path, a.policy) for a in dry_run]
+    assert _versions(stage_a.path) == [first, third]
+    assert _versions(stage_b.path) == [stage_b_newest]
+
+    archive_path = populated_project_path / "archive" / "modeling" / "stage-a"
+    with tarfile.open(archive_path / f"{second}.tar.gz") as tar:
+        assert f"{second}/metadata.yaml" in tar.getnames()
+    archive = project.archive_directory
+    assert archive["archived_file_count"] == actions[0].stats.file_count == 1
+    assert archive["archived_data_size"] == "0.00 GB"
+
+    assert project.apply_archive_policies() == []
+
+
+def test_apply_archive_policies_keeps_newest_unmarked_version(populated_project_path):
+    stage = ModelingStageDirectory(populated_project_path / "modeling" / "stage-a")
+    stage["archive_policy"] = ARCHIVE_POLICIES.delete
+    stage._metadata.persist()
+    *stale, newest = _versions(stage.path)
+    assert not stage["best_version"] and not stage["latest_version"]
+
+    project = ProjectDirectory(populated_project_path, lazy=True)
+    actions = project.apply_archive_policies()
+
+    assert [a.path.name for a in actions if a.path.parent == stage.path] == stale
+    assert _versions(stage.path) == [newest]
+
+
+def test_restore_archived_version(populated_project_path, tmp_path):
+    stage_path = populated_project_path / "modeling" / "stage-a"
+    first, *_ = _versions(stage_path)
+    (stage_path / first / "results.csv").write_text("a,b\n1,2\n")
+    project = ProjectDirectory(populated_project_path, lazy=True)
+    project.apply_archive_policies()
+    assert not (stage_path / first).exists()
+
+    archive = project.archive_directory
+    restored = archive.restore(stage_path / first, tmp_path, member="results.csv")
+    assert restored == tmp_path / "results.csv"
+    assert restored.read_text() == "a,b\n1,2\n"
+
+    restored = archive.restore(stage_path / first, tmp_path)
+    assert restored == tmp_path / first
+    assert sorted(p.name for p in restored.iterdir()) == ["metadata.yaml", "results.csv"]
+
+    with pytest.raises(FileNotFoundError):
+        archive.restore(stage_path / "missing", tmp_path)
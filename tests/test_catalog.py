@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import pytest
+
+from steamfitter.app.directory_structure import (
+    ModelingStageDirectory,
+    ProjectDirectory,
+)
+from steamfitter.lib.filesystem import Catalog, Metadata
+from steamfitter.lib.filesystem import catalog as catalog_module
+from steamfitter.lib.filesystem import load_tree
+
+
+def test_project_creation_creates_catalog(project_directory_path):
+    catalog = Catalog.find(project_directory_path / "data" / "extracted_data")
+    assert catalog is not None
+    assert catalog.project_root == project_directory_path
+
+    names = {m["name"] for m in catalog.query()}
+    assert {"test-project", "archive", "data", "modeling", "extracted_data"} <= names
+
+
+def test_catalog_write_through(populated_project_path):
+    catalog = Catalog(populated_project_path)
+    stage_path = populated_project_path / "modeling" / "stage-a"
+
+    versions = catalog.versions(stage_path)
+    assert len(versions) == 3
+    assert [m["name"] for m in catalog.query(parent=stage_path)] == versions
+
+    metadata = Metadata.from_directory(stage_path)
+    metadata["best_version"] = versions[0]
+    metadata.persist()
+    assert catalog.best_versions("modeling_stage") == {
+        "stage-a": versions[0],
+        "stage-b": "",
+    }
+
+    ModelingStageDirectory.remove(stage_path)
+    assert catalog.get(stage_path) is None
+    assert catalog.versions(stage_path) == []
+    assert catalog.get(populated_project_path / "modeling" / "stage-b") is not None
+
+
+def test_catalog_query_unindexed_field(project_directory_path):
+    with pytest.raises(ValueError):
+        Catalog(project_directory_path).query(description="test")
+
+
+def test_catalog_rebuild(populated_project_path):
+    catalog = Catalog(populated_project_path)
+    expected = catalog.query()
+    catalog.path.unlink()
+
+    catalog = Catalog.create(populated_project_path)
+    assert catalog.query() == []
+    count = catalog.rebuild(load_tree(populated_project_path, ProjectDirectory))
+    assert count == len(expected)
+    assert catalog.query() == expected
+
+
+def test_catalog_find_caches_missing_catalogs(tmp_path, monkeypatch):
+    stage_path = tmp_path / "project" / "modeling" / "stage"
+    stage_path.mkdir(parents=True)
+    checked = []
+    exists = Path.exists
+    monkeypatch.setattr(Path, "exists", lambda path: checked.append(path) or exists(path))
+
+    assert Catalog.find(stage_path) is None
+    assert len(checked) == len(stage_path.parents) + 1
+    checked.clear()
+    assert Catalog.find(stage_path) is None
+    assert Catalog.find(stage_path.parent) is None
+    assert checked == []
+    # A sibling only checks itself.
+    assert Catalog.find(stage_path.parent / "other-stage") is None
+    assert len(checked) == 1
+
+    catalog = Catalog.create(tmp_path / "project")
+    assert Catalog.find(stage_path).project_root == catalog.project_root
+    assert Catalog.find(tmp_path) is None
+
+
+def test_catalog_find_rechecks_missing_catalogs(tmp_path, monkeypatch):
+    stage_path = tmp_path / "project" / "modeling" / "stage"
+    stage_path.mkdir(parents=True)
+    assert Catalog.find(stage_path) is None
+
+    # Created by another process.
+    catalog_path = tmp_path / "project" / ".steamfitter" / "catalog.sqlite"
+    catalog_path.parent.mkdir()
+    catalog_path.touch()
+    assert Catalog.find(stage_path) is None
+    monkeypatch.setattr(catalog_module, "_MISSING_CATALOG_TTL", 0)
+    assert Catalog.find(stage_path).project_root == tmp_path / "project"
+
+
+def test_catalog_find_rechecks_removed_catalogs(tmp_path):
+    stage_path = tmp_path / "project" / "modeling" / "stage"
+    stage_path.mkdir(parents=True)
+    catalog = Catalog.create(tmp_path / "project")
+    assert Catalog.find(stage_path).project_root == catalog.project_root
+
+    # E.g. the project's creation was rolled back.
+    catalog.path.unlink()
+    assert Catalog.find(stage_path) is None
+
+
+def test_catalog_find_cache_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_module, "_PROJECT_ROOTS_SIZE", 10)
+    for i in range(20):
+        Catalog.find(tmp_path / f"directory-{i}")
+    assert len(catalog_module._PROJECT_ROOTS) == 10
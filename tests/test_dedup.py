@@ -0,0 +1,92 @@
+import os
+
+from steamfitter.app.directory_structure import ModelingStageDirectory
+from steamfitter.lib.filesystem import Catalog
+from steamfitter.lib.filesystem import dedup as dedup_module
+from steamfitter.lib.filesystem import deduplicate, disk_usage
+from steamfitter.lib.filesystem import usage as usage_module
+
+
+def _make_versions(root):
+    for i, version in enumerate(["v1", "v2", "v3"]):
+        path = root / version
+        (path / "config").mkdir(parents=True)
+        (path / "reference.csv").write_text("a,b\n" * 2000)
+        (path / "config" / "settings.yaml").write_text("x: 1\n")
+        (path / "results.csv").write_text(f"{i}\n" * 100)
+        (path / "metadata.yaml").write_text("name: same\n")
+        (path / ".metadata.lock").touch()
+        (path / "empty.csv").touch()
+    (root / "v3" / "link.csv").symlink_to(root / "v1" / "reference.csv")
+
+
+def test_deduplicate(tmp_path):
+    _make_versions(tmp_path)
+    versions = [tmp_path / v for v in ["v3", "v1", "v2"]]
+
+    dry_run = deduplicate(versions, dry_run=True)
+    assert dry_run.files_linked == 4
+    assert (tmp_path / "v2" / "reference.csv").stat().st_nlink == 1
+
+    stats = deduplicate(versions)
+    assert stats == dry_run
+    assert stats.bytes_reclaimed > 0
+
+    reference = (tmp_path / "v1" / "reference.csv").stat()
+    assert reference.st_nlink == 3
+    for version in ["v2", "v3"]:
+        assert (tmp_path / version / "reference.csv").stat().st_ino == reference.st_ino
+        assert (tmp_path / version / "reference.csv").read_text() == "a,b\n" * 2000
+        # Different contents and metadata files are left alone.
+        assert (tmp_path / version / "results.csv").stat().st_nlink == 1
+        assert (tmp_path / version / "metadata.yaml").stat().st_nlink == 1
+        assert (tmp_path / version / ".metadata.lock").stat().st_nlink == 1
+        assert (tmp_path / version / "empty.csv").stat().st_nlink == 1
+    assert (tmp_path / "v3" / "link.csv").is_symlink()
+    assert not list(tmp_path.rglob("*.link"))
+
+    assert deduplicate(versions) == (0, 0)
+
+
+def test_deduplicate_uses_cached_hashes(tmp_path, monkeypatch):
+    _make_versions(tmp_path)
+    Catalog.create(tmp_path)
+    catalog = Catalog(tmp_path)
+    versions = [tmp_path / v for v in ["v1", "v2"]]
+    hashed = []
+    hash_file = dedup_module._hash_file
+    monkeypatch.setattr(
+        dedup_module, "_hash_file", lambda f: hashed.append(f.path) or hash_file(f)
+    )
+
+    deduplicate(versions, catalog=catalog, dry_run=True)
+    # Everything but the files with a unique size.
+    assert len(hashed) == 6
+
+    hashed.clear()
+    (tmp_path / "v2" / "config" / "settings.yaml").write_text("x: 2\n")
+    deduplicate(versions, catalog=catalog, dry_run=True)
+    assert hashed == [str(tmp_path / "v2" / "config" / "settings.yaml")]
+
+
+def test_deduplicate_invalidates_cached_usage(tmp_path, monkeypatch):
+    root = tmp_path / "versions"
+    _make_versions(root)
+    Catalog.create(tmp_path)
+    catalog = Catalog(tmp_path)
+    monkeypatch.setattr(usage_module, "_RACY_INTERVAL_NS", -(10**18))
+    disk_usage(root, catalog=catalog)
+
+    deduplicate([root / v for v in ["v1", "v2", "v3"]], catalog=catalog)
+    # v1 keeps the originals and is unchanged, but its files now have other links.
+    assert disk_usage(root, catalog=catalog) == disk_usage(root)
+
+
+def test_versioned_directory_deduplicate(populated_project_path):
+    stage = ModelingStageDirectory(populated_project_path / "modeling" / "stage-a")
+    for version in stage.versions:
+        (version.path / "reference.csv").write_text("a,b\n1,2\n")
+
+    assert stage.deduplicate().files_linked == 2
+    inodes = {os.stat(v.path / "reference.csv").st_ino for v in stage.versions}
+    assert len(inodes) == 1
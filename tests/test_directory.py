@@ -0,0 +1,252 @@
+import os
+import shutil
+
+import pytest
+from git import Repo
+
+from steamfitter.app.directory_structure import (
+    DataDirectory,
+    ExtractedDataDirectory,
+    ProcessedMeasureDirectory,
+    ProjectDirectory,
+    VersionDirectory,
+)
+from steamfitter.lib.filesystem import (
+    Catalog,
+    Directory,
+    Metadata,
+    SteamfitterDirectoryError,
+    get_directory_class,
+    load_tree,
+)
+
+
+def test_eager_directory_collects_subdirectories(project_directory_path):
+    project_dir = ProjectDirectory(project_directory_path)
+    assert project_dir.is_loaded
+    assert project_dir.data_directory.is_loaded
+
+
+def test_lazy_directory_defers_subdirectories(project_directory_path):
+    project_dir = ProjectDirectory(project_directory_path, lazy=True)
+    assert not project_dir.is_loaded
+
+    data_dir = project_dir.data_directory
+    assert project_dir.is_loaded
+    assert isinstance(data_dir, DataDirectory)
+    assert data_dir.parent is project_dir
+    assert not data_dir.is_loaded
+
+    extracted_data_dir = data_dir.extracted_data_directory
+    assert isinstance(extracted_data_dir, ExtractedDataDirectory)
+    assert not extracted_data_dir.is_loaded
+
+
+def test_iter_subdirectories(project_directory_path):
+    eager = ProjectDirectory(project_directory_path)
+    lazy = ProjectDirectory(project_directory_path, lazy=True)
+
+    eager_names = sorted(d["name"] for d in eager.iter_subdirectories())
+    lazy_names = sorted(d["name"] for d in lazy.iter_subdirectories())
+    assert eager_names == lazy_names == ["archive", "data", "deliverables", "modeling"]
+    assert [d["name"] for d in lazy.iter_subdirectories(DataDirectory)] == ["data"]
+
+
+def test_directories_are_compact(populated_project_path):
+    project_dir = load_tree(populated_project_path, ProjectDirectory)
+    stack = [project_dir]
+    while stack:
+        directory = stack.pop()
+        assert not hasattr(directory, "__dict__"), type(directory).__name__
+        assert not hasattr(directory._metadata, "__dict__")
+        assert isinstance(directory._subdirectories, tuple)
+        stack.extend(directory.iter_subdirectories())
+
+    versions = [
+        v
+        for stage in project_dir.modeling_directory.iter_subdirectories()
+        for v in stage.iter_subdirectories(VersionDirectory)
+    ]
+    assert all(v["directory_class"] is versions[0]["directory_class"] for v in versions)
+
+
+def test_get_directory_class_registered():
+    import_path = ProjectDirectory.make_import_path()
+    assert get_directory_class(import_path) is ProjectDirectory
+
+
+def test_get_directory_class_registers_subclasses():
+    class ScratchDirectory(Directory):
+        pass
+
+    assert get_directory_class(ScratchDirectory.make_import_path()) is ScratchDirectory
+
+
+def test_get_directory_class_unknown():
+    with pytest.raises(ModuleNotFoundError):
+        get_directory_class("fairyland.MagicDirectory")
+
+
+def _bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.mark.parametrize("loader", [ProjectDirectory, load_tree])
+def test_refresh_unchanged(populated_project_path, loader):
+    project_dir = loader(populated_project_path)
+    assert not project_dir.refresh()
+
+
+@pytest.mark.parametrize("loader", [ProjectDirectory, load_tree])
+def test_refresh_new_and_removed_versions(populated_project_path, loader):
+    project_dir = loader(populated_project_path)
+    stage, other_stage = project_dir.modeling_directory.iter_subdirectories()
+    other_versions = list(other_stage.iter_subdirectories())
+
+    new_version = VersionDirectory.create(
+        stage.path, version="new", versionable_dir_name=stage["name"]
+    )
+    _bump_mtime(stage.path)
+    assert project_dir.refresh()
+    versions = list(stage.iter_subdirectories(VersionDirectory))
+    assert len(versions) == 4
+    assert new_version.path in {v.path for v in versions}
+    assert list(other_stage.iter_subdirectories()) == other_versions
+
+    shutil.rmtree(new_version.path)
+    _bump_mtime(stage.path)
+    assert project_dir.refresh()
+    assert len(list(stage.iter_subdirectories(VersionDirectory))) == 3
+
+
+def test_refresh_metadata(populated_project_path):
+    project_dir = ProjectDirectory(populated_project_path)
+    modeling_dir = project_dir.modeling_directory
+
+    metadata = Metadata.from_directory(modeling_dir.path)
+    metadata["pipeline_stages"] = ["stage-a", "stage-b"]
+    metadata.persist()
+    _bump_mtime(modeling_dir.path / "metadata.yaml")
+
+    assert modeling_dir["pipeline_stages"] == []
+    assert project_dir.refresh()
+    assert project_dir.modeling_directory is modeling_dir
+    assert modeling_dir["pipeline_stages"] == ["stage-a", "stage-b"]
+
+
+def test_refresh_lazy_directory(populated_project_path):
+    project_dir = ProjectDirectory(populated_project_path, lazy=True)
+    assert not project_dir.refresh()
+    assert not project_dir.is_loaded
+
+
+def _measure_specs(root, names):
+    return [
+        (ProcessedMeasureDirectory, root, {"name": name, "description": f"The {name}."})
+        for name in names
+    ]
+
+
+def test_create_many(project_directory_path):
+    root = project_directory_path / "data" / "processed_data"
+    names = [f"measure-{i}" for i in range(20)]
+
+    measures = Directory.create_many(_measure_specs(root, names))
+
+    assert [m["name"] for m in measures] == names
+    assert all(isinstance(m, ProcessedMeasureDirectory) for m in measures)
+    processed_data = ProjectDirectory(
+        project_directory_path
+    ).data_directory.processed_data_directory
+    assert sorted(d["name"] for d in processed_data.iter_subdirectories()) == sorted(names)
+    assert len(Catalog(project_directory_path).query(parent=root)) == len(names)
+
+
+def test_create_many_with_initial_subdirectories(tmp_path):
+    specs = [(ProjectDirectory, tmp_path, {"name": n, "description": n}) for n in "ab"]
+    projects = Directory.create_many(specs)
+
+    for project in projects:
+        loaded = ProjectDirectory(project.path)
+        assert len(list(loaded.iter_subdirectories())) == 4
+
+
+def test_create_many_rolls_back(project_directory_path):
+    root = project_directory_path / "data" / "processed_data"
+    (root / "measure-5").mkdir()
+
+    with pytest.raises(FileExistsError):
+        Directory.create_many(_measure_specs(root, [f"measure-{i}" for i in range(10)]))
+
+    assert sorted(p.name for p in root.iterdir()) == ["measure-5", "metadata.yaml"]
+    assert Catalog(project_directory_path).query(parent=root) == []
+
+
+def test_create_many_duplicate_paths(project_directory_path):
+    root = project_directory_path / "data" / "processed_data"
+    with pytest.raises(SteamfitterDirectoryError):
+        Directory.create_many(_measure_specs(root, ["measure", "measure"]))
+    assert not (root / "measure").exists()
+
+
+def test_extracted_data_batch_commits_once(project_directory_path):
+    extracted_data_dir = ProjectDirectory(
+        project_directory_path
+    ).data_directory.extracted_data_directory
+    repo = Repo(extracted_data_dir.path)
+    commit_count = len(list(repo.iter_commits()))
+
+    with extracted_data_dir.batch():
+        extracted_data_dir.add_source("source-a", "A source.")
+        extracted_data_dir.add_source("source-b", "Another source.")
+        for column in ["x", "y"]:
+            extracted_data_dir.add_source_column(column, "int", False, "A column.")
+
+    assert len(list(repo.iter_commits())) == commit_count + 1
+    assert repo.head.commit.message == (
+        "Added sources source-a, source-b. Added source columns x, y."
+    )
+    metadata = Metadata.from_directory(extracted_data_dir.path)
+    assert metadata["sources"] == {"source-a": 1, "source-b": 2}
+    assert sorted(metadata["columns"]) == ["x", "y"]
+
+
+def test_extracted_data_ignores_steamfitter_files_in_old_repos(project_directory_path):
+    extracted_data_dir = ProjectDirectory(
+        project_directory_path
+    ).data_directory.extracted_data_directory
+    repo = Repo(extracted_data_dir.path)
+    # Repositories created before the lock file existed don't ignore it.
+    gitignore_path = extracted_data_dir.path / ".gitignore"
+    gitignore_path.write_text("metadata.yaml\n*/*/***\n")
+    (extracted_data_dir.path / ".metadata.lock").touch()
+    repo.git.add("--force", ".gitignore", ".metadata.lock")
+    repo.index.commit("Old commit.")
+
+    extracted_data_dir.add_source("source-a", "A source.")
+
+    committed = {item.path for item in repo.head.commit.tree.traverse()}
+    assert ".metadata.lock" not in committed
+    assert (extracted_data_dir.path / ".metadata.lock").exists()
+    assert {".metadata.lock", ".version_counter", "metadata.log"} <= set(
+        gitignore_path.read_text().splitlines()
+    )
+    assert not repo.is_dirty(untracked_files=True)
+
+
+def test_extracted_data_column_dtypes(project_directory_path):
+    extracted_data_dir = ProjectDirectory(
+        project_directory_path
+    ).data_directory.extracted_data_directory
+    with extracted_data_dir.batch():
+        extracted_data_dir.add_source_column("count", "int", False, "A count.")
+        extracted_data_dir.add_source_column("deaths", "int", True, "Maybe missing.")
+        extracted_data_dir.add_source_column("name", "str", False, "A name.")
+        extracted_data_dir.add_source_column("shape", "geometry", False, "Unknown type.")
+
+    assert extracted_data_dir.get_column_dtypes() == {
+        "count": "int64",
+        "deaths": "Int64",
+        "name": "string",
+    }
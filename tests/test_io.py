@@ -0,0 +1,43 @@
+import pytest
+
+from steamfitter.lib import io
+from steamfitter.lib.filesystem import Metadata
+
+
+@pytest.mark.parametrize(
+    "file_name, backend",
+    [
+        ("metadata.yaml", io.yaml),
+        ("metadata.yml", io.yaml),
+        ("metadata.json", io.json),
+        ("metadata.msgpack", io.msgpack),
+        ("steamfitter.conf", io.yaml),
+    ],
+)
+def test_get_backend(file_name, backend):
+    assert io.get_backend(file_name) is backend
+
+
+@pytest.mark.parametrize("file_name", ["data.yaml", "data.json", "data.msgpack"])
+def test_round_trip(tmp_path, file_name):
+    if file_name.endswith(".msgpack"):
+        pytest.importorskip("msgpack")
+    data = {"name": "test", "provenance": {"stage": {"inputs": [1, 2.5, None, "a"]}}}
+    io.dump(tmp_path / file_name, data)
+    assert io.load(tmp_path / file_name) == data
+    with pytest.raises(FileExistsError):
+        io.dump(tmp_path / file_name, data)
+
+
+def test_metadata_keeps_its_format(tmp_path):
+    Metadata.create(tmp_path, name="test", directory_type="test")
+    Metadata.convert(tmp_path, "metadata.json")
+
+    metadata = Metadata.from_directory(tmp_path)
+    metadata["name"] = "changed"
+    metadata.persist()
+
+    assert not (tmp_path / "metadata.yaml").exists()
+    assert io.load(tmp_path / "metadata.json")["name"] == "changed"
+    with pytest.raises(FileExistsError):
+        Metadata.create(tmp_path, name="test", directory_type="test")
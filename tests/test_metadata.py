@@ -0,0 +1,221 @@
+import datetime
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from steamfitter.lib.filesystem import metadata as metadata_module
+from steamfitter.lib.filesystem.metadata import Metadata, MetadataCache
+from steamfitter.lib.io import yaml as io
+
+
+@pytest.fixture
+def metadata_root(tmp_path):
+    Metadata.create(tmp_path, name="test", directory_type="test")
+    return tmp_path
+
+
+def test_metadata_cache_hits_and_misses(metadata_root):
+    cache = MetadataCache()
+    metadata_path = metadata_root / "metadata.yaml"
+
+    first = cache.load(metadata_path)
+    second = cache.load(metadata_path)
+    assert first == second
+    assert first is not second
+    assert cache.info() == (1, 1, cache.maxsize, 1)
+
+
+def test_metadata_cache_returns_copies(metadata_root):
+    cache = MetadataCache()
+    metadata_path = metadata_root / "metadata.yaml"
+
+    cache.load(metadata_path)["name"] = "changed"
+    assert cache.load(metadata_path)["name"] == "test"
+
+
+def test_metadata_cache_interns_repeated_strings(tmp_path):
+    cache = MetadataCache()
+    for name in ["a", "b"]:
+        (tmp_path / name).mkdir()
+        Metadata.create(tmp_path / name, name=name, directory_type="".join(["te", "st"]))
+
+    first = cache.load(tmp_path / "a" / "metadata.yaml")
+    second = cache.load(tmp_path / "b" / "metadata.yaml")
+    assert first["directory_type"] is second["directory_type"]
+    first_keys = {key: key for key in first}
+    assert all(first_keys[key] is key for key in second)
+
+
+def test_metadata_cache_detects_changes(metadata_root):
+    cache = MetadataCache()
+    metadata_path = metadata_root / "metadata.yaml"
+    cache.load(metadata_path)
+
+    metadata = Metadata.from_directory(metadata_root)
+    metadata["name"] = "a much longer name"
+    metadata.persist()
+    stat = metadata_path.stat()
+    os.utime(metadata_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert cache.load(metadata_path)["name"] == "a much longer name"
+    assert cache.info().misses == 2
+
+
+def test_metadata_cache_eviction(tmp_path):
+    cache = MetadataCache(maxsize=2)
+    for name in "abc":
+        root = tmp_path / name
+        root.mkdir()
+        Metadata.create(root, name=name)
+        cache.load(root / "metadata.yaml")
+    assert cache.info().currsize == 2
+
+    cache.load(tmp_path / "a" / "metadata.yaml")
+    assert cache.info().misses == 4
+
+
+def test_metadata_cache_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        MetadataCache().load(tmp_path / "metadata.yaml")
+
+
+def test_persist_replaces_file_atomically(metadata_root):
+    metadata_path = metadata_root / "metadata.yaml"
+    metadata_path.chmod(0o640)
+    metadata = Metadata.from_directory(metadata_root)
+
+    metadata["name"] = "changed"
+    metadata.persist()
+
+    assert Metadata.from_directory(metadata_root)["name"] == "changed"
+    assert metadata_path.stat().st_mode & 0o777 == 0o640
+    assert sorted(p.name for p in metadata_root.iterdir()) == ["metadata.yaml"]
+
+
+def test_create_refuses_to_overwrite(metadata_root):
+    with pytest.raises(FileExistsError):
+        Metadata.create(metadata_root, name="other", directory_type="test")
+    assert Metadata.from_directory(metadata_root)["name"] == "test"
+
+
+def _increment_counter(root, n):
+    metadata = Metadata.from_directory(root)
+    for _ in range(n):
+        with metadata.locked_update() as md:
+            md["counter"] = md["counter"] + 1 if "counter" in md else 1
+
+
+def test_locked_update_loses_no_updates(metadata_root):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_increment_counter, args=(metadata_root, 20)) for _ in range(8)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert Metadata.from_directory(metadata_root)["counter"] == 160
+
+
+def test_batch_writes_once(metadata_root, monkeypatch):
+    metadata = Metadata.from_directory(metadata_root)
+    writes = []
+    dump = io.dump
+    monkeypatch.setattr(
+        io, "dump", lambda *args, **kwargs: writes.append(dump(*args, **kwargs))
+    )
+
+    with metadata.batch():
+        for i in range(10):
+            metadata["counter"] = i
+            metadata.persist()
+        with metadata.batch():
+            metadata.persist()
+        assert not writes
+
+    assert len(writes) == 1
+    assert Metadata.from_directory(metadata_root)["counter"] == 9
+
+
+def test_locked_update_in_batch_locks_once(metadata_root):
+    metadata = Metadata.from_directory(metadata_root)
+    metadata["name"] = "changed"
+    with metadata.batch():
+        metadata.persist()
+        for _ in range(3):
+            with metadata.locked_update() as md:
+                md["counter"] = md["counter"] + 1 if "counter" in md else 1
+        # Changes made before the first locked update are written, not lost.
+        assert Metadata.from_directory(metadata_root)["name"] == "changed"
+        assert "counter" not in Metadata.from_directory(metadata_root)
+
+    assert Metadata.from_directory(metadata_root)["counter"] == 3
+
+
+class JournaledMetadata(Metadata):
+    __slots__ = ()
+
+    JOURNALED = True
+
+
+def test_journaled_persist_appends_changes(metadata_root):
+    metadata_path = metadata_root / "metadata.yaml"
+    journal_path = metadata_root / "metadata.log"
+    metadata = JournaledMetadata.from_directory(metadata_root)
+    document = metadata_path.read_text()
+    signature = metadata.signature
+
+    metadata["provenance"] = {"stage-a": {"version": 1}}
+    metadata.persist()
+    metadata["provenance"]["stage-b"] = {"version": 2}
+    metadata.persist()
+
+    assert metadata_path.read_text() == document
+    records = [json.loads(line) for line in journal_path.read_text().splitlines()]
+    assert records[1]["set"] == [[["provenance", "stage-b"], {"version": 2}]]
+    assert Metadata.is_stale(metadata_root, signature)
+    assert Metadata.from_directory(metadata_root)["provenance"] == {
+        "stage-a": {"version": 1},
+        "stage-b": {"version": 2},
+    }
+
+
+def test_journal_is_compacted(metadata_root, monkeypatch):
+    monkeypatch.setattr(metadata_module, "JOURNAL_COMPACTION_MIN_SIZE", 0)
+    metadata = JournaledMetadata.from_directory(metadata_root)
+    for i in range(10):
+        metadata["counter"] = i
+        metadata.persist()
+
+    # The journal never outgrows the metadata file.
+    journal_path = metadata_root / "metadata.log"
+    journal_size = journal_path.stat().st_size if journal_path.exists() else 0
+    assert journal_size <= (metadata_root / "metadata.yaml").stat().st_size
+    assert io.load(metadata_root / "metadata.yaml")["counter"] > 0
+    assert Metadata.from_directory(metadata_root)["counter"] == 9
+
+
+def test_journal_falls_back_to_full_write(metadata_root):
+    metadata = JournaledMetadata.from_directory(metadata_root)
+    metadata["created"] = datetime.date(2023, 1, 1)
+    metadata.persist()
+
+    assert not (metadata_root / "metadata.log").exists()
+    assert io.load(metadata_root / "metadata.yaml")["created"] == datetime.date(2023, 1, 1)
+
+
+def test_journal_falls_back_to_full_write_for_values_json_changes(metadata_root):
+    metadata = JournaledMetadata.from_directory(metadata_root)
+    metadata["draws"] = {1: "draw-1", 2: "draw-2"}
+    metadata.persist()
+    metadata["age_range"] = (0, 5)
+    metadata.persist()
+
+    assert not (metadata_root / "metadata.log").exists()
+    loaded = Metadata.from_directory(metadata_root)
+    assert loaded["draws"] == {1: "draw-1", 2: "draw-2"}
+    assert list(loaded["age_range"]) == [0, 5]
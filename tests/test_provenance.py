@@ -0,0 +1,80 @@
+import time
+
+from steamfitter.lib.filesystem import Metadata, resolve_lineage
+from steamfitter.lib.filesystem.metadata import RunMetadata
+
+
+def run_stage(root, name, upstream=()):
+    path = root / name
+    path.mkdir()
+    metadata = RunMetadata({"root": str(path), "name": name}, application_name="model")
+    metadata["start_time"] = time.time()
+    for upstream_path in upstream:
+        metadata.record_prior_stage_provenance(upstream_path / "metadata.yaml")
+    metadata.persist()
+    return path
+
+
+def test_provenance_is_recorded_by_reference(tmp_path):
+    a = run_stage(tmp_path, "a")
+    b = run_stage(tmp_path, "b", [a])
+    c = run_stage(tmp_path, "c", [b])
+
+    provenance = Metadata.from_directory(c)["model"]["provenance"]
+    assert list(provenance) == [str(b)]
+    reference = provenance[str(b)]
+    assert reference["name"] == "b"
+    assert reference["application"] == "model"
+    assert len(reference["sha256"]) == 64
+
+
+def test_resolve_lineage(tmp_path):
+    a = run_stage(tmp_path, "a")
+    b = run_stage(tmp_path, "b", [a])
+    c = run_stage(tmp_path, "c", [a, b])
+
+    lineage = resolve_lineage(c / "metadata.yaml")
+    assert [entry.metadata["name"] for entry in lineage.values()] == ["c", "a", "b"]
+    assert lineage[str(c)].upstream == (str(a), str(b))
+    assert all(entry.verified for entry in lineage.values())
+    assert resolve_lineage(c) == lineage
+
+
+def test_resolve_lineage_detects_changes(tmp_path):
+    a = run_stage(tmp_path, "a")
+    b = run_stage(tmp_path, "b", [a])
+    metadata = Metadata.from_directory(a)
+    metadata["name"] = "changed"
+    metadata.persist()
+
+    lineage = resolve_lineage(b)
+    assert lineage[str(b)].verified
+    assert not lineage[str(a)].verified
+
+
+def test_resolve_lineage_after_migration(tmp_path):
+    a = run_stage(tmp_path, "a")
+    b = run_stage(tmp_path, "b", [a])
+    c = run_stage(tmp_path, "c", [b])
+    Metadata.convert(a, "metadata.json")
+    Metadata.convert(b, "metadata.json")
+
+    lineage = resolve_lineage(c)
+    assert [entry.metadata["name"] for entry in lineage.values()] == ["c", "b", "a"]
+    assert all(entry.verified for entry in lineage.values())
+
+
+def test_resolve_lineage_of_file_references(tmp_path):
+    a = run_stage(tmp_path, "a")
+    b = run_stage(tmp_path, "b", [a])
+    # Runs once referenced prior stages by their metadata file.
+    metadata = Metadata.from_directory(b)
+    provenance = metadata["model"]["provenance"]
+    provenance[str(a / "metadata.yaml")] = provenance.pop(str(a))
+    metadata.persist()
+    Metadata.convert(a, "metadata.json")
+
+    lineage = resolve_lineage(b)
+    assert lineage[str(b)].upstream == (str(a),)
+    assert lineage[str(a)].metadata["name"] == "a"
+    assert lineage[str(a)].verified
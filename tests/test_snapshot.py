@@ -0,0 +1,123 @@
+import datetime
+import json
+import pickle
+
+import pytest
+
+from steamfitter.app.directory_structure import (
+    ModelingStageDirectory,
+    ProjectDirectory,
+    VersionDirectory,
+)
+from steamfitter.lib.filesystem import (
+    METADATA_CACHE,
+    load_snapshot,
+    load_tree,
+    save_snapshot,
+)
+from steamfitter.lib.filesystem import snapshot as snapshot_module
+
+
+def _describe(directory):
+    """A comparable description of a loaded tree."""
+    children = (
+        sorted(_describe(d) for d in directory.iter_subdirectories())
+        if directory.is_loaded
+        else None
+    )
+    return (type(directory).__name__, str(directory._path), directory.metadata, children)
+
+
+@pytest.fixture
+def trusted_mtimes(monkeypatch):
+    monkeypatch.setattr(snapshot_module, "_RACY_INTERVAL_NS", -(10**18))
+
+
+def test_snapshot_round_trip(populated_project_path, tmp_path):
+    project = load_tree(populated_project_path, ProjectDirectory)
+    snapshot_path = tmp_path / "snapshot.json"
+
+    assert save_snapshot(project, snapshot_path) == 16
+    loaded = load_snapshot(snapshot_path, ProjectDirectory)
+
+    assert _describe(loaded) == _describe(project)
+    for stage in loaded.modeling_directory.iter_subdirectories(ModelingStageDirectory):
+        assert stage.parent.parent is loaded
+
+
+def test_snapshot_of_lazy_tree(populated_project_path, tmp_path):
+    project = ProjectDirectory(populated_project_path, lazy=True)
+    project.modeling_directory
+    snapshot_path = tmp_path / "snapshot.json"
+    save_snapshot(project, snapshot_path)
+
+    loaded = load_snapshot(snapshot_path)
+    assert loaded.is_loaded
+    assert not loaded.modeling_directory.is_loaded
+    assert _describe(loaded) == _describe(project)
+
+
+def test_load_snapshot_unusable(populated_project_path, tmp_path):
+    snapshot_path = tmp_path / "snapshot.json"
+    assert load_snapshot(snapshot_path) is None
+
+    snapshot_path.write_bytes(b"not a snapshot")
+    assert load_snapshot(snapshot_path) is None
+
+    save_snapshot(ProjectDirectory(populated_project_path), snapshot_path)
+    assert load_snapshot(snapshot_path, ModelingStageDirectory) is None
+
+
+def test_snapshot_is_plain_data(populated_project_path, tmp_path, trusted_mtimes):
+    project = load_tree(populated_project_path, ProjectDirectory)
+    snapshot_path = tmp_path / "snapshot.json"
+    save_snapshot(project, snapshot_path)
+    snapshot = json.loads(snapshot_path.read_text())
+    assert snapshot["format_version"] == snapshot_module.SNAPSHOT_FORMAT_VERSION
+
+    loaded = load_snapshot(snapshot_path)
+    assert loaded._metadata.signature == project._metadata.signature
+
+    # Snapshots are never unpickled.
+    snapshot_path.write_bytes(pickle.dumps(snapshot))
+    assert load_snapshot(snapshot_path) is None
+
+
+def test_project_load_with_unsnapshottable_metadata(populated_project_path):
+    # YAML reads unquoted dates as dates, which JSON can't represent.
+    with (populated_project_path / "metadata.yaml").open("a") as f:
+        f.write("created: 2023-01-01\n")
+    snapshot_path = ProjectDirectory.get_snapshot_path(populated_project_path)
+
+    project = ProjectDirectory.load(populated_project_path)
+
+    assert project["created"] == datetime.date(2023, 1, 1)
+    assert not snapshot_path.exists()
+    assert list(snapshot_path.parent.glob("*.partial")) == []
+
+
+def test_project_load_uses_snapshot(populated_project_path, trusted_mtimes):
+    snapshot_path = ProjectDirectory.get_snapshot_path(populated_project_path)
+    first = ProjectDirectory.load(populated_project_path)
+    assert snapshot_path.exists()
+
+    METADATA_CACHE.clear()
+    second = ProjectDirectory.load(populated_project_path)
+    assert _describe(second) == _describe(first)
+    assert METADATA_CACHE.info().misses == 0
+
+    stage_path = populated_project_path / "modeling" / "stage-a"
+    VersionDirectory.create(stage_path, version=3, versionable_dir_name="stage-a")
+    METADATA_CACHE.clear()
+    third = ProjectDirectory.load(populated_project_path)
+    assert METADATA_CACHE.info().misses == 1
+    assert _describe(third) == _describe(load_tree(populated_project_path, ProjectDirectory))
+    assert _describe(load_snapshot(snapshot_path)) == _describe(third)
+
+
+def test_racy_snapshot_is_rechecked(populated_project_path):
+    ProjectDirectory.load(populated_project_path)
+    # Everything was just written, so nothing in the snapshot is trusted.
+    loaded = load_snapshot(ProjectDirectory.get_snapshot_path(populated_project_path))
+    assert loaded._mtime_ns is None
+    assert loaded._metadata.signature is None
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from steamfitter.app.directory_structure import ModelingStageDirectory, VersionDirectory
+from steamfitter.lib.io import tabular
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "location_id": list(range(100)),
+            "sex": ["male", "female"] * 50,
+            "value": [i / 10 for i in range(100)],
+        }
+    )
+
+
+@pytest.fixture(params=["csv", "parquet", "feather"])
+def file_format(request):
+    if request.param != "csv":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+
+def test_round_trip(tmp_path, data, file_format):
+    path = tabular.write(tmp_path / f"data.{file_format}", data)
+    assert tabular.get_format(path) == file_format
+    pd.testing.assert_frame_equal(tabular.read(path), data)
+
+
+def test_read_columns_and_filters(tmp_path, data, file_format):
+    path = tabular.write(tmp_path / f"data.{file_format}", data, row_group_size=10)
+    result = tabular.read(
+        path,
+        columns=["value"],
+        filters=[("location_id", ">=", 90), ("sex", "in", ["male"])],
+    )
+    assert list(result.columns) == ["value"]
+    assert result["value"].tolist() == pytest.approx([9.0, 9.2, 9.4, 9.6, 9.8])
+
+
+def test_find_file_without_extension(tmp_path, data):
+    path = tabular.write(tmp_path / "data", data)
+    assert path.suffix == (".parquet" if tabular.pyarrow is not None else ".csv")
+    assert tabular.find_file(tmp_path / "data") == path
+    with pytest.raises(FileExistsError):
+        tabular.write(tmp_path / "data", data)
+    with pytest.raises(FileNotFoundError):
+        tabular.read(tmp_path / "missing")
+
+
+def test_versioned_directory_data(project_directory_path, data):
+    stage = ModelingStageDirectory.create(
+        project_directory_path / "modeling", name="stage", description="test"
+    )
+    for i in range(2):
+        version = VersionDirectory.create(stage.path, version=i, versionable_dir_name="stage")
+        version.write_data("results", data.assign(value=i))
+
+    assert stage.read_data("results")["value"].unique().tolist() == [1]
+    first = stage.versions[0]["name"]
+    assert stage.read_data("results", version=first)["value"].unique().tolist() == [0]
+    with pytest.raises(KeyError):
+        stage.get_version("2000_01_01.01")
+
+
+def test_convert_csv(tmp_path, data):
+    pytest.importorskip("pyarrow")
+    csv_path = tabular.write(tmp_path / "raw_data.csv", data)
+
+    stats = tabular.convert_csv(csv_path, dtypes={"location_id": "Int64"}, chunk_size=30)
+
+    assert (stats.row_count, stats.part_count) == (100, 4)
+    assert len(list((tmp_path / "raw_data.parquet").iterdir())) == 4
+    result = tabular.read(tmp_path / "raw_data")
+    assert str(result["location_id"].dtype) == "Int64"
+    pd.testing.assert_frame_equal(result.astype({"location_id": "int64"}), data)
+    with pytest.raises(FileExistsError):
+        tabular.convert_csv(csv_path)
@@ -0,0 +1,86 @@
+from steamfitter.app.directory_structure import ModelingStageDirectory, ProjectDirectory
+from steamfitter.lib.filesystem import (
+    Catalog,
+    find_trash_root,
+    get_trash_root,
+    move_to_trash,
+    reap,
+)
+
+
+def _make_tree(root, width=3, depth=3):
+    root.mkdir()
+    (root / "link").symlink_to(root.parent, target_is_directory=True)
+    for i in range(width):
+        (root / f"file-{i}.csv").write_text("a,b\n1,2\n")
+        if depth > 1:
+            _make_tree(root / f"dir-{i}", width, depth - 1)
+
+
+def test_find_trash_root(populated_project_path):
+    stage_path = populated_project_path / "modeling" / "stage-a"
+    assert find_trash_root(stage_path) == get_trash_root(populated_project_path)
+    assert find_trash_root(populated_project_path) == get_trash_root(
+        populated_project_path.parent
+    )
+
+
+def test_find_trash_root_without_catalog(populated_project_path):
+    # Projects created before catalogs existed don't have one.
+    catalog = Catalog.find(populated_project_path)
+    catalog.path.unlink()
+    catalog.unregister()
+    stage_path = populated_project_path / "modeling" / "stage-a"
+    version_path = next(p for p in stage_path.iterdir() if p.is_dir())
+
+    assert Catalog.find(stage_path) is None
+    assert find_trash_root(version_path) == get_trash_root(populated_project_path)
+    assert find_trash_root(stage_path) == get_trash_root(populated_project_path)
+
+
+def test_remove_moves_to_trash(populated_project_path):
+    stage_path = populated_project_path / "modeling" / "stage-a"
+    ModelingStageDirectory.remove(stage_path)
+
+    assert not stage_path.exists()
+    trashed = list(get_trash_root(populated_project_path).iterdir())
+    assert len(trashed) == 1
+    assert trashed[0].name.endswith("stage-a")
+    assert (
+        len(
+            list(
+                ProjectDirectory(
+                    populated_project_path
+                ).modeling_directory.iter_subdirectories()
+            )
+        )
+        == 1
+    )
+
+
+def test_reap(tmp_path):
+    tree = tmp_path / "tree"
+    _make_tree(tree)
+    trashed = move_to_trash(tree)
+    assert trashed.parent == get_trash_root(tmp_path)
+
+    file_count = reap(get_trash_root(tmp_path), max_workers=4)
+    assert file_count == 3 + 3 * 3 + 9 * 3 + 13  # files plus one symlink per directory
+    assert list(get_trash_root(tmp_path).iterdir()) == []
+    assert tmp_path.exists()
+
+
+def test_reap_resumes(tmp_path):
+    tree = tmp_path / "tree"
+    _make_tree(tree)
+    trashed = move_to_trash(tree)
+    # Simulate an interrupted reap.
+    for path in list(trashed.rglob("file-0.csv")):
+        path.unlink()
+
+    reap(get_trash_root(tmp_path))
+    assert list(get_trash_root(tmp_path).iterdir()) == []
+
+
+def test_reap_missing_trash(tmp_path):
+    assert reap(get_trash_root(tmp_path)) == 0
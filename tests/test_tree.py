@@ -0,0 +1,37 @@
+import pytest
+
+from steamfitter.app.directory_structure import ProjectDirectory
+from steamfitter.lib.filesystem import Directory, SteamfitterDirectoryError, load_tree
+
+
+def _as_nested(directory: Directory):
+    return (
+        type(directory).__name__,
+        str(directory._path),
+        directory.metadata,
+        sorted(_as_nested(child) for child in directory.iter_subdirectories()),
+    )
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_load_tree_matches_eager_load(populated_project_path, max_workers):
+    eager = ProjectDirectory(populated_project_path)
+    loaded = load_tree(populated_project_path, max_workers=max_workers)
+
+    assert isinstance(loaded, ProjectDirectory)
+    assert _as_nested(loaded) == _as_nested(eager)
+
+
+def test_load_tree_sets_parents(populated_project_path):
+    project = load_tree(populated_project_path, ProjectDirectory)
+    modeling = project.modeling_directory
+    assert modeling.parent is project
+    for stage in modeling.iter_subdirectories():
+        assert stage.parent is modeling
+        assert stage.is_loaded
+        assert len(list(stage.iter_subdirectories())) == 3
+
+
+def test_load_tree_wrong_class(populated_project_path):
+    with pytest.raises(SteamfitterDirectoryError):
+        load_tree(populated_project_path / "modeling", ProjectDirectory)
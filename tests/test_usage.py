@@ -0,0 +1,122 @@
+import os
+import sqlite3
+
+from steamfitter.lib.filesystem import Catalog, disk_usage, format_size
+from steamfitter.lib.filesystem import usage as usage_module
+
+
+def _blocks(path):
+    return os.lstat(path).st_blocks * 512
+
+
+def _make_tree(root):
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "top.csv").write_text("x" * 10_000)
+    (root / "a" / "mid.csv").write_text("x" * 5_000)
+    (root / "a" / "b" / "leaf.csv").write_text("x" * 100)
+    (root / "link").symlink_to(root / "a", target_is_directory=True)
+
+
+def test_disk_usage(tmp_path):
+    root = tmp_path / "root"
+    _make_tree(root)
+
+    usage = disk_usage(root)
+
+    leaf = _blocks(root / "a" / "b" / "leaf.csv")
+    mid = _blocks(root / "a" / "mid.csv") + leaf
+    total = _blocks(root / "top.csv") + mid + _blocks(root / "link")
+    assert usage[root / "a" / "b"] == (leaf, 1, 1)
+    assert usage[root / "a"] == (mid, 2, 2)
+    assert usage[root] == (total, 4, 3)
+    assert root / "link" not in usage
+
+
+def test_disk_usage_incremental(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    _make_tree(root)
+    Catalog.create(tmp_path)
+    catalog = Catalog(tmp_path)
+    # Treat everything as old enough to trust its mtime.
+    monkeypatch.setattr(usage_module, "_RACY_INTERVAL_NS", -(10**18))
+
+    first = disk_usage(root, catalog=catalog)
+    assert set(catalog.load_usage(root)) == {str(p) for p in first}
+
+    scanned = []
+    scan_directory = os.scandir
+    monkeypatch.setattr(
+        usage_module.os, "scandir", lambda path: scanned.append(path) or scan_directory(path)
+    )
+    assert disk_usage(root, catalog=catalog) == first
+    assert scanned == []
+
+    (root / "a" / "b" / "new.csv").write_text("x" * 20_000)
+    second = disk_usage(root, catalog=catalog)
+    assert scanned == [str(root / "a" / "b")]
+    assert second[root].file_count == first[root].file_count + 1
+    assert second[root].size > first[root].size
+
+    scanned.clear()
+    disk_usage(root, catalog=catalog, full=True)
+    assert len(scanned) == 3
+
+
+def test_disk_usage_racy_directories_are_rescanned(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    _make_tree(root)
+    Catalog.create(tmp_path)
+    catalog = Catalog(tmp_path)
+
+    disk_usage(root, catalog=catalog)
+    assert all(record[0] == -1 for record in catalog.load_usage(root).values())
+
+
+def test_disk_usage_hardlinks(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    for stage in ["stage-a", "stage-b"]:
+        (root / stage).mkdir(parents=True)
+    (root / "stage-a" / "data.csv").write_text("x" * 1024**2)
+    os.link(root / "stage-a" / "data.csv", root / "stage-b" / "data.csv")
+    size = _blocks(root / "stage-a" / "data.csv")
+    Catalog.create(tmp_path)
+    catalog = Catalog(tmp_path)
+    monkeypatch.setattr(usage_module, "_RACY_INTERVAL_NS", -(10**18))
+
+    usage = disk_usage(root, catalog=catalog)
+    # The file is counted once, in the first directory it's found in.
+    assert usage[root] == (size, 2, 3)
+    assert usage[root / "stage-a"] == (size, 1, 1)
+    assert usage[root / "stage-b"] == (0, 1, 1)
+    # Including when read back from the catalog.
+    assert disk_usage(root, catalog=catalog) == usage
+
+
+def test_disk_usage_ignores_usage_cached_without_links(tmp_path):
+    root = tmp_path / "root"
+    _make_tree(root)
+    catalog = Catalog.create(tmp_path)
+    with sqlite3.connect(catalog.path) as connection:
+        connection.executescript(
+            """
+            DROP TABLE usage;
+            CREATE TABLE usage (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                file_count INTEGER NOT NULL,
+                subdirectories TEXT NOT NULL
+            );
+            """
+        )
+        connection.execute("INSERT INTO usage VALUES (?, 0, 0, 0, '[]')", (str(root),))
+
+    assert catalog.load_usage(root) == {}
+    assert disk_usage(root, catalog=catalog) == disk_usage(root)
+
+
+def test_format_size():
+    assert format_size(10) == "10 B"
+    assert format_size(1536) == "1.5 KB"
+    assert format_size(3 * 1024**3) == "3.0 GB"
+    assert format_size(2048 * 1024**4) == "2048.0 TB"
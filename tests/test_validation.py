@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from steamfitter.lib.io import tabular
+from steamfitter.lib.validation import Schema, SchemaValidationError
+
+
+@pytest.fixture
+def schema():
+    return Schema.from_columns(
+        {
+            "location_id": ("int", False, "A location."),
+            "value": ("float", True, "A value."),
+            "flag": ("bool", True, "A flag."),
+            "name": ("str", False, "A name."),
+        }
+    )
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def file_format(request):
+    if request.param != "csv":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+
+def test_valid_data(tmp_path, schema, file_format):
+    data = pd.DataFrame(
+        {
+            "location_id": range(100),
+            "value": [i / 10 if i % 3 else None for i in range(100)],
+            "flag": [True, False] * 50,
+            "name": ["a"] * 100,
+        }
+    )
+    path = tabular.write(tmp_path / f"data.{file_format}", data)
+
+    report = schema.validate(path, chunk_size=7)
+
+    assert report.is_valid, report.errors()
+    assert report.row_count == 100
+    assert report.columns["value"].null_count == 34
+    report.raise_for_errors()
+
+
+def test_invalid_data(tmp_path, schema):
+    (tmp_path / "data.csv").write_text(
+        "location_id,value,flag,extra\n"
+        "1,0.5,true,x\n"
+        "1.5,abc,maybe,x\n"
+        ",2,0,x\n"
+        "four,,1,x\n"
+    )
+
+    report = schema.validate(tmp_path / "data", chunk_size=2)
+
+    assert not report.is_valid
+    assert report.row_count == 4
+    assert report.missing_columns == ("name",)
+    assert report.unexpected_columns == ("extra",)
+    assert report.columns["location_id"][2:] == (1, 2)
+    assert report.columns["value"][2:] == (1, 1)
+    assert report.columns["flag"][2:] == (0, 1)
+    with pytest.raises(SchemaValidationError, match="Column location_id contains 1 null"):
+        report.raise_for_errors()
+
+
+def test_invalid_string_data(tmp_path, schema):
+    pytest.importorskip("pyarrow")
+    data = pd.DataFrame({"location_id": [1, 2], "value": [0.5, 1.5], "flag": [True, False]})
+    tabular.write(tmp_path / "numbers.parquet", data.assign(name=[1, 2]))
+    tabular.write(tmp_path / "mixed.parquet", data.assign(name=["a", None]))
+
+    # Numbers written to a str column are not strings, unlike in a CSV file.
+    assert schema.validate(tmp_path / "numbers.parquet").columns["name"][2:] == (0, 2)
+    assert schema.validate(tmp_path / "mixed.parquet").columns["name"][2:] == (1, 0)
+
+
+def test_schema_dtypes(schema):
+    assert schema.dtypes == {
+        "location_id": "int64",
+        "value": "float64",
+        "flag": "boolean",
+        "name": "string",
+    }
@@ -0,0 +1,48 @@
+import multiprocessing
+import os
+
+from steamfitter.lib.filesystem import allocate_version
+from steamfitter.lib.filesystem import versions as versions_module
+from steamfitter.lib.filesystem.versions import VERSION_COUNTER_FILE_NAME
+
+
+def test_allocate_version(tmp_path):
+    assert allocate_version(tmp_path, "2023_01_01") == "2023_01_01.01"
+    assert allocate_version(tmp_path, "2023_01_01") == "2023_01_01.02"
+    assert allocate_version(tmp_path, "2023_01_02") == "2023_01_02.01"
+    assert (tmp_path / VERSION_COUNTER_FILE_NAME).read_text() == "2023_01_02 1\n"
+
+
+def test_allocate_version_skips_existing_versions(tmp_path):
+    for name in ["2023_01_01.01", "2023_01_01.07", "2023_01_02.09", "latest"]:
+        (tmp_path / name).mkdir()
+    assert allocate_version(tmp_path, "2023_01_01") == "2023_01_01.08"
+
+    # Created without going through the counter.
+    (tmp_path / "2023_01_01.09").mkdir()
+    assert allocate_version(tmp_path, "2023_01_01") == "2023_01_01.10"
+
+
+def test_allocate_version_does_not_scan(tmp_path, monkeypatch):
+    allocate_version(tmp_path, "2023_01_01")
+    monkeypatch.setattr(versions_module.os, "scandir", None)
+    assert allocate_version(tmp_path, "2023_01_01") == "2023_01_01.02"
+
+
+def test_allocate_version_recovers_from_corrupt_counter(tmp_path):
+    (tmp_path / "2023_01_01.03").mkdir()
+    (tmp_path / VERSION_COUNTER_FILE_NAME).write_bytes(b"2023_01\xff")
+    assert allocate_version(tmp_path, "2023_01_01") == "2023_01_01.04"
+
+
+def _allocate(root):
+    return [allocate_version(root, "2023_01_01") for _ in range(10)]
+
+
+def test_allocate_version_concurrently(tmp_path):
+    with multiprocessing.get_context("fork").Pool(8) as pool:
+        results = pool.map(_allocate, [tmp_path] * 16)
+    names = [name for result in results for name in result]
+    assert len(set(names)) == len(names) == 160
+    assert sorted(int(name.split(".")[1]) for name in names) == list(range(1, 161))
+    assert os.listdir(tmp_path) == [VERSION_COUNTER_FILE_NAME]
@@ -0,0 +1,164 @@
+import ctypes
+import errno
+import os
+import shutil
+import time
+
+import pytest
+
+from steamfitter.app.directory_structure import ProjectDirectory, VersionDirectory
+from steamfitter.lib.filesystem import Metadata, TreeWatcher, inotify_available
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture(
+    params=[
+        pytest.param(
+            True,
+            id="inotify",
+            marks=pytest.mark.skipif(not inotify_available(), reason="No inotify."),
+        ),
+        pytest.param(False, id="polling"),
+    ]
+)
+def use_inotify(request):
+    return request.param
+
+
+def test_watcher_backend(populated_project_path, use_inotify):
+    watcher = TreeWatcher(ProjectDirectory(populated_project_path), use_inotify=use_inotify)
+    assert watcher.backend == ("inotify" if use_inotify else "polling")
+
+
+def test_watcher_tracks_new_versions(populated_project_path, use_inotify):
+    project = ProjectDirectory(populated_project_path)
+    stage = next(project.modeling_directory.iter_subdirectories())
+
+    def version_count():
+        with watcher.lock:
+            return len(list(stage.iter_subdirectories(VersionDirectory)))
+
+    with TreeWatcher(project, use_inotify=use_inotify, poll_interval=0.1) as watcher:
+        VersionDirectory.create(stage.path, version="new", versionable_dir_name="stage")
+        assert _wait_for(lambda: version_count() == 4)
+
+
+def test_watcher_tracks_metadata_changes(populated_project_path, use_inotify):
+    project = ProjectDirectory(populated_project_path)
+    modeling = project.modeling_directory
+
+    def pipeline_stages():
+        with watcher.lock:
+            return modeling["pipeline_stages"]
+
+    with TreeWatcher(project, use_inotify=use_inotify, poll_interval=0.1) as watcher:
+        metadata = Metadata.from_directory(modeling.path)
+        metadata["pipeline_stages"] = ["stage-a", "stage-b"]
+        metadata.persist()
+        assert _wait_for(lambda: pipeline_stages() == ["stage-a", "stage-b"])
+
+
+def test_watcher_tracks_symlink_moves(populated_project_path, use_inotify):
+    project = ProjectDirectory(populated_project_path)
+    stage = next(project.modeling_directory.iter_subdirectories())
+    first, second = sorted(v.path for v in stage.iter_subdirectories())[:2]
+    best_link = stage.path / "best"
+    best_link.symlink_to(first, target_is_directory=True)
+    project.refresh()
+
+    def best_root():
+        with watcher.lock:
+            best = [v for v in stage.iter_subdirectories() if v._path == best_link]
+            return best[0]["root"] if best else None
+
+    with TreeWatcher(project, use_inotify=use_inotify, poll_interval=0.1) as watcher:
+        assert best_root() == str(first)
+        best_link.unlink()
+        best_link.symlink_to(second, target_is_directory=True)
+        assert _wait_for(lambda: best_root() == str(second))
+
+
+@pytest.mark.skipif(not inotify_available(), reason="No inotify.")
+def test_watcher_only_rescans_refreshed_directories(populated_project_path, monkeypatch):
+    project = ProjectDirectory(populated_project_path)
+    modeling = project.modeling_directory
+    scanned = []
+    scandir = os.scandir
+    monkeypatch.setattr(
+        os, "scandir", lambda path: scanned.append(str(path)) or scandir(path)
+    )
+
+    def pipeline_stages():
+        with watcher.lock:
+            return modeling["pipeline_stages"]
+
+    with TreeWatcher(project, use_inotify=True) as watcher:
+        scanned.clear()
+        metadata = Metadata.from_directory(modeling.path)
+        metadata["pipeline_stages"] = ["stage-a"]
+        metadata.persist()
+        assert _wait_for(lambda: pipeline_stages() == ["stage-a"])
+
+    assert str(modeling.path) in scanned
+    # Nothing below the directory that changed is listed again.
+    assert not [path for path in scanned if path.startswith(f"{modeling.path}/")]
+
+
+@pytest.mark.skipif(not inotify_available(), reason="No inotify.")
+def test_watcher_updates_watches(populated_project_path):
+    project = ProjectDirectory(populated_project_path)
+    stage = next(project.modeling_directory.iter_subdirectories())
+    removed = sorted(v.path for v in stage.iter_subdirectories())[0]
+
+    def watched_paths():
+        with watcher.lock:
+            return set(watcher._watched_paths)
+
+    with TreeWatcher(project, use_inotify=True) as watcher:
+        new = VersionDirectory.create(
+            stage.path, version="new", versionable_dir_name="stage"
+        ).path
+        (stage.path / "unmanaged").mkdir()
+        shutil.rmtree(removed)
+        assert _wait_for(
+            lambda: {str(new), str(stage.path / "unmanaged")} <= watched_paths()
+            and str(removed) not in watched_paths()
+        )
+
+        with watcher.lock:
+            incremental = set(watcher._watched_paths), set(watcher._directories)
+            watcher._sync_watches()
+            assert incremental == (set(watcher._watched_paths), set(watcher._directories))
+
+
+@pytest.mark.skipif(not inotify_available(), reason="No inotify.")
+def test_watcher_reports_unwatched_directories(populated_project_path, caplog):
+    project = ProjectDirectory(populated_project_path)
+    stage_path = populated_project_path / "modeling" / "stage-a"
+    watcher = TreeWatcher(project, use_inotify=True)
+    libc = watcher._libc
+
+    class FullLibc:
+        def __getattr__(self, name):
+            return getattr(libc, name)
+
+        def inotify_add_watch(self, fd, path, mask):
+            if path == os.fsencode(stage_path):
+                ctypes.set_errno(errno.ENOSPC)
+                return -1
+            return libc.inotify_add_watch(fd, path, mask)
+
+    watcher._libc = FullLibc()
+    with watcher:
+        assert watcher.is_degraded
+        assert watcher.unwatched_paths == {str(stage_path)}
+    assert f"Can't watch {stage_path} (ENOSPC" in caplog.text
+    assert not watcher.is_degraded
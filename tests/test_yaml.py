@@ -0,0 +1,30 @@
+import pytest
+import yaml
+
+from steamfitter.lib.io import yaml as io
+
+
+@pytest.fixture
+def document():
+    return {
+        "name": "test",
+        "columns": {"x": ["int", False, "A column."]},
+        "provenance": {"stage": {"inputs": [1, 2.5, None, "2023_01_01.01"]}},
+    }
+
+
+def test_round_trip(tmp_path, document):
+    io.dump(tmp_path / "metadata.yaml", document)
+    assert io.load(tmp_path / "metadata.yaml") == document
+
+
+def test_compatible_with_pure_python_yaml(tmp_path, document):
+    io.dump(tmp_path / "metadata.yaml", document)
+    text = (tmp_path / "metadata.yaml").read_text()
+    assert text == yaml.dump(document, Dumper=yaml.SafeDumper)
+    assert yaml.load(text, Loader=yaml.SafeLoader) == document
+
+
+def test_load_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        io.load(tmp_path / "metadata.yaml")